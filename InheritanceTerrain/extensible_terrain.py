@@ -3,10 +3,13 @@
 
 # Imports and initialize pygame.
 import pygame
-import io
-import math
+import os
 import random
+import sys
 pygame.init()
+# Import the loader for text and binary tile maps, kept in Respawn Invincibility's packages.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Respawn Invincibility"))
+from packages.tile_map import TileMap, load_map
 
 # Constants
 LEFT: int = 0
@@ -15,26 +18,107 @@ UP: int = 2
 DOWN: int = 3
 NOT_MOVING: int = -1
 
+class ImageCache:
+    """Images loaded from files and shared by every sprite that uses
+       them, so each file is only loaded and converted once."""
+
+    # Annotate object-level fields
+    _images: dict[tuple, pygame.Surface]             # The images, keyed by the arguments to load
+    _blanks: dict[tuple[int, int], pygame.Surface]   # Invisible images, keyed by size
+    hits: int                                        # Loads that found the image already loaded
+    misses: int                                      # Loads that had to read the file
+
+    def __init__(self) -> None:
+        """Begin with no images."""
+        self._images = {}
+        self._blanks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of loaded images."""
+        return len(self._images)
+
+    def load(self, file_name: str, alpha: bool = False, surface_alpha: int | None = None,
+             colorkey: tuple[int, int, int] | None = None) -> pygame.Surface:
+        """Return the image in file_name, converted with convert_alpha if
+           alpha is True and convert if not, and given surface_alpha and
+           colorkey if they aren't None.  Each combination is loaded once
+           and shared, so don't draw on it or change it."""
+        key: tuple = (file_name, alpha, surface_alpha, colorkey)
+        image: pygame.Surface | None = self._images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        image = pygame.image.load(file_name)
+        image = image.convert_alpha() if alpha else image.convert()
+        if surface_alpha is not None:
+            image.set_alpha(surface_alpha)
+        if colorkey is not None:
+            image.set_colorkey(colorkey)
+        self._images[key] = image
+        return image
+
+    def get_blank(self, width: int, height: int) -> pygame.Surface:
+        """Return an invisible width x height image.  The image is shared,
+           so don't draw on it."""
+        image: pygame.Surface | None = self._blanks.get((width, height))
+        if image is None:
+            image = pygame.Surface((width, height))
+            image.fill((0,0,0))
+            image.set_colorkey((0,0,0))
+            self._blanks[(width, height)] = image
+        return image
+
+    def preload(self, terrain_data: dict) -> None:
+        """Load the images of every tile class in terrain_data."""
+        entry: list
+        load_args: tuple
+        for entry in terrain_data.values():
+            if entry[0]:
+                for load_args in entry[0].IMAGE_FILES:
+                    self.load(*load_args)
+
+    def get_bytes(self) -> int:
+        """Return the number of bytes of pixels in the loaded images."""
+        image: pygame.Surface
+        return sum(image.get_pitch() * image.get_height()
+                   for image in list(self._images.values()) + list(self._blanks.values()))
+
+
+# The images shared by the whole program.
+IMAGES: ImageCache = ImageCache()
+
 class Brick(pygame.sprite.Sprite):
     """Just another brick..."""
 
+    # Annotate class-level constants
+    # The images a brick uses, as the arguments to ImageCache.load.
+    IMAGE_FILES: list[tuple] = []
+
+    # Annotate object-level fields
+    changed: bool    # True if the image changed since the brick was last drawn
+
     def __init__(self, x: int, y: int, length: int, width: int) -> None:
         """Create an invisible sprite."""
         super().__init__()
-        self.image = pygame.Surface((width, length))
-        self.image.fill((0,0,0))
-        self.image.set_colorkey((0,0,0))
+        self.image = IMAGES.get_blank(width, length)
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
+        self.changed = False
 
     def move(self, dx: int, dy: int) -> None:
         """Move by dx and dy."""
         self.rect.left += dx
-        self.rect.right += dy
+        self.rect.top += dy
 
 class DiscoBrick(Brick):
     """Just another brick..."""
 
+    # Annotate class-level constants
+    IMAGE_FILES: list[tuple] = [("smallwhiteglow.png", True, 150, None)]
+
     # Annotate object-level fields
     _counter: int
     _glow: pygame.Surface
@@ -43,8 +127,8 @@ class DiscoBrick(Brick):
         """Create an invisible sprite."""
         super().__init__(x, y, length, width)
         self.image = pygame.Surface((width, length), flags = pygame.SRCALPHA)
-        self._glow = pygame.image.load("smallwhiteglow.png").convert_alpha()
-        self._glow.set_alpha(150)
+        # Every disco brick shares the glow, loaded with its alpha already set.
+        self._glow = IMAGES.load(*DiscoBrick.IMAGE_FILES[0])
         self._counter = random.randint(0, 100)
 
 
@@ -56,15 +140,23 @@ class DiscoBrick(Brick):
             rand_color = rand_color.lerp(pygame.Color(255, 255, 255), .2)
             self.image.fill(rand_color, (3, 3, self.rect.width-6, self.rect.height-6))
             self.image.blit(self._glow, (0, 0))
+            self.changed = True
         
         elif self._counter == 180:
             self._counter = 0
             self.image.fill((0,0,0))
             self.image.set_colorkey((0,0,0))
+            self.changed = True
 
 class Portal(Brick):
     """The cake is a lie."""
 
+    # Annotate class-level constants
+    IMAGE_FILES: list[tuple] = [("spiral1.jpg", False, None, (0,0,0)),
+                                ("spiral2.jpg", False, None, (0,0,0)),
+                                ("spiral3.jpg", False, None, (0,0,0)),
+                                ("spiral4.jpg", False, None, (0,0,0))]
+
     # Annotate object-level fields
     _counter: int
     _spirals: list
@@ -72,67 +164,106 @@ class Portal(Brick):
     def __init__(self, x: int, y: int, length: int, width: int) -> None:
         """Create an invisible sprite."""
         super().__init__(x, y, length, width)
-        self._spirals = [pygame.image.load("spiral1.jpg").convert(),
-                         pygame.image.load("spiral2.jpg").convert(),
-                         pygame.image.load("spiral3.jpg").convert(),
-                         pygame.image.load("spiral4.jpg").convert()]
+        load_args: tuple
+        # The spirals are shared by every portal and used as its image,
+        # loaded with black see-through like the brick underneath.
+        self._spirals = [IMAGES.load(*load_args) for load_args in Portal.IMAGE_FILES]
         self._counter = 0
 
     def update(self):
         self._counter += 1
         if self._counter % 10 == 0:
-            self.image.blit(self._spirals[self._counter//10 - 1], (0,0))
+            self.image = self._spirals[self._counter//10 - 1]
+            self.changed = True
             if self._counter == 40:
                 self._counter = 0
 
 
+class Camera:
+    """The part of the world that shows in the window.  Sprites keep
+       their world coordinates and the camera moves them to the screen
+       when they are drawn, so scrolling only moves the camera."""
+
+    # Annotate object-level fields
+    view: pygame.Rect      # The window, in world coordinates
+    _world: pygame.Rect    # The whole world, which the view stays inside
+
+    def __init__(self, width: int, height: int,
+                 world_width: int, world_height: int) -> None:
+        """Create a width x height view at the top left of the world."""
+        self.view = pygame.Rect(0, 0, width, height)
+        self._world = pygame.Rect(0, 0, world_width, world_height)
+
+    def scroll(self, dx: int, dy: int) -> None:
+        """Move the view by dx and dy, but not out of the world."""
+        self.view.move_ip(dx, dy)
+        self.view.clamp_ip(self._world)
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        """Return rect moved from world to screen coordinates."""
+        return rect.move(-self.view.left, -self.view.top)
+
+    def to_world(self, rect: pygame.Rect) -> pygame.Rect:
+        """Return rect moved from screen to world coordinates."""
+        return rect.move(self.view.left, self.view.top)
+
+    def draw(self, screen: pygame.Surface, sprites: list) -> None:
+        """Draw sprites on screen where the camera sees them."""
+        sprite: pygame.sprite.Sprite
+        for sprite in sprites:
+            screen.blit(sprite.image, self.to_screen(sprite.rect))
+
+
 class ScrollingBackground(pygame.sprite.Sprite):
-    """A tile-based scrolling background."""
+    """A tile-based scrolling background.  The image and the bricks
+       stay in world coordinates and the camera scrolls over them."""
 
     # Annotate object-level fields
     _speed: int
+    _tile_size: int
+    _tiles: list          # The brick on each tile of the map, or None, by row and column
+    camera: Camera        # The part of the background in the window
 
-    def __init__(self, terrain_data: dict, terrain_file: str) -> None:
-        """Load map and build Surface."""
+    def __init__(self, terrain_data: dict, terrain_file: str,
+                 screen: pygame.Surface) -> None:
+        """Load map and build Surface, with a camera the size of screen."""
         # Annotate and initialize local variables
         name: str
-        line: str
         tile_size: int
         width: int
         height: int
         x: int = 0
         y: int = 0
-        tile: Brick
-        terrain: io.TextIOWrapper
+        tile: Brick | None
         # Superclass init.
         super().__init__()
         # Load the images to pygame Surfaces.
 
-        # Load the terrain map into a 2D list.
-        terrain_map: list = []
-        with open(terrain_file) as terrain:
-            line = terrain.readline()
-            while line != "":
-                terrain_map.append(line.split())
-                line = terrain.readline()
+        # Load the terrain map, which can be a text or binary map.
+        terrain_map: TileMap = load_map(terrain_file)
         # Calculate the size of the Surface and create.
         tile_size = terrain_data[0][1].get_width()
-        width = len(terrain_map[0]) * tile_size
-        height = len(terrain_map) * tile_size
+        width = terrain_map.cols * tile_size
+        height = terrain_map.rows * tile_size
         self.image = pygame.Surface((width, height)) 
+        self._tile_size = tile_size
+        self._tiles = []
         # Blit the images to the Surface.
         # Create a Block if necessary.
-        for row in terrain_map:
+        for row in terrain_map.get_rows():
+            self._tiles.append([])
             for i in row:
-                self.image.blit(terrain_data[int(i)][1], (x, y))
-                if terrain_data[int(i)][0]:
+                self.image.blit(terrain_data[i][1], (x, y))
+                tile = None
+                if terrain_data[i][0]:
                     # The first element in the list is the class of the
                     # object to create.
-                    tile = terrain_data[int(i)][0](x, y, tile_size, tile_size)
+                    tile = terrain_data[i][0](x, y, tile_size, tile_size)
                     # The third element in the list is the list of bricks
                     # to add the tile to.
-                    for group in terrain_data[int(i)][2]:
+                    for group in terrain_data[i][2]:
                         group.add(tile)
+                self._tiles[-1].append(tile)
                 x += tile_size
             y += tile_size
             x = 0
@@ -140,34 +271,119 @@ class ScrollingBackground(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.topleft = (0, 0)
         self._speed = 5
+        self.camera = Camera(screen.get_width(), screen.get_height(), width, height)
 
-    def scroll(self, direction: int, screen: pygame.Surface,
-               brick_groups: list) -> None:
+    def scroll(self, direction: int) -> None:
         """Move left, right, or not at all."""
-        # Annotate and initialize local variable
-        left: int = self.rect.left
-        # Scroll image and bricks.
         if direction == LEFT:
-            self.rect.left += self._speed
-            if self.rect.left > 0:
-                self.rect.left = 0
+            self.camera.scroll(-self._speed, 0)
         elif direction == RIGHT:
-            self.rect.left -= self._speed
-            if self.rect.right < screen.get_width():
-                self.rect.right = screen.get_width()
-        for group in brick_groups:
-            for brick in group:
-                brick.move(self.rect.left - left, 0)
+            self.camera.scroll(self._speed, 0)
 
     def can_scroll(self, screen: pygame.Surface, direction: int) -> bool:
         """Return True if can scroll in direction."""
         scroll: bool = False
-        if direction == LEFT and self.rect.left < 0:
+        if direction == LEFT and self.camera.view.left > self.rect.left:
             scroll = True
-        elif direction == RIGHT and self.rect.right > screen.get_width():
+        elif direction == RIGHT and self.camera.view.right < self.rect.right:
             scroll = True
         return scroll
 
+    def sprites_in(self, rect: pygame.Rect, group: pygame.sprite.Group) -> list:
+        """Return the sprites in group on the tiles that rect, in world
+           coordinates, touches.  Only those tiles are looked at."""
+        # Annotate and initialize local variables
+        sprites: list = []
+        row: int
+        col: int
+        tile: Brick | None
+        for row in range(max(rect.top // self._tile_size, 0),
+                         min((rect.bottom - 1) // self._tile_size + 1, len(self._tiles))):
+            for col in range(max(rect.left // self._tile_size, 0),
+                             min((rect.right - 1) // self._tile_size + 1, len(self._tiles[row]))):
+                tile = self._tiles[row][col]
+                if tile is not None and tile in group:
+                    sprites.append(tile)
+        return sprites
+
+    def visible(self, group: pygame.sprite.Group) -> list:
+        """Return the sprites in group that are in the window."""
+        return self.sprites_in(self.camera.view, group)
+
+    def collide(self, sprite: pygame.sprite.Sprite, group: pygame.sprite.Group) -> list:
+        """Return the sprites in group that collide with sprite, which is
+           in screen coordinates."""
+        world_rect: pygame.Rect = self.camera.to_world(sprite.rect)
+        brick: Brick
+        return [brick for brick in self.sprites_in(world_rect, group)
+                if world_rect.colliderect(brick.rect)]
+
+    def draw(self, screen: pygame.Surface) -> None:
+        """Draw the part of the background the camera sees."""
+        screen.blit(self.image, (0, 0), self.camera.view)
+
+
+class Renderer:
+    """Draws the game, updating only the parts of the screen that change.
+       The map is baked into the background image once.  Animated sprites
+       set changed when their image changes, and only their rects and the
+       player's old and new rects are redrawn.  When the camera moves, the
+       whole screen is redrawn."""
+
+    # Annotate object-level fields
+    _screen: pygame.Surface
+    _background: ScrollingBackground
+    _last_view: pygame.Rect | None      # The camera's view when the screen was last drawn
+    _last_player: pygame.Rect | None    # The player's rect when the screen was last drawn
+    updated_area: int                   # Pixels updated on the display in the last frame
+
+    def __init__(self, screen: pygame.Surface, background: ScrollingBackground) -> None:
+        """Draw on screen; nothing has been drawn yet."""
+        self._screen = screen
+        self._background = background
+        self._last_view = None
+        self._last_player = None
+        self.updated_area = 0
+
+    def draw(self, animated: list, player: pygame.sprite.Sprite) -> None:
+        """Draw the background, the animated sprites in the groups in
+           animated, and player on top, and update the display where it
+           changed.  The animated sprites are in world coordinates and the
+           player is in screen coordinates."""
+        # Annotate and initialize local variables
+        camera: Camera = self._background.camera
+        visible: list = []
+        dirty: list[pygame.Rect]
+        group: pygame.sprite.Group
+        sprite: Brick
+        rect: pygame.Rect
+        # The image can be bigger than the rect, for example when it turns.
+        player_rect: pygame.Rect = pygame.Rect(player.rect.topleft, player.image.get_size())
+        for group in animated:
+            visible += self._background.visible(group)
+        if self._last_view != camera.view:
+            dirty = [self._screen.get_rect()]
+            self._last_view = camera.view.copy()
+        else:
+            dirty = [camera.to_screen(sprite.rect) for sprite in visible if sprite.changed]
+            dirty.append(player_rect)
+            if self._last_player is not None:
+                dirty.append(self._last_player)
+        # Redraw each dirty rect from the bottom layer up.
+        for rect in dirty:
+            self._screen.set_clip(rect)
+            self._screen.blit(self._background.image, rect, camera.to_world(rect))
+            camera.draw(self._screen, [sprite for sprite in visible
+                                       if camera.to_screen(sprite.rect).colliderect(rect)])
+            self._screen.blit(player.image, player.rect)
+        self._screen.set_clip(None)
+        for sprite in visible:
+            sprite.changed = False
+        self._last_player = player_rect
+        self.updated_area = sum(rect.clip(self._screen.get_rect()).width
+                                * rect.clip(self._screen.get_rect()).height for rect in dirty)
+        pygame.display.update(dirty)
+
 
 class Penguin(pygame.sprite.Sprite):
     """A player-controlled character."""
@@ -225,14 +441,21 @@ class Penguin(pygame.sprite.Sprite):
             moved = True
         return moved
 
-    def backup(self) -> None:
-        """Back up one unit displacement vector."""
-        # Calculate a unit vector
-        dx: float = -math.cos(math.radians(self._angle))  
-        dy: float = -math.sin(math.radians(self._angle)) 
-        # Add to rectangle
-        self.rect.left += dx
-        self.rect.top += dy        
+    def back_out(self, walls: list) -> None:
+        """Back up against the direction the penguin faces until it just
+           touches each of the walls it overlaps.  The walls are rects in
+           screen coordinates.  The penguin moves less than a tile at a
+           time, so the way back is clear and one pass is enough."""
+        wall: pygame.Rect
+        for wall in walls:
+            if self._angle == 0:
+                self.rect.right = min(self.rect.right, wall.left)
+            elif self._angle == 180:
+                self.rect.left = max(self.rect.left, wall.right)
+            elif self._angle == 90:
+                self.rect.bottom = min(self.rect.bottom, wall.top)
+            elif self._angle == 270:
+                self.rect.top = max(self.rect.top, wall.bottom)
             
 def make_window(width: int, height: int, caption: str) -> pygame.Surface:
     """Create and return a pygame window."""
@@ -247,10 +470,9 @@ def main() -> None:
     SCREEN_SIZE: int = 480
     screen: pygame.Surface
     background: ScrollingBackground
-    bkgd_group: pygame.sprite.Group
     bricks: pygame.sprite.Group
     penguin: Penguin
-    penguin_group: pygame.sprite.Group
+    renderer: Renderer
     user_quit: bool = False
     e: pygame.event.Event
     scroll_threshold: int = 100
@@ -268,27 +490,26 @@ def main() -> None:
     portal_out = pygame.sprite.Group()
     
     terrain_data = { 0: [Brick,
-                         pygame.image.load("ice_block.jpg").convert(),
+                         IMAGES.load("ice_block.jpg"),
                          [bricks]],
                      1: [None,
-                         pygame.image.load("ice_wall.jpg").convert(),
+                         IMAGES.load("ice_wall.jpg"),
                          []],
                      2: [DiscoBrick,
-                         pygame.image.load("ice_wall.jpg").convert(),
+                         IMAGES.load("ice_wall.jpg"),
                          [disco]],
                      3: [Portal,
-                         pygame.image.load("ice_wall.jpg").convert(),
+                         IMAGES.load("ice_wall.jpg"),
                          [portal_in]],
                      4: [Portal,
-                         pygame.image.load("ice_wall.jpg").convert(),
+                         IMAGES.load("ice_wall.jpg"),
                          [portal_out]]}
     
     # Set up the rest of the assets.
-    image_files: list = ["ice_block.jpg", "ice_wall.jpg"]
-    background = ScrollingBackground(terrain_data, "ice_castle_top.txt")
-    bkgd_group = pygame.sprite.Group(background)
+    IMAGES.preload(terrain_data)
+    background = ScrollingBackground(terrain_data, "ice_castle_top.txt", screen)
     penguin = Penguin(screen)
-    penguin_group = pygame.sprite.Group(penguin)
+    renderer = Renderer(screen, background)
     clock: pygame.time.Clock = pygame.time.Clock()
 
     while not user_quit:
@@ -317,26 +538,24 @@ def main() -> None:
                     direction = NOT_MOVING
 
         # Move the penguin or the background.
-        penguin_group.clear(screen, background.image)
         if not penguin.move(screen, scroll_threshold, direction, background):
-            background.scroll(direction, screen, [bricks, disco, portal_in, portal_out])
-        # Check for collisions.
-        while pygame.sprite.spritecollide(penguin, bricks, False):
-            penguin.backup()
-        if pygame.sprite.spritecollide(penguin, portal_in, False):
+            background.scroll(direction)
+        # Check for collisions.  The bricks are in world coordinates,
+        # so the background checks them through its camera.
+        penguin.back_out([background.camera.to_screen(brick.rect)
+                          for brick in background.collide(penguin, bricks)])
+        if background.collide(penguin, portal_in):
             new_brick = random.choice(portal_out.sprites())
-            penguin.rect = new_brick.rect.copy()
-        # Redraw and show.
+            penguin.rect = background.camera.to_screen(new_brick.rect)
+        # Redraw and show.  Every sprite keeps animating, so it looks
+        # right when it scrolls into view, but only the parts of the
+        # window that changed are drawn.
         disco.update()
         portal_in.update()
         portal_out.update()
-        bkgd_group.draw(screen)
-        disco.draw(screen)
-        portal_in.draw(screen)
-        portal_out.draw(screen)
-        penguin_group.draw(screen)
-        pygame.display.flip()
+        renderer.draw([disco, portal_in, portal_out], penguin)
          
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+    A broad phase for collisions with Brickout's bricks.  Bricks never
+    move, so each one is put into the cells of a grid once, when the level
+    is built, and taken out when it is destroyed.  A ball or laser is then
+    only tested against the bricks in the cells it covers, instead of
+    against every brick.  The collide methods give exactly the results of
+    pygame.sprite.spritecollide and groupcollide, in the same order.
+"""
+
+# Import pygame.
+import pygame
+
+
+class BrickGrid:
+    """The bricks of a group, sorted into square cells of a grid."""
+
+    # Annotate object-level fields
+    _bricks: pygame.sprite.Group                            # The bricks still in play
+    _cell_size: int                                         # Width and height of a cell in pixels
+    _cells: dict[tuple[int, int], list[pygame.sprite.Sprite]]   # The bricks each cell overlaps
+    _order: dict[pygame.sprite.Sprite, int]                 # The place of each brick in the group
+    tests: int                                              # Sprite and brick pairs tested
+
+    def __init__(self, bricks: pygame.sprite.Group, cell_size: int) -> None:
+        """Put every brick in bricks into a grid of cell_size cells."""
+        self._bricks = bricks
+        self._cell_size = cell_size
+        self._cells = {}
+        self._order = {}
+        self.tests = 0
+        brick: pygame.sprite.Sprite
+        cell: tuple[int, int]
+        for brick in bricks.sprites():
+            self._order[brick] = len(self._order)
+            for cell in self._get_cells(self._get_area(brick)):
+                self._cells.setdefault(cell, []).append(brick)
+
+    def _get_cells(self, rect: pygame.Rect) -> list[tuple[int, int]]:
+        """Return every cell that rect overlaps."""
+        col: int
+        row: int
+        return [(col, row)
+                for row in range(rect.top // self._cell_size,
+                                 (rect.bottom - 1) // self._cell_size + 1)
+                for col in range(rect.left // self._cell_size,
+                                 (rect.right - 1) // self._cell_size + 1)]
+
+    def _get_area(self, sprite: pygame.sprite.Sprite) -> pygame.Rect:
+        """Return the area sprite can collide in: its rect, and its mask
+           if it has one, which is placed at the rect's top left."""
+        if hasattr(sprite, "mask"):
+            return sprite.rect.union(pygame.Rect(sprite.rect.topleft,
+                                                 sprite.mask.get_size()))
+        return sprite.rect
+
+    def remove(self, brick: pygame.sprite.Sprite) -> None:
+        """Take brick out of the grid."""
+        cell: tuple[int, int]
+        if self._order.pop(brick, None) is not None:
+            for cell in self._get_cells(self._get_area(brick)):
+                self._cells[cell].remove(brick)
+
+    def get_nearby(self, sprite: pygame.sprite.Sprite) -> list[pygame.sprite.Sprite]:
+        """Return the bricks in the cells sprite covers, in the order of
+           the group.  Bricks that have left the group are taken out."""
+        nearby: set[pygame.sprite.Sprite] = set()
+        cell: tuple[int, int]
+        for cell in self._get_cells(self._get_area(sprite)):
+            nearby.update(self._cells.get(cell, []))
+        brick: pygame.sprite.Sprite
+        for brick in [brick for brick in nearby if brick not in self._bricks]:
+            self.remove(brick)
+            nearby.discard(brick)
+        return sorted(nearby, key=self._order.__getitem__)
+
+    def spritecollide(self, sprite: pygame.sprite.Sprite, dokill: bool,
+                      collided=None) -> list[pygame.sprite.Sprite]:
+        """Return the bricks sprite collides with, like
+           pygame.sprite.spritecollide(sprite, bricks, dokill, collided)."""
+        if collided is None:
+            collided = pygame.sprite.collide_rect
+        hits: list[pygame.sprite.Sprite] = []
+        brick: pygame.sprite.Sprite
+        for brick in self.get_nearby(sprite):
+            self.tests += 1
+            if collided(sprite, brick):
+                hits.append(brick)
+                if dokill:
+                    brick.kill()
+                    self.remove(brick)
+        return hits
+
+    def groupcollide(self, group: pygame.sprite.Group, dokill: bool,
+                     dokill_bricks: bool, collided=None) -> dict:
+        """Return the bricks each sprite in group collides with, like
+           pygame.sprite.groupcollide(group, bricks, dokill, dokill_bricks,
+           collided)."""
+        crashed: dict = {}
+        sprite: pygame.sprite.Sprite
+        hits: list[pygame.sprite.Sprite]
+        for sprite in group.sprites():
+            hits = self.spritecollide(sprite, dokill_bricks, collided)
+            if hits:
+                crashed[sprite] = hits
+                if dokill:
+                    sprite.kill()
+        return crashed
+
+    def brickcollide(self, group: pygame.sprite.Group, dokill_bricks: bool,
+                     dokill: bool, collided=None) -> dict:
+        """Return the sprites in group each brick collides with, like
+           pygame.sprite.groupcollide(bricks, group, dokill_bricks, dokill,
+           collided)."""
+        if collided is None:
+            collided = pygame.sprite.collide_rect
+        # Find the sprites near each brick, in the order of the group.
+        nearby: dict[pygame.sprite.Sprite, list[pygame.sprite.Sprite]] = {}
+        sprite: pygame.sprite.Sprite
+        brick: pygame.sprite.Sprite
+        for sprite in group.sprites():
+            for brick in self.get_nearby(sprite):
+                nearby.setdefault(brick, []).append(sprite)
+        crashed: dict = {}
+        hits: list[pygame.sprite.Sprite]
+        for brick in sorted(nearby, key=self._order.__getitem__):
+            hits = []
+            for sprite in nearby[brick]:
+                # A sprite killed by an earlier brick can't be hit again.
+                if sprite in group:
+                    self.tests += 1
+                    if collided(brick, sprite):
+                        hits.append(sprite)
+                        if dokill:
+                            sprite.kill()
+            if hits:
+                crashed[brick] = hits
+                if dokill_bricks:
+                    brick.kill()
+                    self.remove(brick)
+        return crashed
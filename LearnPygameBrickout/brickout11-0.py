@@ -1,17 +1,32 @@
 
+# Import libraries
+import argparse
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Run without a window or sound when simulating games.
+if "--headless" in sys.argv:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
 # Pygame setup
 import pygame
 pygame.init()
 pygame.display.init()
 pygame.mixer.init()
 
-# Import libraries
-import random
-from pathlib import Path
-
 # Import PowerUp and Droppable code
 from powerups11 import PowerUp, PowerupFactory, Droppable, DroppableFactory
 
+# Import the sound bank, text cache and brick grid
+from sound_bank import SoundBank
+from text_cache import TextCache
+from brick_grid import BrickGrid
+
 
 class Laser(pygame.sprite.Sprite):
     """A single laser that moves upward and disappears at the top of the screen."""
@@ -24,13 +39,8 @@ class Laser(pygame.sprite.Sprite):
         self.rect.bottom = y
         self.rect.centerx = x
         self._dy = dy
-        sound_folder: Path = Path("sound")
-        self._sound = pygame.mixer.Sound(sound_folder / "laser.wav")
         self.mask = pygame.mask.from_surface(self.image)
 
-    def play_sound(self) -> None:
-        pygame.mixer.Sound.play(self._sound)
-
     def update(self) -> None:
         self.rect.y += self._dy
         if self.rect.bottom <= 0:
@@ -42,52 +52,75 @@ class LaserManager:
         self._cooldown = 500
         self._last_shot_time = None
 
-    def update(self, keys: pygame.key.ScancodeWrapper, paddle: "Paddle",
-                   laser_group: pygame.sprite.Group) -> None:
-        if keys[pygame.K_UP]:
-            now: int = pygame.time.get_ticks()
-
+    def update(self, inputs: "Inputs", now: int, paddle: "Paddle",
+                   laser_group: pygame.sprite.Group, events: list) -> None:
+        if inputs.fire:
             if (self._last_shot_time is None or
                 now - self._last_shot_time >= self._cooldown):
                 laser: Laser = Laser(paddle.rect.centerx, paddle.rect.top)
                 laser_group.add(laser)
-                laser.play_sound()
+                events.append(("laser", laser))
                 self._last_shot_time = now
 
 class Scoreboard(pygame.sprite.Sprite):
-    """Displays the points and balls."""
+    """Displays the points and balls.  The image is only redrawn when one of
+       them changes, from text pieces that are rendered once each."""
     def __init__(self, balls: int, x: int, y: int, screen: pygame.Surface) -> None:
         super().__init__()
         self._points = 0
         self._balls = balls
         self._font = pygame.font.SysFont("Courier New", 32)
-        self._create_surface(screen, x, y)
-
-    def _create_surface(self, screen: pygame.Surface, x: int, y: int) -> None:
-        left_score: pygame.Surface = self._font.render(f"score {self._points}",
-                                       True, (255, 255, 255), (0, 0, 0))
-        right_score: pygame.Surface = self._font.render(f"balls {self._balls}",
-                                       True, (255, 255, 255), (0, 0, 0))
-
+        self._text = TextCache(self._font, (255, 255, 255))
         self.image = pygame.Surface((screen.get_width() - x * 2,
-                                     left_score.get_height()))
-        self.image.blit(left_score, (0, 0))
-        self.image.blit(right_score, (self.image.get_width() -
-                                      right_score.get_width(), 0))
+                                     self._text.get_size("score ", "0")[1]))
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
+        self._changed = False
+        self._draw_image()
+        self._dirty_rect = self.rect.copy()
+
+    def _draw_image(self) -> None:
+        """Draw the points on the left and the balls on the right."""
+        self.image.fill((0, 0, 0))
+        self._text.draw(self.image, (0, 0), "score ", *str(self._points))
+        right_score: tuple[str] = ("balls ", *str(self._balls))
+        self._text.draw(self.image, (self.image.get_width() -
+                                     self._text.get_size(*right_score)[0], 0),
+                        *right_score)
 
     def add_points(self, points: int) -> None:
-        self._points += points
+        if points:
+            self._points += points
+            self._changed = True
 
     def lose_ball(self) -> None:
-        self._balls = max(0, self._balls - 1)
+        if self._balls > 0:
+            self._balls -= 1
+            self._changed = True
 
     def game_over(self) -> None:
         return self._balls == 0
 
+    def get_points(self) -> int:
+        return self._points
+
+    def get_balls(self) -> int:
+        return self._balls
+
+    def get_dirty_rect(self) -> pygame.Rect | None:
+        """Return the area that changed since the scoreboard was last
+           drawn, or None."""
+        return self._dirty_rect
+
+    def set_drawn(self) -> None:
+        """Note that the scoreboard has been drawn."""
+        self._dirty_rect = None
+
     def update(self, screen: pygame.Surface) -> None:
-        self._create_surface(screen, self.rect.left, self.rect.top)
+        if self._changed:
+            self._draw_image()
+            self._changed = False
+            self._dirty_rect = self.rect.copy()
 
 class Brick(pygame.sprite.Sprite):
     """An individual brick.  The goal of the game is to destroy all bricks.
@@ -113,19 +146,35 @@ class Paddle(pygame.sprite.Sprite):
     STILL: int = 0
     MOVING_RIGHT: int = 1
     MOVING_LEFT: int = 2
-
-    def _make_image(self, width: int, height: int,
-                    x: int, y: int) -> None:
-        self.image = pygame.Surface((width, height))
-        self.image.fill(self._base_color)
+    # How many images and masks to keep for widths and colors seen recently.
+    IMAGE_CACHE_SIZE: int = 8
+
+    def _draw_image(self, width: int, height: int) -> tuple[pygame.Surface,
+                                                           pygame.mask.Mask]:
+        """Return a new image and mask for width and the current colors."""
+        image = pygame.Surface((width, height))
+        image.fill(self._base_color)
         for color, location in self._colors.items():
             splat = self._splat_mask.to_surface(setcolor = color,
                                                 unsetcolor = (0,0,0,0))
             splat_x = location[0] - splat.get_width() // 2
             splat_y = location[1]
-            self.image.blit(splat, (splat_x, splat_y))
+            image.blit(splat, (splat_x, splat_y))
+        return image, pygame.mask.from_surface(image)
 
-        self.mask = pygame.mask.from_surface(self.image)
+    def _make_image(self, width: int, height: int,
+                    x: int, y: int) -> None:
+        """Use the image and mask for width and the current colors, only
+           drawing them if they aren't in the cache."""
+        key: tuple = (width, frozenset(self._colors.items()))
+        if key in self._images:
+            self._images.move_to_end(key)
+        else:
+            self._images[key] = self._draw_image(width, height)
+            self.rebuilds += 1
+            if len(self._images) > Paddle.IMAGE_CACHE_SIZE:
+                self._images.popitem(last=False)
+        self.image, self.mask = self._images[key]
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
@@ -137,6 +186,8 @@ class Paddle(pygame.sprite.Sprite):
         self._splat_mask = pygame.mask.from_surface(splat)
         self._colors = {}
         self._base_color = (0, 0, 255)
+        self._images = OrderedDict()
+        self.rebuilds = 0
         self._make_image(width, height, x, y)
         self._dx = dx
         self._moving = Paddle.STILL
@@ -145,9 +196,11 @@ class Paddle(pygame.sprite.Sprite):
         
     def update(self, screen: pygame.Surface) -> None:
         self._colors = self._effect_manager.get_paddle_colors()
-        new_width: float = self._base_width * self._effect_manager.get_paddle_multiplier()
+        # Surfaces are a whole number of pixels wide, so cache the image
+        # under the width it is drawn at.
+        new_width: int = int(self._base_width * self._effect_manager.get_paddle_multiplier())
         self._make_image(new_width, self.rect.height,
-                        self.rect.centerx - int(new_width / 2),
+                        self.rect.centerx - new_width // 2,
                         self.rect.top)
         if self._moving == Paddle.MOVING_LEFT:
             self.rect.left -= self._dx
@@ -158,13 +211,13 @@ class Paddle(pygame.sprite.Sprite):
             if self.rect.right >= screen.get_width():
                 self.rect.right = screen.get_width()
 
-    def set_moving(self, keys: pygame.key.ScancodeWrapper)-> None:
-        """Update motion according to what keys are pressed."""
-        if keys[pygame.K_LEFT] and keys[pygame.K_RIGHT]:
+    def set_moving(self, inputs: "Inputs")-> None:
+        """Update motion according to the inputs."""
+        if inputs.left and inputs.right:
             self._moving = Paddle.STILL
-        elif keys[pygame.K_LEFT]:
+        elif inputs.left:
             self._moving = Paddle.MOVING_LEFT
-        elif keys[pygame.K_RIGHT]:
+        elif inputs.right:
             self._moving = Paddle.MOVING_RIGHT
         else:
             self._moving = Paddle.STILL
@@ -189,30 +242,14 @@ class Ball(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
         self._in_play = True
-        sound_folder: Path = Path("sound")
-        self._wall_bounce = pygame.mixer.Sound(sound_folder / "boink.wav")
-        self._brick_hit = pygame.mixer.Sound(sound_folder / "square-blip-non-fade.wav")
-        self._paddle_bounce = pygame.mixer.Sound(sound_folder / "paddle_boink.wav")
-        self._out_of_play = pygame.mixer.Sound(sound_folder / "game-over.wav")
         self._effect_manager = effect_manager
         self.mask = pygame.mask.from_surface(self.image)
 
 
-    def play_wall_bounce(self) -> None:
-        pygame.mixer.Sound.play(self._wall_bounce)
-
-    def play_brick_bounce(self) -> None:
-        pygame.mixer.Sound.play(self._brick_hit)
-
-    def play_paddle_bounce(self) -> None:
-        pygame.mixer.Sound.play(self._paddle_bounce)
-
-    def play_out_of_play(self) -> None:
-        pygame.mixer.Sound.play(self._out_of_play)
-
-        
-    def update(self, screen: pygame.Surface, scoreboard: Scoreboard) -> None:
-        """Change x and y by dx and dy and boundary check with screen."""
+    def update(self, screen: pygame.Surface, scoreboard: Scoreboard,
+               events: list) -> None:
+        """Change x and y by dx and dy and boundary check with screen.
+           Add what happened to events."""
         speed_multiplier: float = self._effect_manager.get_ballspeed_multiplier()
         self.rect.left += self._dx * speed_multiplier
         self.rect.top += self._dy * speed_multiplier
@@ -221,19 +258,19 @@ class Ball(pygame.sprite.Sprite):
         if self.rect.left <= 0:
             self.rect.left = 0
             self._dx *= -1
-            self.play_wall_bounce()
+            events.append(("wall_bounce", self))
         elif self.rect.right >= screen.get_width():
             self.rect.right = screen.get_width()
             self._dx *= -1
-            self.play_wall_bounce()
+            events.append(("wall_bounce", self))
         if self.rect.top <= 0:
             self.rect.top = 0
             self._dy *= -1
-            self.play_wall_bounce()
+            events.append(("wall_bounce", self))
         elif self.rect.bottom >= screen.get_height():
             self.rect.bottom = screen.get_height()
             self._dy = 0
-            self.play_out_of_play()
+            events.append(("out_of_play", self))
             scoreboard.lose_ball()
             self._in_play = False
             self.kill()
@@ -302,190 +339,368 @@ class EffectManager:
             final_multiplier *= multiplier
         return final_multiplier
  
-# Annotate variables
-screen: pygame.Surface
-background: pygame.Surface
-bricks: list[Brick]
-clock: pygame.time.Clock
-e: pygame.event.Event
-running: bool
-
-keys: pygame.key.ScancodeWrapper # like list[bool]
-i: int
-ball: Ball
-ball_group: pygame.sprite.Group
-brick: Brick
-brick_group: pygame.sprite.Group
-brick_x: int = 0
-brick_y: int = 0
-
-# Game setup
-screen = pygame.display.set_mode((600, 450))
-pygame.display.set_caption("Brickout 11.0")
-clock = pygame.time.Clock()
-
-# Asset setup.
-background = pygame.Surface((600, 450))
-effect_manager: EffectManager = EffectManager()
-
-# Create the paddle
-PADDLE_WIDTH: int = 100
-PADDLE_HEIGHT: int = 20
-paddle_dx: int = 10
-paddle_x: int = screen.get_width() // 2 - PADDLE_WIDTH // 2
-paddle_y: int = screen.get_height() - PADDLE_HEIGHT * 2
-paddle: Paddle = Paddle(PADDLE_WIDTH, PADDLE_HEIGHT, effect_manager, paddle_x, paddle_y, paddle_dx)
-paddle_group: pygame.sprite.Group = pygame.sprite.Group(paddle)
-
-# Create the ball
-ball = Ball(25, 100, 150, 5, 5, effect_manager)
-ball_group = pygame.sprite.Group(ball)
-
-# Create the bricks
-NUM_BRICKS: int = 15
-OFFSET: int = 2
-BRICK_HEIGHT: int = 20
-brick_colors: list[tuple] = [(255, 100, 100), (100, 255, 100), (100, 100, 255),
-                             (255, 255, 100), (100, 255, 255)]
-brick_group = pygame.sprite.Group()
-brick_width: int = screen.get_width() // NUM_BRICKS - OFFSET * 2
-points: int = 15
-points_decrease: int = points // len(brick_colors)
-
-x: float = OFFSET
-y: int = BRICK_HEIGHT * 2.5
-for color in brick_colors:
-    brick_surf = pygame.Surface((brick_width, BRICK_HEIGHT))
-    brick_surf.fill((color))
-    for i in range(NUM_BRICKS):
-        brick_group.add(Brick(brick_surf, effect_manager, x, y, points))
-        x += brick_width + OFFSET * 2
-    y += BRICK_HEIGHT + OFFSET
-    x = OFFSET
-    points -= points_decrease
-
-# Create the Scoreboard.
-scoreboard: Scoreboard = Scoreboard(5, 5, 5, screen) # balls, x, y, screen
-scoreboard_group: pygame.sprite.Group = pygame.sprite.Group(scoreboard)
-
-# Create laser assets.
-laser_manager: LaserManager = LaserManager()
-laser_group: pygame.sprite.Group = pygame.sprite.Group()
-
-# Create droppable assets.
-droppable_group: pygame.sprite.Group = pygame.sprite.Group()
-droppable_factory: DroppableFactory = DroppableFactory()
-
-# Create PowerUps.
-powerup_factory: PowerupFactory = PowerupFactory(effect_manager)
-powerup_group: pygame.sprite.Group = pygame.sprite.Group()
-
-# Game loop
-running = True
-while running:
-    clock.tick(30)
-    for e in pygame.event.get():
-        if e.type == pygame.QUIT:
-            running = False
-        elif e.type == pygame.KEYDOWN:
-            if (e.key == pygame.K_SPACE and not ball.in_play()
-                and not scoreboard.game_over()):
-                ball = Ball(25, random.randint(10, screen.get_width() - 10),
-                            150, 5, 5, effect_manager)
-                ball_group.add(ball)
-            
-
-    # Clear the location of bricks, paddle, and ball.
-    brick_group.clear(screen, background)
-    ball_group.clear(screen, background)
-    paddle_group.clear(screen, background)
-    scoreboard_group.clear(screen, background)
-    laser_group.clear(screen, background)
-    droppable_group.clear(screen, background)
-    powerup_group.clear(screen, background)
-
-    # Update the paddle and lasers according to what keys are pressed.
-    keys = pygame.key.get_pressed()
-    paddle.set_moving(keys)
-    paddle_group.update(screen)
-    laser_manager.update(keys, paddle, laser_group)
+class Inputs:
+    """What the player is doing during one step of the game."""
+    def __init__(self, left: bool = False, right: bool = False,
+                 fire: bool = False, launch: bool = False) -> None:
+        self.left = left
+        self.right = right
+        self.fire = fire
+        self.launch = launch
+
+    @staticmethod
+    def from_keys(keys: pygame.key.ScancodeWrapper, launch: bool) -> "Inputs":
+        """Return the inputs for the keys held down; launch is True if
+           space was pressed."""
+        return Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT],
+                      keys[pygame.K_UP], launch)
+
+class GameState:
+    """Everything in a game of Brickout.  Nothing here draws or plays
+       sounds, so a game can be stepped without a window."""
+    def __init__(self, width: int, height: int) -> None:
+        # The playing area.  Sprites only use its size; it is never drawn on.
+        self.arena = pygame.Surface((width, height))
+        self.time = 0
+        self.steps = 0
+        self.effect_manager = EffectManager()
+
+        # Create the paddle
+        PADDLE_WIDTH: int = 100
+        PADDLE_HEIGHT: int = 20
+        paddle_dx: int = 10
+        paddle_x: int = width // 2 - PADDLE_WIDTH // 2
+        paddle_y: int = height - PADDLE_HEIGHT * 2
+        self.paddle = Paddle(PADDLE_WIDTH, PADDLE_HEIGHT, self.effect_manager,
+                             paddle_x, paddle_y, paddle_dx)
+        self.paddle_group = pygame.sprite.Group(self.paddle)
+
+        # Create the ball
+        self.ball = Ball(25, 100, 150, 5, 5, self.effect_manager)
+        self.ball_group = pygame.sprite.Group(self.ball)
+
+        # Create the bricks
+        NUM_BRICKS: int = 15
+        OFFSET: int = 2
+        BRICK_HEIGHT: int = 20
+        brick_colors: list[tuple] = [(255, 100, 100), (100, 255, 100), (100, 100, 255),
+                                     (255, 255, 100), (100, 255, 255)]
+        self.brick_group = pygame.sprite.Group()
+        brick_width: int = width // NUM_BRICKS - OFFSET * 2
+        points: int = 15
+        points_decrease: int = points // len(brick_colors)
+
+        x: float = OFFSET
+        y: int = BRICK_HEIGHT * 2.5
+        for color in brick_colors:
+            brick_surf = pygame.Surface((brick_width, BRICK_HEIGHT))
+            brick_surf.fill((color))
+            for i in range(NUM_BRICKS):
+                self.brick_group.add(Brick(brick_surf, self.effect_manager, x, y, points))
+                x += brick_width + OFFSET * 2
+            y += BRICK_HEIGHT + OFFSET
+            x = OFFSET
+            points -= points_decrease
+
+        # Sort the bricks into a grid, so balls and lasers are only tested
+        # against the bricks near them.
+        BRICK_CELL_SIZE: int = 40
+        self.brick_grid = BrickGrid(self.brick_group, BRICK_CELL_SIZE)
+
+        # Create the Scoreboard.
+        self.scoreboard = Scoreboard(5, 5, 5, self.arena) # balls, x, y, screen
+        self.scoreboard_group = pygame.sprite.Group(self.scoreboard)
+
+        # Create laser assets.
+        self.laser_manager = LaserManager()
+        self.laser_group = pygame.sprite.Group()
+
+        # Create droppable assets.
+        self.droppable_group = pygame.sprite.Group()
+        self.droppable_factory = DroppableFactory()
+
+        # Create PowerUps.
+        self.powerup_factory = PowerupFactory(self.effect_manager)
+        self.powerup_group = pygame.sprite.Group()
+
+        # Where each moving sprite was before the last step.
+        self.previous = {}
+
+    def get_moving_groups(self) -> list[pygame.sprite.Group]:
+        """Return the groups whose sprites move from step to step."""
+        return [self.ball_group, self.paddle_group, self.laser_group,
+                self.droppable_group]
+
+    def is_over(self) -> bool:
+        """Return True if the last ball is gone or every brick is."""
+        return ((self.scoreboard.game_over() and not self.ball.in_play())
+                or not self.brick_group)
+
+# The size of the playing area.
+WIDTH: int = 600
+HEIGHT: int = 450
+# Physics runs in steps of a fixed length, however fast the game is drawn.
+STEPS_PER_SECOND: int = 30
+STEP_MS: float = 1000 / STEPS_PER_SECOND
+# Frames drawn each second, and the most steps run before drawing a frame.
+FRAMES_PER_SECOND: int = 60
+MAX_STEPS_PER_FRAME: int = 5
+
+def step(state: GameState, inputs: Inputs) -> list[tuple[str, pygame.sprite.Sprite]]:
+    """Move the game on by one step of STEP_MS with inputs.  Return what
+       happened as (event, sprite) pairs, for sounds or statistics."""
+    events: list[tuple[str, pygame.sprite.Sprite]] = []
+    state.steps += 1
+    # Whole milliseconds, like pygame.time.get_ticks(), so adding up steps
+    # doesn't drift.
+    state.time = state.steps * 1000 // STEPS_PER_SECOND
+    state.previous = {sprite: sprite.rect.topleft
+                      for group in state.get_moving_groups() for sprite in group}
+
+    # Launch a new ball if space was pressed.
+    if (inputs.launch and not state.ball.in_play()
+        and not state.scoreboard.game_over()):
+        state.ball = Ball(25, random.randint(10, state.arena.get_width() - 10),
+                          150, 5, 5, state.effect_manager)
+        state.ball_group.add(state.ball)
+
+    # Update the paddle and lasers according to the inputs.
+    state.paddle.set_moving(inputs)
+    state.paddle_group.update(state.arena)
+    state.laser_manager.update(inputs, state.time, state.paddle,
+                               state.laser_group, events)
 
     # Update the ball and check for brick and paddle collisions.
-    ball_group.update(screen, scoreboard)
-    balls = pygame.sprite.groupcollide(ball_group, brick_group, False, True,
-                                       pygame.sprite.collide_mask)
+    state.ball_group.update(state.arena, state.scoreboard, events)
+    balls = state.brick_grid.groupcollide(state.ball_group, False, True,
+                                          pygame.sprite.collide_mask)
     if balls:
-        for ball in balls:
-            ball.bounce()
-            ball.play_brick_bounce()
+        for hit_ball in balls:
+            hit_ball.bounce()
+            events.append(("brick_hit", hit_ball))
         # Total up the collided bricks in a set (no duplicates) and add points to scoreboard.
         all_bricks_hit = set()
         for brick_hit in balls.values():
             all_bricks_hit.update(brick_hit)
         for brick in all_bricks_hit:
-            scoreboard.add_points(brick.get_points())
+            events.append(("brick_destroyed", brick))
+            state.scoreboard.add_points(brick.get_points())
             if random.random() < .8:
-                droppable_type: str = droppable_factory.get_random_droppable_type()
-                droppable: Droppable = droppable_factory.drop(droppable_type,
-                                                              brick.rect.centerx,
-                                                              brick.rect.centery)
+                droppable_type: str = state.droppable_factory.get_random_droppable_type()
+                droppable: Droppable = state.droppable_factory.drop(droppable_type,
+                                                                    brick.rect.centerx,
+                                                                    brick.rect.centery)
                 if droppable is not None:
-                    droppable_group.add(droppable)
+                    state.droppable_group.add(droppable)
 
-    balls = pygame.sprite.groupcollide(ball_group, paddle_group, False, False,
+    balls = pygame.sprite.groupcollide(state.ball_group, state.paddle_group, False, False,
                                        pygame.sprite.collide_mask)
     for hit_ball in balls:
         hit_ball.rect.bottom = balls[hit_ball][0].rect.top
         hit_ball.bounce()
-        hit_ball.play_paddle_bounce()
-
+        events.append(("paddle_bounce", hit_ball))
 
     # Check for laser-brick collisions.
     hits: dict[Brick, Laser]
-    hits = pygame.sprite.groupcollide(brick_group, laser_group, True, True,
-                                       pygame.sprite.collide_mask)
+    hits = state.brick_grid.brickcollide(state.laser_group, True, True,
+                                         pygame.sprite.collide_mask)
     if hits:
         for brick in hits:
-            scoreboard.add_points(brick.get_points())
+            events.append(("brick_destroyed", brick))
+            state.scoreboard.add_points(brick.get_points())
 
     # Check for paddle-droppable collisions.
-    droppables = pygame.sprite.groupcollide(droppable_group, paddle_group, True, False,
-                                       pygame.sprite.collide_mask)
+    droppables = pygame.sprite.groupcollide(state.droppable_group, state.paddle_group,
+                                            True, False, pygame.sprite.collide_mask)
     for droppable, paddles in droppables.items():
-        droppable.play_sound()
+        events.append(("catch", droppable))
         paddle = paddles[0]
-        print(droppable.rect.x, paddle.rect.x, droppable.rect.y, paddle.rect.y)
-        
         offset = (droppable.rect.x - paddle.rect.x,
                   droppable.rect.y - paddle.rect.y)
-        print(offset)
         caught_x, caught_y = paddle.mask.overlap(droppable.mask, offset)
-        print(caught_x, caught_y)
         power_up: PowerUp | None
-        power_up = powerup_factory.get_powerup(droppable.get_powerup(),
-                                               droppable,
-                                               scoreboard.rect.centerx,
-                                               scoreboard.rect.centery,
-                                               caught_x, caught_y)
+        power_up = state.powerup_factory.get_powerup(droppable.get_powerup(),
+                                                     droppable,
+                                                     state.scoreboard.rect.centerx,
+                                                     state.scoreboard.rect.centery,
+                                                     caught_x, caught_y)
         if power_up is not None:
-            powerup_group.add(power_up)
-            
+            state.powerup_group.add(power_up)
+
+    # Move everything else on.
+    state.droppable_group.update(state.arena)
+    state.scoreboard_group.update(state.arena)
+    state.laser_group.update()
+    state.powerup_group.update(state.time)
+    return events
+
+def draw(state: GameState, screen: pygame.Surface, background: pygame.Surface,
+         alpha: float) -> None:
+    """Draw the game, with each moving sprite alpha of the way from where
+       it was before the last step to where it is now."""
+    # Clear the location of bricks, paddle, and ball.
+    state.brick_group.clear(screen, background)
+    state.ball_group.clear(screen, background)
+    state.paddle_group.clear(screen, background)
+    state.laser_group.clear(screen, background)
+    state.droppable_group.clear(screen, background)
+    state.powerup_group.clear(screen, background)
+
+    # Put the moving sprites between their last two positions.
+    locations: dict[pygame.sprite.Sprite, tuple[int, int]] = {}
+    for sprite, (x, y) in state.previous.items():
+        if sprite.alive():
+            locations[sprite] = sprite.rect.topleft
+            sprite.rect.topleft = (round(x + (sprite.rect.x - x) * alpha),
+                                   round(y + (sprite.rect.y - y) * alpha))
+
+    # The scoreboard is drawn into the background as well, so sprites
+    # that pass over it put it back when they are cleared, and it is only
+    # drawn when it changed.
+    dirty: pygame.Rect | None = state.scoreboard.get_dirty_rect()
+    if dirty is not None:
+        background.blit(state.scoreboard.image, dirty)
+        screen.blit(state.scoreboard.image, dirty)
+        state.scoreboard.set_drawn()
+
     # Draw the new state of bricks, paddle, and ball.
-    droppable_group.update(screen)
-    scoreboard_group.update(screen)
-    laser_group.update()
-    powerup_group.update()
-    scoreboard_group.draw(screen)
-    brick_group.draw(screen)
-    ball_group.draw(screen)
-    laser_group.draw(screen)
-    droppable_group.draw(screen)
-    paddle_group.draw(screen)
-    powerup_group.draw(screen)
-
-##    image = pygame.transform.laplacian(screen.copy())
-##    screen.blit(image, (0, 0))
-
-    pygame.display.flip()
-
-pygame.quit()
+    state.brick_group.draw(screen)
+    state.ball_group.draw(screen)
+    state.laser_group.draw(screen)
+    state.droppable_group.draw(screen)
+    state.paddle_group.draw(screen)
+    state.powerup_group.draw(screen)
+
+    # Put them back where they really are.
+    for sprite, location in locations.items():
+        sprite.rect.topleft = location
+
+def autopilot(state: GameState) -> Inputs:
+    """Return inputs that keep the paddle under the ball, fire whenever
+       they can and launch a new ball when the last one is gone."""
+    ball_x: int = state.ball.rect.centerx
+    paddle_x: int = state.paddle.rect.centerx
+    margin: int = state.paddle.rect.width // 4
+    return Inputs(ball_x < paddle_x - margin, ball_x > paddle_x + margin,
+                  True, not state.ball.in_play())
+
+def simulate(max_steps: int, seed: int) -> dict:
+    """Play one game with the autopilot, without drawing or sound, for up
+       to max_steps steps.  Return the results and how fast it ran."""
+    random.seed(seed)
+    state: GameState = GameState(WIDTH, HEIGHT)
+    counts: dict[str, int] = {}
+    start: float = time.perf_counter()
+    while state.steps < max_steps and not state.is_over():
+        for event, sprite in step(state, autopilot(state)):
+            counts[event] = counts.get(event, 0) + 1
+    seconds: float = time.perf_counter() - start
+    return {"seed": seed,
+            "steps": state.steps,
+            "game_seconds": state.time / 1000,
+            "points": state.scoreboard.get_points(),
+            "balls": state.scoreboard.get_balls(),
+            "bricks": len(state.brick_group),
+            "events": counts,
+            "steps_per_second": state.steps / seconds if seconds else 0.0}
+
+def play() -> None:
+    """Play the game in a window."""
+    # Annotate variables
+    screen: pygame.Surface
+    background: pygame.Surface
+    clock: pygame.time.Clock
+    e: pygame.event.Event
+    running: bool
+    keys: pygame.key.ScancodeWrapper # like list[bool]
+
+    # Game setup
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Brickout 11.0")
+    clock = pygame.time.Clock()
+
+    # Asset setup.
+    background = pygame.Surface((WIDTH, HEIGHT))
+
+    # Load every sound now, so nothing is read from disk during the game.
+    sound_bank: SoundBank = SoundBank(Path("sound"))
+    sound_bank.add_category("wall", 2)
+    sound_bank.add_category("brick", 2)
+    sound_bank.add_category("paddle", 1)
+    sound_bank.add_category("laser", 2)
+    sound_bank.add_category("ball", 1)
+    sound_bank.load("wall_bounce", "boink.wav", "wall")
+    sound_bank.load("brick_hit", "square-blip-non-fade.wav", "brick")
+    sound_bank.load("paddle_bounce", "paddle_boink.wav", "paddle")
+    sound_bank.load("laser", "laser.wav", "laser")
+    sound_bank.load("out_of_play", "game-over.wav", "ball")
+
+    state: GameState = GameState(WIDTH, HEIGHT)
+
+    # Game loop
+    running = True
+    launch: bool = False
+    lag: float = 0.0
+    steps: int
+    while running:
+        lag += clock.tick(FRAMES_PER_SECOND)
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT:
+                running = False
+            elif e.type == pygame.KEYDOWN:
+                if e.key == pygame.K_SPACE:
+                    launch = True
+
+        # Run as many steps as the time since the last frame covers, and
+        # play the sounds of what happened.
+        keys = pygame.key.get_pressed()
+        steps = 0
+        while lag >= STEP_MS and steps < MAX_STEPS_PER_FRAME:
+            for event, sprite in step(state, Inputs.from_keys(keys, launch)):
+                if event == "catch":
+                    sprite.play_sound()
+                elif sound_bank.has(event):
+                    sound_bank.play(event)
+            launch = False
+            lag -= STEP_MS
+            steps += 1
+        # Don't try to catch up after a long pause.
+        if steps == MAX_STEPS_PER_FRAME:
+            lag = 0.0
+
+        draw(state, screen, background, lag / STEP_MS)
+
+##        image = pygame.transform.laplacian(screen.copy())
+##        screen.blit(image, (0, 0))
+
+        pygame.display.flip()
+
+    pygame.quit()
+
+def main() -> None:
+    """Play the game, or with --headless, simulate games and print the
+       results."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Brickout 11.0")
+    parser.add_argument("--headless", action="store_true",
+                        help="simulate games with the autopilot, without a window or sound")
+    parser.add_argument("--steps", type=int, default=100000,
+                        help="the most steps to simulate a game for")
+    parser.add_argument("--games", type=int, default=1, help="how many games to simulate")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first game")
+    args: argparse.Namespace = parser.parse_args()
+    if not args.headless:
+        play()
+        return
+    seed: int
+    results: dict
+    for seed in range(args.seed, args.seed + args.games):
+        results = simulate(args.steps, seed)
+        print(f"seed {results['seed']}: {results['steps']} steps "
+              f"({results['game_seconds']:.0f} s of play), "
+              f"{results['points']} points, {results['balls']} balls and "
+              f"{results['bricks']} bricks left, "
+              f"{results['steps_per_second']:.0f} steps/s, {results['events']}")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
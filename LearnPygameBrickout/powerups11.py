@@ -215,15 +215,21 @@ class PowerUp(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.centerx = centerx
         self.rect.centery = centery
-        self._start_time = pygame.time.get_ticks()
+        self._start_time = None
         self._duration = 3000
         self.effect_manager = effect_manager
 
     def _kill_effect(self) -> None:
         pass
 
-    def update(self) -> None:
-        if (pygame.time.get_ticks() - self._start_time >= self._duration):
+    def update(self, now: int | None = None) -> None:
+        """Time the power up from its first update.  now is the time in
+           milliseconds, pygame.time.get_ticks() if it is None."""
+        if now is None:
+            now = pygame.time.get_ticks()
+        if self._start_time is None:
+            self._start_time = now
+        if (now - self._start_time >= self._duration):
             self._kill_effect()
             self.kill()
 
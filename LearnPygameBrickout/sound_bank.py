@@ -0,0 +1,86 @@
+"""
+    Sounds for Brickout that are loaded once, when the game starts, and
+    shared by every sprite that plays them.  Each category of sound (wall,
+    brick, paddle, laser) plays on its own reserved channels, so a burst of
+    lasers can't cut off the ball's bounces.  When every channel of a
+    category is busy, the one that started playing longest ago is stopped
+    and reused.
+"""
+
+# Import Python libraries.
+from pathlib import Path
+
+# Import pygame.
+import pygame
+
+
+class SoundBank:
+    """Named sounds, each played on the channels of its category."""
+
+    # Annotate class-level constants
+    # Channels left unreserved for sounds played outside the bank.
+    FREE_CHANNELS: int = 4
+
+    # Annotate object-level fields
+    _folder: Path                                       # Where the sound files are
+    _sounds: dict[str, tuple[pygame.mixer.Sound, str]]  # The sound and category for each name
+    _channels: dict[str, list[pygame.mixer.Channel]]    # Each category's channels, least recently started first
+    _reserved: int                                      # Channels reserved for all the categories
+    plays: int                                          # Sounds played
+    stolen: int                                         # Sounds that stopped another to play
+
+    def __init__(self, folder: Path) -> None:
+        """Create a bank of the sound files in folder.  There are no
+           categories or sounds yet."""
+        self._folder = folder
+        self._sounds = {}
+        self._channels = {}
+        self._reserved = 0
+        self.plays = 0
+        self.stolen = 0
+
+    def add_category(self, category: str, voices: int) -> None:
+        """Reserve voices channels for the sounds of category."""
+        first: int = self._reserved
+        self._reserved += voices
+        if pygame.mixer.get_num_channels() < self._reserved + SoundBank.FREE_CHANNELS:
+            pygame.mixer.set_num_channels(self._reserved + SoundBank.FREE_CHANNELS)
+        pygame.mixer.set_reserved(self._reserved)
+        i: int
+        self._channels[category] = [pygame.mixer.Channel(i)
+                                    for i in range(first, self._reserved)]
+
+    def load(self, name: str, file_name: str, category: str) -> None:
+        """Load file_name from the folder as the sound called name, played
+           on the channels of category."""
+        if category not in self._channels:
+            raise KeyError(f"no channels for {category} sounds")
+        self._sounds[name] = (pygame.mixer.Sound(self._folder / file_name), category)
+
+    def has(self, name: str) -> bool:
+        """Return True if there is a sound called name."""
+        return name in self._sounds
+
+    def get(self, name: str) -> pygame.mixer.Sound:
+        """Return the sound called name."""
+        return self._sounds[name][0]
+
+    def play(self, name: str) -> None:
+        """Play the sound called name on a free channel of its category, or
+           on the one that started longest ago if none are free."""
+        sound: pygame.mixer.Sound
+        category: str
+        sound, category = self._sounds[name]
+        channels: list[pygame.mixer.Channel] = self._channels[category]
+        channel: pygame.mixer.Channel
+        free: list[pygame.mixer.Channel] = [channel for channel in channels
+                                            if not channel.get_busy()]
+        if free:
+            channel = free[0]
+        else:
+            channel = channels[0]
+            self.stolen += 1
+        channel.play(sound)
+        channels.remove(channel)
+        channels.append(channel)
+        self.plays += 1
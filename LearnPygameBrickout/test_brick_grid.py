@@ -0,0 +1,147 @@
+"""
+    Check that BrickGrid finds exactly the collisions that
+    pygame.sprite.groupcollide finds, in the same order and killing the
+    same sprites, for many random brick layouts, balls and lasers.  Then
+    time both on a dense layout with many balls.
+"""
+
+# Import libraries
+import random
+import time
+
+# Import and initialize pygame.
+import pygame
+pygame.init()
+
+# Import the brick grid
+from brick_grid import BrickGrid
+
+# Define constants
+WIDTH: int = 600
+HEIGHT: int = 450
+CELL_SIZE: int = 40
+NUM_TESTS: int = 500
+
+
+class Block(pygame.sprite.Sprite):
+    """A brick, ball or laser with an id, so the results of two copies of
+       a layout can be compared."""
+    def __init__(self, sprite_id: int, image: pygame.Surface,
+                 x: int, y: int) -> None:
+        super().__init__()
+        self.sprite_id = sprite_id
+        self.image = image
+        self.rect = self.image.get_rect()
+        self.rect.topleft = (x, y)
+        self.mask = pygame.mask.from_surface(self.image)
+
+
+def make_layout(seed: int, num_balls: int,
+                num_lasers: int) -> tuple[pygame.sprite.Group, pygame.sprite.Group,
+                                          pygame.sprite.Group]:
+    """Return groups of bricks, balls and lasers placed at random."""
+    rng: random.Random = random.Random(seed)
+    brick_width: int = rng.randint(10, 60)
+    brick_height: int = rng.randint(8, 30)
+    brick_image: pygame.Surface = pygame.Surface((brick_width, brick_height))
+    brick_image.fill((255, 100, 100))
+    ball_size: int = rng.randint(5, 40)
+    ball_image: pygame.Surface = pygame.Surface((ball_size, ball_size))
+    ball_image.set_colorkey((0, 0, 0))
+    pygame.draw.circle(ball_image, (255, 255, 255),
+                       (ball_size // 2, ball_size // 2), ball_size // 2)
+    laser_image: pygame.Surface = pygame.Surface((5, 10))
+    laser_image.fill((255, 255, 255))
+
+    bricks: pygame.sprite.Group = pygame.sprite.Group()
+    next_id: int = 0
+    x: int
+    y: int
+    for y in range(rng.randint(0, 40), HEIGHT // 2, brick_height + rng.randint(0, 4)):
+        for x in range(rng.randint(0, 10), WIDTH, brick_width + rng.randint(0, 4)):
+            if rng.random() < 0.9:
+                bricks.add(Block(next_id, brick_image, x, y))
+                next_id += 1
+    balls: pygame.sprite.Group = pygame.sprite.Group()
+    for i in range(num_balls):
+        balls.add(Block(next_id, ball_image, rng.randint(-ball_size, WIDTH),
+                        rng.randint(-ball_size, HEIGHT)))
+        next_id += 1
+    lasers: pygame.sprite.Group = pygame.sprite.Group()
+    for i in range(num_lasers):
+        lasers.add(Block(next_id, laser_image, rng.randint(-5, WIDTH),
+                         rng.randint(-10, HEIGHT)))
+        next_id += 1
+    return bricks, balls, lasers
+
+
+def get_ids(crashed: dict) -> list[tuple[int, list[int]]]:
+    """Return the ids in a groupcollide result, in order."""
+    return [(sprite.sprite_id, [hit.sprite_id for hit in hits])
+            for sprite, hits in crashed.items()]
+
+
+def get_group_ids(*groups: pygame.sprite.Group) -> list[list[int]]:
+    """Return the ids of the sprites left in groups."""
+    return [[sprite.sprite_id for sprite in group] for group in groups]
+
+
+# Annotate variables
+test_num: int
+failures: int = 0
+grid: BrickGrid
+bricks: pygame.sprite.Group
+balls: pygame.sprite.Group
+lasers: pygame.sprite.Group
+expected: list
+found: list
+
+# Compare the grid with groupcollide for random layouts and kill settings.
+for test_num in range(NUM_TESTS):
+    kill_balls: bool = test_num % 2 == 1
+    kill_lasers: bool = test_num % 4 >= 2
+    collided = pygame.sprite.collide_mask if test_num % 8 < 4 else None
+
+    # Collide balls, then lasers, with pygame.sprite.groupcollide.
+    bricks, balls, lasers = make_layout(test_num, 1 + test_num % 12, test_num % 20)
+    expected = [get_ids(pygame.sprite.groupcollide(balls, bricks, kill_balls, True,
+                                                   collided)),
+                get_ids(pygame.sprite.groupcollide(bricks, lasers, True, kill_lasers,
+                                                   collided)),
+                get_group_ids(bricks, balls, lasers)]
+
+    # Do the same with a brick grid over a copy of the same layout.
+    bricks, balls, lasers = make_layout(test_num, 1 + test_num % 12, test_num % 20)
+    grid = BrickGrid(bricks, CELL_SIZE)
+    found = [get_ids(grid.groupcollide(balls, kill_balls, True, collided)),
+             get_ids(grid.brickcollide(lasers, True, kill_lasers, collided)),
+             get_group_ids(bricks, balls, lasers)]
+
+    if found != expected:
+        failures += 1
+        print(f"Test {test_num} failed")
+        print("Generated output: " + str(found))
+        print("Expected output:  " + str(expected))
+        print("\n" + "*"*50)
+
+print(f"{NUM_TESTS - failures} of {NUM_TESTS} layouts matched groupcollide")
+
+# Time both on a dense layout with many balls, without destroying anything.
+NUM_FRAMES: int = 200
+start: float
+bricks, balls, lasers = make_layout(0, 50, 20)
+grid = BrickGrid(bricks, CELL_SIZE)
+start = time.perf_counter()
+for test_num in range(NUM_FRAMES):
+    pygame.sprite.groupcollide(balls, bricks, False, False, pygame.sprite.collide_mask)
+    pygame.sprite.groupcollide(bricks, lasers, False, False, pygame.sprite.collide_mask)
+print(f"groupcollide: {(time.perf_counter() - start) * 1000 / NUM_FRAMES:.3f} ms a frame, "
+      f"{len(bricks) * (len(balls) + len(lasers))} tests")
+start = time.perf_counter()
+for test_num in range(NUM_FRAMES):
+    grid.groupcollide(balls, False, False, pygame.sprite.collide_mask)
+    grid.brickcollide(lasers, False, False, pygame.sprite.collide_mask)
+print(f"BrickGrid:    {(time.perf_counter() - start) * 1000 / NUM_FRAMES:.3f} ms a frame, "
+      f"{grid.tests // NUM_FRAMES} tests")
+
+pygame.quit()
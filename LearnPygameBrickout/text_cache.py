@@ -0,0 +1,68 @@
+"""
+    Text for Brickout's HUD that is rendered once and reused.  A line of
+    text is put together from pieces (a label, then one digit at a time),
+    and each piece is only rendered the first time it is used.  When the
+    score goes from 120 to 135, no text is rendered at all.
+"""
+
+# Import pygame.
+import pygame
+
+
+class TextCache:
+    """Rendered pieces of text in one font and color."""
+
+    # Annotate object-level fields
+    _font: pygame.font.Font                 # The font to render with
+    _color: tuple[int, int, int]            # The color of the text
+    _background: tuple[int, int, int]       # The color behind the text
+    _pieces: dict[str, pygame.Surface]      # The rendered surface of each piece
+    renders: int                            # How many times a piece was rendered
+
+    def __init__(self, font: pygame.font.Font, color: tuple[int, int, int],
+                 background: tuple[int, int, int] = (0, 0, 0)) -> None:
+        """Render in font, with color text on background."""
+        self._font = font
+        self._color = color
+        self._background = background
+        self._pieces = {}
+        self.renders = 0
+
+    def get_piece(self, piece: str) -> pygame.Surface:
+        """Return the rendered piece, rendering it if it is new."""
+        surface: pygame.Surface | None = self._pieces.get(piece)
+        if surface is None:
+            surface = self._font.render(piece, True, self._color, self._background)
+            self._pieces[piece] = surface
+            self.renders += 1
+        return surface
+
+    def get_size(self, *pieces: str) -> tuple[int, int]:
+        """Return the width and height of pieces side by side."""
+        piece: str
+        surfaces: list[pygame.Surface] = [self.get_piece(piece) for piece in pieces]
+        surface: pygame.Surface
+        return (sum(surface.get_width() for surface in surfaces),
+                max([surface.get_height() for surface in surfaces], default=0))
+
+    def draw(self, surface: pygame.Surface, location: tuple[int, int],
+             *pieces: str) -> pygame.Rect:
+        """Draw pieces side by side onto surface, starting at location, and
+           return the area drawn."""
+        x: int = location[0]
+        height: int = 0
+        piece: str
+        rendered: pygame.Surface
+        for piece in pieces:
+            rendered = self.get_piece(piece)
+            surface.blit(rendered, (x, location[1]))
+            x += rendered.get_width()
+            height = max(height, rendered.get_height())
+        return pygame.Rect(location, (x - location[0], height))
+
+    def render(self, *pieces: str) -> pygame.Surface:
+        """Return a new surface with pieces side by side."""
+        surface: pygame.Surface = pygame.Surface(self.get_size(*pieces))
+        surface.fill(self._background)
+        self.draw(surface, (0, 0), *pieces)
+        return surface
@@ -2,13 +2,22 @@
 
 # Imports and initialize pygame.
 import pygame
-import io
 import math
-
-# Libraries to interface with the microbit
-from kaspersmicrobit import KaspersMicrobit
-from kaspersmicrobit.services.accelerometer import AccelerometerData
-from kaspersmicrobit.services.buttons import ButtonState
+import os
+import sys
+from typing import TYPE_CHECKING
+
+# Libraries to interface with the microbit.  KaspersMicrobit is imported in
+# main only when a real micro:bit is used, so replays run without it.
+if TYPE_CHECKING:
+    from kaspersmicrobit.services.accelerometer import AccelerometerData
+    from kaspersmicrobit.services.buttons import ButtonState
+
+# Import the loader for text and binary tile maps, kept in Respawn Invincibility's packages.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Respawn Invincibility"))
+from packages.tile_map import TileMap, load_map
+# Import the accelerometer input adapter and the replaying stand-in micro:bit.
+from sensor_input import AccelerometerInput, FakeMicrobit
 
 pygame.init()
 
@@ -51,38 +60,31 @@ class ScrollingBackground(pygame.sprite.Sprite):
         """Load map and build Surface."""
         # Annotate and initialize local variables
         name: str
-        line: str
         tile_size: int
         width: int
         height: int
         x: int = 0
         y: int = 0
-        terrain: io.TextIOWrapper
         # Superclass init.
         super().__init__()
         # Load the images to pygame Surfaces.
         tiles: list = []
         for name in tile_files:
             tiles.append(pygame.image.load(name).convert())
-        # Load the terrain map into a 2D list.
-        terrain_map: list = []
-        with open(terrain_file) as terrain:
-            line = terrain.readline()
-            while line != "":
-                terrain_map.append(line.split())
-                line = terrain.readline()
+        # Load the terrain map, which can be a text or binary map.
+        terrain_map: TileMap = load_map(terrain_file)
         # Calculate the size of the Surface and create.
         tile_size = tiles[0].get_width()
-        width = len(terrain_map[0]) * tile_size
-        height = len(terrain_map) * tile_size
+        width = terrain_map.cols * tile_size
+        height = terrain_map.rows * tile_size
         self.image = pygame.Surface((width, height)) 
         # Blit the images to the Surface.
         # Create a Block if necessary.
         self._bricks = []
-        for row in terrain_map:
+        for row in terrain_map.get_rows():
             for i in row:
-                self.image.blit(tiles[int(i)], (x, y))
-                if int(i) in bricks:
+                self.image.blit(tiles[i], (x, y))
+                if i in bricks:
                     self._bricks.append(Brick(x, y, tile_size, tile_size))
                 x += tile_size
             y += tile_size
@@ -287,24 +289,23 @@ def make_window(width: int, height: int, caption: str) -> pygame.Surface:
     pygame.display.set_caption(caption)
     return screen
 
-def print_accelerometer_data(data:AccelerometerData):
+def print_accelerometer_data(data: "AccelerometerData"):
     caption:str = str(data.x) + "," + str(data.y)
     # pygame.display.set_caption(caption)
     print(caption)
 
-def post_accelerometer_event(data:AccelerometerData):
-    event_dict: dict = {"x": data.x / 1000, "y": data.y / 1000}
-    pygame.event.post(pygame.event.Event(ACCEL_EVENT, event_dict))
-
-def post_buttonapress_event(data: ButtonState):
+def post_buttonapress_event(data: "ButtonState"):
     #event_dict: dict = {}
     pygame.event.post(pygame.event.Event(BUTTON_A_PRESSED))
 
 ##def post_pygame_event(button_event: int):
 ##    return lambda button: pygame.event.post(pygame.event.Event(button_event))
     
-def main() -> None:
-    """The arrow keys move the penguin or scroll."""
+def main(replay_file: str | None = None, show_stats: bool = False) -> None:
+    """The arrow keys move the penguin or scroll.  If replay_file is
+       given, its accelerometer samples are played instead of a micro:bit's.
+       If show_stats is True, the accelerometer's sample and latency counts
+       are printed at the end."""
     # Annotate and initialize variables.
     SCREEN_SIZE: int = 480
     screen: pygame.Surface
@@ -318,6 +319,7 @@ def main() -> None:
     scroll_threshold: int = 100
     direction: int = NOT_MOVING
     scroll_dir: int = NOT_MOVING
+    accelerometer: AccelerometerInput = AccelerometerInput(ACCEL_EVENT)
     
     # Set up assets.
     screen = make_window(SCREEN_SIZE, SCREEN_SIZE, "Scrolling Background")
@@ -330,15 +332,23 @@ def main() -> None:
     clock: pygame.time.Clock = pygame.time.Clock()
 
 
-    # Find the microbit.
-    with KaspersMicrobit.find_one_microbit() as microbit:
+    # Find the microbit, or play back recorded samples.
+    if replay_file is None:
+        from kaspersmicrobit import KaspersMicrobit
+        device = KaspersMicrobit.find_one_microbit()
+    else:
+        device = FakeMicrobit.from_file(replay_file, repeat=True)
+    with device as microbit:
         #microbit.accelerometer.notify(print_accelerometer_data)
-        microbit.accelerometer.notify(post_accelerometer_event)
+        # Samples can come faster than frames, so only the latest
+        # one each frame becomes an event.
+        microbit.accelerometer.notify(accelerometer.on_data)
         microbit.buttons.on_button_a(press=post_buttonapress_event)
 
         while not user_quit:
             # Loop 30 times per second
             clock.tick(30)
+            accelerometer.post_event()
             for e in pygame.event.get():
                 # Process a quit choice.
                 if e.type == pygame.QUIT:
@@ -383,6 +393,11 @@ def main() -> None:
             penguin_group.draw(screen)
             pygame.display.flip()
          
+    if show_stats:
+        print(accelerometer.get_stats())
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    # Run with --stats to print the accelerometer's counts at the end.
+    args: list[str] = [arg for arg in sys.argv[1:] if arg != "--stats"]
+    main(args[0] if args else None, "--stats" in sys.argv[1:])
@@ -0,0 +1,222 @@
+"""
+    Input from the micro:bit's accelerometer for micropen.py, without
+    flooding the pygame event queue.  The micro:bit calls back on its own
+    thread for every sample, which can be many times a frame.
+    AccelerometerInput keeps only the latest sample, can smooth it and
+    ignore small tilts, and posts at most one pygame event each frame.
+    FakeMicrobit replays recorded samples, so the game can be run and
+    tested without a micro:bit.
+"""
+
+# Import Python libraries.
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+# Import pygame.
+import pygame
+
+
+class AccelerometerInput:
+    """Collects accelerometer samples from any thread and turns the latest
+       one into a single pygame event per frame.  x and y are in g."""
+
+    # Annotate class-level constants
+    # How many of the latest events the latency stats are taken over.
+    LATENCY_WINDOW: int = 1000
+
+    # Annotate object-level fields
+    _event_type: int                        # The pygame event type to post
+    _smoothing: float                       # How much of each new sample to use, 1 for no smoothing
+    _dead_zone: float                       # Tilts smaller than this, in g, count as 0
+    _lock: threading.Lock                   # Guards the latest sample and the counts
+    _latest: tuple[float, float] | None     # The newest x, y not posted yet
+    _latest_time: float                     # When the latest sample came in
+    _smoothed: tuple[float, float] | None   # The smoothed x, y
+    samples: int                            # Samples received
+    posted: int                             # Events posted
+    pending: int                            # Samples received since the last event
+    max_pending: int                        # The most samples that were folded into one event
+    _latencies: deque[float]                # Seconds from a sample coming in to its event being posted, for the latest events
+
+    def __init__(self, event_type: int, smoothing: float = 1.0,
+                 dead_zone: float = 0.0) -> None:
+        """Post events of event_type.  Each posted sample is smoothing times
+           the new sample plus 1 - smoothing times the last one posted."""
+        self._event_type = event_type
+        self._smoothing = smoothing
+        self._dead_zone = dead_zone
+        self._lock = threading.Lock()
+        self._latest = None
+        self._latest_time = 0.0
+        self._smoothed = None
+        self.samples = 0
+        self.posted = 0
+        self.pending = 0
+        self.max_pending = 0
+        self._latencies = deque(maxlen=AccelerometerInput.LATENCY_WINDOW)
+
+    def add_sample(self, x: float, y: float) -> None:
+        """Keep x, y as the latest sample, replacing any not posted yet.
+           Safe to call from any thread."""
+        with self._lock:
+            self._latest = (x, y)
+            self._latest_time = time.perf_counter()
+            self.samples += 1
+            self.pending += 1
+
+    def on_data(self, data) -> None:
+        """The callback for microbit.accelerometer.notify.  The micro:bit
+           reports in thousandths of a g."""
+        self.add_sample(data.x / 1000, data.y / 1000)
+
+    def post_event(self) -> bool:
+        """Post one event with the latest sample, if there is a new one.
+           Call once per frame.  Return True if an event was posted."""
+        latest: tuple[float, float] | None
+        with self._lock:
+            latest = self._latest
+            if latest is None:
+                return False
+            self._latest = None
+            self._latencies.append(time.perf_counter() - self._latest_time)
+            self.max_pending = max(self.max_pending, self.pending)
+            self.pending = 0
+        if self._smoothed is None:
+            self._smoothed = latest
+        else:
+            self._smoothed = (self._smoothed[0] + self._smoothing * (latest[0] - self._smoothed[0]),
+                              self._smoothed[1] + self._smoothing * (latest[1] - self._smoothed[1]))
+        value: float
+        x: float
+        y: float
+        x, y = [0.0 if abs(value) < self._dead_zone else value for value in self._smoothed]
+        pygame.event.post(pygame.event.Event(self._event_type, {"x": x, "y": y}))
+        self.posted += 1
+        return True
+
+    def get_stats(self) -> dict[str, float]:
+        """Return counts of samples and events, how many samples are waiting,
+           and the mean and largest latency in milliseconds over the last
+           LATENCY_WINDOW events."""
+        with self._lock:
+            latencies: list[float] = list(self._latencies)
+            return {"samples": self.samples,
+                    "posted": self.posted,
+                    "pending": self.pending,
+                    "max_pending": self.max_pending,
+                    "mean_latency_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                    "max_latency_ms": 1000 * max(latencies) if latencies else 0.0}
+
+
+class Reading:
+    """One accelerometer sample, with x and y in thousandths of a g like
+       the micro:bit's AccelerometerData."""
+
+    # Annotate object-level fields
+    x: int
+    y: int
+    z: int
+
+    def __init__(self, x: int, y: int, z: int = 0) -> None:
+        """Create a sample."""
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class _FakeAccelerometer:
+    """The accelerometer of a FakeMicrobit."""
+
+    # Annotate object-level fields
+    callback: Callable | None   # Called with each Reading
+    notified: threading.Event   # Set once there is a callback
+
+    def __init__(self) -> None:
+        """Begin with no callback."""
+        self.callback = None
+        self.notified = threading.Event()
+
+    def notify(self, callback: Callable) -> None:
+        """Call callback with each sample."""
+        self.callback = callback
+        self.notified.set()
+
+
+class _FakeButtons:
+    """The buttons of a FakeMicrobit, which are never pressed."""
+
+    def on_button_a(self, press: Callable | None = None, **callbacks) -> None:
+        """Accept and ignore button callbacks."""
+
+
+class FakeMicrobit:
+    """A stand-in for a connected micro:bit that plays back accelerometer
+       samples on its own thread, at the times they were recorded, counted
+       from when accelerometer.notify is called.  Use it like
+       KaspersMicrobit, in a with statement."""
+
+    # Annotate object-level fields
+    accelerometer: _FakeAccelerometer
+    buttons: _FakeButtons
+    _readings: list[tuple[float, Reading]]  # Seconds after the start, and the sample
+    _repeat: bool                           # True to start over at the end
+    _stop: threading.Event                  # Set to stop playing
+    _thread: threading.Thread | None        # Plays the samples
+
+    def __init__(self, readings: list[tuple[float, Reading]], repeat: bool = False) -> None:
+        """Play readings, a list of (seconds after the start, sample).
+           Raise ValueError if they are to be repeated but take no time,
+           which would call back as fast as the thread can loop."""
+        if repeat and (not readings or readings[-1][0] <= 0):
+            raise ValueError("repeated readings must take some time")
+        self.accelerometer = _FakeAccelerometer()
+        self.buttons = _FakeButtons()
+        self._readings = readings
+        self._repeat = repeat
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def from_file(path: str, repeat: bool = False) -> "FakeMicrobit":
+        """Return a FakeMicrobit that plays the samples in path, one per
+           line as seconds,x,y with x and y in thousandths of a g."""
+        readings: list[tuple[float, Reading]] = []
+        line: str
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    seconds, x, y = line.split(",")
+                    readings.append((float(seconds), Reading(int(x), int(y))))
+        return FakeMicrobit(readings, repeat)
+
+    def _play(self) -> None:
+        """Call the accelerometer callback with each sample at its time."""
+        start: float
+        seconds: float
+        reading: Reading
+        # Don't start the clock until there is someone to call back.
+        self.accelerometer.notified.wait()
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            for seconds, reading in self._readings:
+                if self._stop.wait(max(0.0, start + seconds - time.perf_counter())):
+                    return
+                if self.accelerometer.callback is not None:
+                    self.accelerometer.callback(reading)
+            if not self._repeat:
+                return
+
+    def __enter__(self) -> "FakeMicrobit":
+        """Start playing."""
+        self._thread = threading.Thread(target=self._play, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop playing."""
+        self._stop.set()
+        self.accelerometer.notified.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,97 @@
+"""
+    Check AccelerometerInput by playing samples into it from a FakeMicrobit,
+    one batch of samples per frame.  The events posted each frame are
+    compared with the expected ones, covering many samples in one frame
+    making one event, frames with no new sample, smoothing and the dead zone.
+"""
+
+# Import libraries
+import math
+
+# Import and initialize pygame.
+import pygame
+pygame.init()
+
+# Import the accelerometer input and the stand-in micro:bit
+from sensor_input import AccelerometerInput, FakeMicrobit, Reading
+
+# Define constants
+ACCEL_EVENT: int = pygame.event.custom_type()
+# Each test is smoothing, dead zone, the samples in thousandths of a g
+# played each frame, and the x, y of the event expected each frame, or
+# None for no event.
+TESTS: list[tuple] = [
+    (1.0, 0.0, [[(100, 200), (300, -400), (500, 600)]], [(0.5, 0.6)]),
+    (1.0, 0.0, [[(100, 0)], [], [(0, -100)]], [(0.1, 0.0), None, (0.0, -0.1)]),
+    (0.5, 0.0, [[(1000, 0)], [(0, 1000)], [(0, 1000)]],
+     [(1.0, 0.0), (0.5, 0.5), (0.25, 0.75)]),
+    (0.5, 0.0, [[(1000, 0)], [(0, 0), (0, 1000)]], [(1.0, 0.0), (0.5, 0.5)]),
+    (1.0, 0.2, [[(100, -300)], [(-150, 250)], [(250, 150)]],
+     [(0.0, -0.3), (0.0, 0.25), (0.25, 0.0)]),
+    (0.5, 0.3, [[(1000, 0)], [(0, 0)], [(0, 0)]], [(1.0, 0.0), (0.5, 0.0), (0.0, 0.0)]),
+]
+
+
+def play_frame(accelerometer: AccelerometerInput, samples: list[tuple[int, int]]) -> None:
+    """Play samples from a FakeMicrobit into accelerometer and wait for
+       them all to arrive."""
+    microbit: FakeMicrobit
+    with FakeMicrobit([(0.0, Reading(x, y)) for x, y in samples]) as microbit:
+        microbit.accelerometer.notify(accelerometer.on_data)
+        microbit._thread.join()
+
+
+def get_events() -> list[tuple[float, float]]:
+    """Return the x, y of the accelerometer events in the queue."""
+    e: pygame.event.Event
+    return [(e.x, e.y) for e in pygame.event.get(ACCEL_EVENT)]
+
+
+# Annotate variables
+test_num: int
+failures: int = 0
+accelerometer: AccelerometerInput
+events: list[tuple[float, float]]
+expected: tuple[float, float] | None
+errors: list[str]
+
+# Play each test's frames and compare the events.
+pygame.display.set_mode((100, 100))
+for test_num, (smoothing, dead_zone, frames, expected_events) in enumerate(TESTS):
+    accelerometer = AccelerometerInput(ACCEL_EVENT, smoothing, dead_zone)
+    errors = []
+    get_events()
+    for frame, expected in zip(frames, expected_events):
+        play_frame(accelerometer, frame)
+        if accelerometer.post_event() != (expected is not None):
+            errors.append(f"post_event was wrong for {frame}")
+        events = get_events()
+        if expected is None and events:
+            errors.append(f"{frame} posted {events}")
+        elif expected is not None and (len(events) != 1
+                                       or not all(math.isclose(value, want, abs_tol=1e-9)
+                                                  for value, want in zip(events[0], expected))):
+            errors.append(f"{frame} posted {events}, expected {expected}")
+    stats: dict[str, float] = accelerometer.get_stats()
+    if (stats["samples"] != sum(len(frame) for frame in frames)
+            or stats["posted"] != sum(frame != [] for frame in frames)
+            or stats["max_pending"] != max(len(frame) for frame in frames)
+            or stats["pending"] != 0):
+        errors.append(f"stats are {stats}")
+    if errors:
+        failures += 1
+        print(f"Test {test_num} failed")
+        print("\n".join(errors))
+        print("\n" + "*"*50)
+
+# Repeating no samples would call back in a loop without waiting.
+try:
+    FakeMicrobit([], repeat=True)
+    failures += 1
+    print("Repeating no samples was allowed")
+except ValueError:
+    pass
+
+print(f"{len(TESTS) + 1 - failures} of {len(TESTS) + 1} tests passed")
+
+pygame.quit()
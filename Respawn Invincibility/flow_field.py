@@ -0,0 +1,137 @@
+"""
+    A flow field over a tile map, so any number of enemies can chase the
+    player without searching for a path each.  A breadth-first search from
+    the player's tile finds how many steps every open tile is from the
+    player, and it is only done again when the player moves to a new tile.
+    An enemy finds its way by looking at the neighbors of its own tile.
+"""
+
+# Import Python libraries.
+from collections import deque
+
+# Import the tile map.
+from packages.tile_map import TileMap
+
+
+class FlowField:
+    """The number of steps from each open tile of a map to a target tile,
+       moving up, down, left or right.  Points are in pixels."""
+
+    # Annotate class-level constants
+    # Distance of a tile that is blocked or can't reach the target.
+    UNREACHABLE: int = -1
+    # Steps to the neighbors of a tile.
+    STEPS: list[tuple[int, int]] = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+    # Annotate object-level fields
+    _cols: int                          # Width of the map in tiles
+    _rows: int                          # Height of the map in tiles
+    _tile_size: int                     # Width and height of a tile in pixels
+    _open: list[bool]                   # True for each tile that can be walked on, row after row
+    _distances: list[int]               # Steps from each tile to the target tile
+    _target_tile: tuple[int, int] | None    # The col, row of the target tile
+    _target: tuple[int, int]            # The target point
+    searches: int                       # How many times the distances were found
+
+    def __init__(self, tile_map: TileMap, blocked: list[int], tile_size: int) -> None:
+        """Create a flow field over tile_map, where tiles whose numbers are
+           in blocked can't be walked on.  There is no target yet."""
+        self._cols = tile_map.cols
+        self._rows = tile_map.rows
+        self._tile_size = tile_size
+        row: int
+        col: int
+        self._open = [tile_map.get(row, col) not in blocked
+                      for row in range(self._rows) for col in range(self._cols)]
+        self._distances = [FlowField.UNREACHABLE] * len(self._open)
+        self._target_tile = None
+        self._target = (0, 0)
+        self.searches = 0
+
+    def _tile_of(self, point: tuple[int, int]) -> tuple[int, int]:
+        """Return the col, row of the tile point is on."""
+        return (point[0] // self._tile_size, point[1] // self._tile_size)
+
+    def _in_map(self, col: int, row: int) -> bool:
+        """Return True if col, row is a tile of the map."""
+        return 0 <= col < self._cols and 0 <= row < self._rows
+
+    def _search(self) -> None:
+        """Find the distance of every tile from the target tile."""
+        distances: list[int] = [FlowField.UNREACHABLE] * len(self._open)
+        col: int
+        row: int
+        col, row = self._target_tile
+        if self._in_map(col, row) and self._open[row * self._cols + col]:
+            distances[row * self._cols + col] = 0
+            frontier: deque[tuple[int, int]] = deque([(col, row)])
+            next_col: int
+            next_row: int
+            while frontier:
+                col, row = frontier.popleft()
+                for next_col, next_row in [(col + dx, row + dy) for dx, dy in FlowField.STEPS]:
+                    if (self._in_map(next_col, next_row)
+                            and self._open[next_row * self._cols + next_col]
+                            and distances[next_row * self._cols + next_col] == FlowField.UNREACHABLE):
+                        distances[next_row * self._cols + next_col] = distances[row * self._cols + col] + 1
+                        frontier.append((next_col, next_row))
+        self._distances = distances
+        self.searches += 1
+
+    def is_open(self, rect: tuple[int, int, int, int]) -> bool:
+        """Return True if every tile under rect (left, top, width, height in
+           pixels, so a pygame.Rect can be used) can be walked on.  Tiles off
+           the map can't.  A rect no bigger than a tile is on at most four."""
+        left: int
+        top: int
+        width: int
+        height: int
+        left, top, width, height = rect
+        col: int
+        row: int
+        for row in range(top // self._tile_size, (top + height - 1) // self._tile_size + 1):
+            for col in range(left // self._tile_size, (left + width - 1) // self._tile_size + 1):
+                if not self._in_map(col, row) or not self._open[row * self._cols + col]:
+                    return False
+        return True
+
+    def set_target(self, point: tuple[int, int]) -> None:
+        """Make point the target.  The distances are only found again if
+           point is on a different tile than the last target."""
+        self._target = point
+        tile: tuple[int, int] = self._tile_of(point)
+        if tile != self._target_tile:
+            self._target_tile = tile
+            self._search()
+
+    def get_distance(self, point: tuple[int, int]) -> int:
+        """Return the number of steps from the tile point is on to the
+           target tile, or UNREACHABLE."""
+        col: int
+        row: int
+        col, row = self._tile_of(point)
+        if not self._in_map(col, row):
+            return FlowField.UNREACHABLE
+        return self._distances[row * self._cols + col]
+
+    def get_next_point(self, point: tuple[int, int]) -> tuple[int, int] | None:
+        """Return where something at point should head for to reach the
+           target: the center of the next tile on the way, or the target
+           itself on the target tile.  Return None if the target can't be
+           reached from point."""
+        distance: int = self.get_distance(point)
+        if distance == FlowField.UNREACHABLE:
+            return None
+        if distance == 0:
+            return self._target
+        col: int
+        row: int
+        col, row = self._tile_of(point)
+        dx: int
+        dy: int
+        for dx, dy in FlowField.STEPS:
+            if (self._in_map(col + dx, row + dy)
+                    and self._distances[(row + dy) * self._cols + col + dx] == distance - 1):
+                return ((col + dx) * self._tile_size + self._tile_size // 2,
+                        (row + dy) * self._tile_size + self._tile_size // 2)
+        return None
@@ -0,0 +1,54 @@
+"""
+    Animations whose frames are loaded once and shared by every sprite
+    that plays them.  All the clips run off one tick count that the game
+    loop advances once per frame, so every sprite playing a clip shows the
+    same frame without keeping its own timer.
+"""
+
+# Import pygame.
+import pygame
+
+
+class AnimationClip:
+    """A list of same-sized frames, each shown for a number of ticks."""
+
+    # Annotate class-level fields
+    ticks: int = 0                                  # Frames the game has drawn
+    _clips: dict[tuple, "AnimationClip"] = {}       # Clips already loaded, keyed by files and ticks per frame
+
+    # Annotate object-level fields
+    frames: list[pygame.Surface]    # The frames, converted for the screen
+    size: tuple[int, int]           # The width and height of every frame
+    _ticks_per_frame: int           # Ticks each frame is shown for
+
+    def __init__(self, frames: list[pygame.Surface], ticks_per_frame: int) -> None:
+        """Create a clip of frames.  Raise ValueError if they aren't all
+           the same size."""
+        frame: pygame.Surface
+        if any(frame.get_size() != frames[0].get_size() for frame in frames):
+            raise ValueError("the frames of a clip must all be the same size")
+        self.frames = frames
+        self.size = frames[0].get_size()
+        self._ticks_per_frame = ticks_per_frame
+
+    @staticmethod
+    def load(files: list[str], ticks_per_frame: int) -> "AnimationClip":
+        """Return the clip of the images in files with convert_alpha,
+           loading them only the first time the clip is asked for."""
+        key: tuple = (tuple(files), ticks_per_frame)
+        clip: AnimationClip | None = AnimationClip._clips.get(key)
+        if clip is None:
+            file: str
+            clip = AnimationClip([pygame.image.load(file).convert_alpha() for file in files],
+                                 ticks_per_frame)
+            AnimationClip._clips[key] = clip
+        return clip
+
+    @staticmethod
+    def advance() -> None:
+        """Move every clip on by one tick; call once per frame."""
+        AnimationClip.ticks += 1
+
+    def get_frame(self) -> pygame.Surface:
+        """Return the frame showing at the current tick."""
+        return self.frames[AnimationClip.ticks // self._ticks_per_frame % len(self.frames)]
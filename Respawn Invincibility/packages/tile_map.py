@@ -0,0 +1,138 @@
+"""
+    Tile maps saved as text or as a compact binary file.
+    A text map has one row of the map per line, with the tile numbers
+    separated by spaces.  A binary map starts with a header (the number of
+    columns and rows, the tile size in pixels, and a palette of tile image
+    file names) followed by one byte per tile, row after row.  A binary map
+    is read with one read of the file, and load_map reads either kind.
+
+    Running this file converts a text map to a binary map:
+        python packages/tile_map.py castle.txt castle.tmap --tile-size 40
+               --palette floor.jpg barrier.jpg
+"""
+
+# Import Python libraries.
+import argparse
+import struct
+
+
+class TileMap:
+    """A map of tile numbers from 0 to 255."""
+
+    # Annotate class-level constants
+    MAGIC: bytes = b"TMAP"
+    # Magic, columns, rows, tile size in pixels (0 if not known), palette length.
+    HEADER: struct.Struct = struct.Struct("<4sHHHH")
+    # The length of a palette file name, which follows it.
+    NAME_LENGTH: struct.Struct = struct.Struct("<H")
+
+    # Annotate object-level fields
+    cols: int              # Width of the map in tiles
+    rows: int              # Height of the map in tiles
+    tile_size: int         # Width and height of a tile in pixels, 0 if not known
+    palette: list[str]     # The image file for each tile number, if known
+    _tiles: memoryview     # The tile numbers, row after row
+
+    def __init__(self, cols: int, rows: int, tiles: bytes | memoryview,
+                 tile_size: int = 0, palette: list[str] | None = None) -> None:
+        """Create a cols x rows map of the tile numbers in tiles."""
+        if len(tiles) != cols * rows:
+            raise ValueError(f"{len(tiles)} tiles don't make a {cols} x {rows} map")
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        self.palette = [] if palette is None else palette
+        self._tiles = memoryview(tiles)
+
+    def get(self, row: int, col: int) -> int:
+        """Return the tile number at row, col."""
+        return self._tiles[row * self.cols + col]
+
+    def get_row(self, row: int) -> memoryview:
+        """Return the tile numbers in row; iterating over it gives ints."""
+        return self._tiles[row * self.cols:(row + 1) * self.cols]
+
+    def get_rows(self) -> list[memoryview]:
+        """Return every row of the map, top to bottom."""
+        row: int
+        return [self.get_row(row) for row in range(self.rows)]
+
+    def to_bytes(self) -> bytes:
+        """Return the map in the binary format."""
+        name: str
+        encoded: bytes
+        palette: bytes = b""
+        for name in self.palette:
+            encoded = name.encode("utf-8")
+            palette += TileMap.NAME_LENGTH.pack(len(encoded)) + encoded
+        return (TileMap.HEADER.pack(TileMap.MAGIC, self.cols, self.rows, self.tile_size,
+                                    len(self.palette))
+                + palette + self._tiles.tobytes())
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "TileMap":
+        """Return the map saved in data by to_bytes.  The tiles are not
+           copied out of data."""
+        magic: bytes
+        cols: int
+        rows: int
+        tile_size: int
+        palette_length: int
+        magic, cols, rows, tile_size, palette_length = TileMap.HEADER.unpack_from(data)
+        if magic != TileMap.MAGIC:
+            raise ValueError("not a binary tile map")
+        start: int = TileMap.HEADER.size
+        palette: list[str] = []
+        length: int
+        for _ in range(palette_length):
+            (length,) = TileMap.NAME_LENGTH.unpack_from(data, start)
+            start += TileMap.NAME_LENGTH.size
+            palette.append(bytes(data[start:start + length]).decode("utf-8"))
+            start += length
+        return TileMap(cols, rows, memoryview(data)[start:], tile_size, palette)
+
+    @staticmethod
+    def from_text(text: str) -> "TileMap":
+        """Return the map in text, one row per line of space-separated
+           tile numbers."""
+        line: str
+        rows: list[list[str]] = [line.split() for line in text.splitlines() if line.strip()]
+        row: list[str]
+        return TileMap(len(rows[0]), len(rows),
+                       bytes(int(tile) for row in rows for tile in row))
+
+
+def load_map(path: str) -> TileMap:
+    """Return the map in the text or binary map file at path."""
+    with open(path, "rb") as file:
+        data: bytes = file.read()
+    if data.startswith(TileMap.MAGIC):
+        return TileMap.from_bytes(data)
+    return TileMap.from_text(data.decode("utf-8"))
+
+
+def save_map(path: str, tile_map: TileMap) -> None:
+    """Save tile_map to path in the binary format."""
+    with open(path, "wb") as file:
+        file.write(tile_map.to_bytes())
+
+
+def main() -> None:
+    """Convert the text map named on the command line to a binary map."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Convert a text tile map to a binary tile map.")
+    parser.add_argument("text_map", help="the text map to read")
+    parser.add_argument("binary_map", help="the binary map to write")
+    parser.add_argument("--tile-size", type=int, default=0, help="tile size in pixels")
+    parser.add_argument("--palette", nargs="*", default=[],
+                        help="the image file of each tile number, in order")
+    args: argparse.Namespace = parser.parse_args()
+    tile_map: TileMap = load_map(args.text_map)
+    tile_map.tile_size = args.tile_size
+    tile_map.palette = args.palette
+    save_map(args.binary_map, tile_map)
+    print(f"{args.binary_map}: {tile_map.cols} x {tile_map.rows} tiles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+    A distance field over a tile map that says how far every open tile is
+    from the nearest enemy, for picking a safe place to respawn.  The
+    enemies' tiles are the sources of a breadth-first search.  When an
+    enemy moves onto a new tile, only the tiles that are now closer to an
+    enemy are searched again; when a tile is left by its last enemy, only
+    the tiles that were closest to it are.  A second field, found once,
+    says how far every open tile is from the nearest wall, so a tile out
+    in the open is safer than one as far from the enemies in a corner.
+    Walls can wall off parts of the map, so the safest tile is only looked
+    for among the tiles the player can walk to.
+"""
+
+# Import Python libraries.
+from collections import deque
+
+# Import the tile map.
+from packages.tile_map import TileMap
+
+
+class SafetyField:
+    """The number of steps, moving up, down, left or right, from each open
+       tile of a map to the nearest enemy.  Points are in pixels."""
+
+    # Annotate class-level constants
+    # Distance of a tile that is blocked.
+    BLOCKED: int = -1
+    # Steps to the neighbors of a tile.
+    STEPS: list[tuple[int, int]] = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+    # Annotate object-level fields
+    _cols: int                      # Width of the map in tiles
+    _rows: int                      # Height of the map in tiles
+    _tile_size: int                 # Width and height of a tile in pixels
+    _open: list[bool]               # True for each tile that can be walked on, row after row
+    _regions: list[int]             # The region of open tiles each tile is in, BLOCKED if it isn't open
+    _far: int                       # Distance of a tile no enemy can reach, farther than any other
+    _clearances: list[int]          # Steps from each tile to the nearest wall or edge of the map
+    _distances: list[int]           # Steps from each tile to the nearest enemy
+    _enemies: dict[int, int]        # The number of enemies on each tile that has any
+    _stale: bool                    # True until the first search
+    _safest: dict[int, int]         # The safest tile in each region looked in
+    searches: int                   # How many times the whole field was searched
+
+    def __init__(self, tile_map: TileMap, blocked: list[int], tile_size: int) -> None:
+        """Create a field over tile_map, where tiles whose numbers are in
+           blocked can't be walked on.  There are no enemies yet."""
+        self._cols = tile_map.cols
+        self._rows = tile_map.rows
+        self._tile_size = tile_size
+        row: int
+        col: int
+        self._open = [tile_map.get(row, col) not in blocked
+                      for row in range(self._rows) for col in range(self._cols)]
+        self._far = len(self._open)
+        self._regions = self._find_regions()
+        self._clearances = self._find_clearances()
+        self._enemies = {}
+        self._stale = True
+        self._safest = {}
+        self.searches = 0
+        self._distances = []
+
+    def _get_neighbors(self, tile: int) -> list[int]:
+        """Return the tiles next to tile that are on the map."""
+        col: int = tile % self._cols
+        row: int = tile // self._cols
+        next_col: int
+        next_row: int
+        return [next_row * self._cols + next_col
+                for next_col, next_row in [(col + dx, row + dy)
+                                           for dx, dy in SafetyField.STEPS]
+                if 0 <= next_col < self._cols and 0 <= next_row < self._rows]
+
+    def _find_regions(self) -> list[int]:
+        """Number the regions of open tiles that can be walked between,
+           and return the region of each tile."""
+        regions: list[int] = [SafetyField.BLOCKED] * len(self._open)
+        region: int = 0
+        start: int
+        tile: int
+        next_tile: int
+        frontier: deque[int]
+        for start in range(len(self._open)):
+            if self._open[start] and regions[start] == SafetyField.BLOCKED:
+                regions[start] = region
+                frontier = deque([start])
+                while frontier:
+                    tile = frontier.popleft()
+                    for next_tile in self._get_neighbors(tile):
+                        if self._open[next_tile] and regions[next_tile] == SafetyField.BLOCKED:
+                            regions[next_tile] = region
+                            frontier.append(next_tile)
+                region += 1
+        return regions
+
+    def _find_clearances(self) -> list[int]:
+        """Return the number of steps from each open tile to the nearest
+           wall or edge of the map, BLOCKED for walls.  Tiles next to a
+           wall or the edge are 1 step away."""
+        clearances: list[int] = [SafetyField.BLOCKED if not is_open else self._far
+                                 for is_open in self._open]
+        tile: int
+        next_tile: int
+        frontier: deque[int] = deque()
+        for tile in range(len(self._open)):
+            if self._open[tile] and (len(self._get_neighbors(tile)) < len(SafetyField.STEPS)
+                                     or not all(self._open[next_tile]
+                                                for next_tile in self._get_neighbors(tile))):
+                clearances[tile] = 1
+                frontier.append(tile)
+        while frontier:
+            tile = frontier.popleft()
+            for next_tile in self._get_neighbors(tile):
+                if clearances[next_tile] > clearances[tile] + 1:
+                    clearances[next_tile] = clearances[tile] + 1
+                    frontier.append(next_tile)
+        return clearances
+
+    def _tile_of(self, point: tuple[int, int]) -> int | None:
+        """Return the index of the tile point is on, or None if it is off
+           the map."""
+        col: int = point[0] // self._tile_size
+        row: int = point[1] // self._tile_size
+        if 0 <= col < self._cols and 0 <= row < self._rows:
+            return row * self._cols + col
+        return None
+
+    def _spread(self, frontier: deque[int]) -> None:
+        """Search outward from the tiles in frontier, lowering the distance
+           of every tile that is closer to them than to any other enemy."""
+        tile: int
+        next_tile: int
+        while frontier:
+            tile = frontier.popleft()
+            for next_tile in self._get_neighbors(tile):
+                if self._distances[next_tile] > self._distances[tile] + 1:
+                    self._distances[next_tile] = self._distances[tile] + 1
+                    frontier.append(next_tile)
+
+    def _remove(self, removed: list[int]) -> None:
+        """Search again around the tiles in removed, which enemies have left.
+           Only the tiles that no other enemy is as close to lose their
+           distance; they get it back from the tiles around them."""
+        # Find the tiles that were as close to a removed tile as to any enemy.
+        lost: dict[int, int] = {tile: 0 for tile in removed}
+        frontier: deque[int] = deque(removed)
+        tile: int
+        next_tile: int
+        while frontier:
+            tile = frontier.popleft()
+            for next_tile in self._get_neighbors(tile):
+                if (next_tile not in lost
+                        and self._distances[next_tile] == lost[tile] + 1):
+                    lost[next_tile] = lost[tile] + 1
+                    frontier.append(next_tile)
+        # Forget their distances, then spread in again from the enemies
+        # among them and the tiles around them, nearest first.
+        edge: set[int] = set()
+        for tile in lost:
+            if tile in self._enemies:
+                self._distances[tile] = 0
+                edge.add(tile)
+            else:
+                self._distances[tile] = self._far
+        for tile in lost:
+            for next_tile in self._get_neighbors(tile):
+                if next_tile not in lost and self._open[next_tile]:
+                    edge.add(next_tile)
+        self._spread(deque(sorted(edge, key=self._distances.__getitem__)))
+
+    def _search(self) -> None:
+        """Search the whole field again from every enemy's tile."""
+        is_open: bool
+        self._distances = [self._far if is_open else SafetyField.BLOCKED
+                           for is_open in self._open]
+        tile: int
+        for tile in self._enemies:
+            self._distances[tile] = 0
+        self._spread(deque(self._enemies))
+        self._stale = False
+        self._safest.clear()
+        self.searches += 1
+
+    def set_enemies(self, points: list[tuple[int, int]]) -> None:
+        """Move the enemies to points."""
+        enemies: dict[int, int] = {}
+        point: tuple[int, int]
+        tile: int | None
+        for point in points:
+            tile = self._tile_of(point)
+            if tile is not None and self._open[tile]:
+                enemies[tile] = enemies.get(tile, 0) + 1
+        added: list[int] = [tile for tile in enemies if tile not in self._enemies]
+        removed: list[int] = [tile for tile in self._enemies if tile not in enemies]
+        self._enemies = enemies
+        if self._stale or not (added or removed):
+            return
+        if removed:
+            self._remove(removed)
+        # New enemy tiles only make tiles closer, so search out from them.
+        if added:
+            for tile in added:
+                self._distances[tile] = 0
+            self._spread(deque(added))
+        self._safest.clear()
+
+    def get_distance(self, point: tuple[int, int]) -> int:
+        """Return the number of steps from the tile point is on to the
+           nearest enemy, or BLOCKED.  A tile no enemy can reach is farther
+           than every tile an enemy can."""
+        if self._stale:
+            self._search()
+        tile: int | None = self._tile_of(point)
+        if tile is None:
+            return SafetyField.BLOCKED
+        return self._distances[tile]
+
+    def get_clearance(self, point: tuple[int, int]) -> int:
+        """Return the number of steps from the tile point is on to the
+           nearest wall or edge of the map, or BLOCKED."""
+        tile: int | None = self._tile_of(point)
+        if tile is None:
+            return SafetyField.BLOCKED
+        return self._clearances[tile]
+
+    def _get_safety(self, tile: int) -> int:
+        """Return how safe tile is: its steps to the nearest enemy plus
+           its steps to the nearest wall, or BLOCKED for a wall."""
+        if not self._open[tile]:
+            return SafetyField.BLOCKED
+        return self._distances[tile] + self._clearances[tile]
+
+    def get_safest_point(self, point: tuple[int, int]) -> tuple[int, int]:
+        """Return the center of the safest tile that can be walked to from
+           point, the one farthest from the enemies and the walls put
+           together.  If point isn't on an open tile, every open tile is
+           looked at."""
+        if self._stale:
+            self._search()
+        start: int | None = self._tile_of(point)
+        region: int = SafetyField.BLOCKED if start is None else self._regions[start]
+        tile: int
+        if region not in self._safest:
+            self._safest[region] = max([tile for tile in range(len(self._distances))
+                                        if region == SafetyField.BLOCKED
+                                        or self._regions[tile] == region],
+                                       key=self._get_safety)
+        safest: int = self._safest[region]
+        return ((safest % self._cols) * self._tile_size + self._tile_size // 2,
+                (safest // self._cols) * self._tile_size + self._tile_size // 2)
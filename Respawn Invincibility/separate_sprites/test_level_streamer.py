@@ -0,0 +1,78 @@
+"""
+    Check that LevelStreamer keeps no more levels built than it is allowed,
+    and that a level it dropped comes back the way it was left.  A player
+    wanders through more levels than fit, taking coins and letting time
+    pass in each, and every time a level is entered again its gold is
+    compared with the gold it had when it was left.
+"""
+
+# Import libraries
+import random
+
+# Import and initialize pygame.
+import pygame
+pygame.init()
+
+# Import the level streamer
+from top_down_level_transition import Level, LevelStreamer
+
+# Define constants
+NUM_LEVELS: int = 8
+MAX_LEVELS: int = 3
+NUM_VISITS: int = 60
+IMAGE_FILES: list[list[str]] = [["barrier.jpg", "floor.jpg", "floor.jpg", "floor.jpg", "floor.jpg"],
+                                ["barrier2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg"]]
+TERRAIN_FILES: list[str] = ["castle_levels.txt", "castle2_levels.txt"]
+
+
+def play(level: Level, rng: random.Random) -> None:
+    """Take some of the level's coins and let some frames go by."""
+    gold: pygame.sprite.Group = level.get_gold()
+    coin: pygame.sprite.Sprite
+    for coin in gold.sprites():
+        if rng.random() < 0.3:
+            coin.kill()
+    for _ in range(rng.randint(0, 300)):
+        gold.update(gold)
+
+
+# Annotate variables
+visit: int
+failures: int = 0
+index: int = 0
+level: Level
+left: dict[int, dict] = {}
+built: dict[int, Level] = {}
+rebuilt: int = 0
+
+# Wander through the levels, mostly to the next one up or down.
+rng: random.Random = random.Random(19)
+pygame.display.set_mode((100, 100))
+levels: LevelStreamer = LevelStreamer(
+    [(i + 1, 240, IMAGE_FILES[i % 2], TERRAIN_FILES[i % 2], [0], [2], [3], [4])
+     for i in range(NUM_LEVELS)], MAX_LEVELS)
+for visit in range(NUM_VISITS):
+    level = levels.get(index)
+    if index in built and built[index] is not level:
+        rebuilt += 1
+    built[index] = level
+    if index in left and level.get_gold_state() != left[index]:
+        failures += 1
+        print(f"Visit {visit}: level {index} came back with different gold")
+    if len(levels._levels) > MAX_LEVELS:
+        failures += 1
+        print(f"Visit {visit}: {len(levels._levels)} levels are built")
+    play(level, rng)
+    left[index] = level.get_gold_state()
+    if rng.random() < 0.1:
+        index = rng.randrange(NUM_LEVELS)
+    else:
+        index = min(max(index + rng.choice([-1, 1]), 0), NUM_LEVELS - 1)
+levels.close()
+
+if rebuilt == 0:
+    failures += 1
+    print("No level was dropped and built again")
+print(f"{NUM_VISITS - failures} of {NUM_VISITS} visits matched; {rebuilt} visits were to a level built again")
+
+pygame.quit()
@@ -2,10 +2,17 @@
 
 # Imports and initialize pygame.
 import pygame
-import io
 import math
+import os
 import random
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from student import Student
+# Import the loader for text and binary tile maps, kept in the packages one folder up.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from packages.tile_map import TileMap, load_map
 pygame.init()
 
 class Brick(pygame.sprite.Sprite):
@@ -23,6 +30,9 @@ class Brick(pygame.sprite.Sprite):
 class Gold(pygame.sprite.Sprite):
     """A goal in the game."""
 
+    # Annotate class-level constants
+    FRAME_FILES: list[str] = ["coin" + str(i) + ".png" for i in range(6)]
+
     # Annotate object-level fields
     _images: list
     _current_image: int
@@ -30,13 +40,11 @@ class Gold(pygame.sprite.Sprite):
     _disappear_timer: int
     _disappear_time: int
 
-    def __init__(self, x: int, y: int, disappear_time: int) -> None:
-        """Create a spinning coin."""
+    def __init__(self, x: int, y: int, disappear_time: int, images: list) -> None:
+        """Create a spinning coin from images, which every coin in the
+           level shares."""
         super().__init__()
-        i: int
-        self._images = []
-        for i in range(6):
-            self._images.append(pygame.image.load("coin" + str(i) + ".png").convert_alpha())
+        self._images = images
         self._current_image = 0
         self.image = self._images[self._current_image]
         self.rect = self.image.get_rect()
@@ -61,6 +69,39 @@ class Gold(pygame.sprite.Sprite):
                 self.rect = self.image.get_rect()
                 self.rect.topleft = loc
 
+    def get_state(self) -> tuple:
+        """Return what set_state needs to put a new coin in the same step
+           of its timers and animation as this one."""
+        return (self._disappear_timer, self._rotation_timer, self._current_image)
+
+    def set_state(self, state: tuple) -> None:
+        """Continue from a state returned by get_state."""
+        loc: tuple = self.rect.topleft
+        self._disappear_timer, self._rotation_timer, self._current_image = state
+        self.image = self._images[self._current_image % len(self._images)]
+        self.rect = self.image.get_rect()
+        self.rect.topleft = loc
+
+
+class LevelFiles():
+    """The files a level is built from, read but not converted for the
+       screen.  Reading them doesn't touch the display, so it can be done
+       on a worker thread; the level converts the images when it is built."""
+
+    # Annotate object-level fields.
+    tiles: list                 # The tile images, in the order of the tile files
+    coins: list                 # The frames of a spinning coin
+    terrain_map: TileMap        # The terrain map
+
+    def __init__(self, tile_files: list, terrain_file: str) -> None:
+        """Read the images in tile_files, the coin frames and the map in
+           terrain_file."""
+        # Annotate and initialize local variables
+        name: str
+        self.tiles = [pygame.image.load(name) for name in tile_files]
+        self.coins = [pygame.image.load(name) for name in Gold.FRAME_FILES]
+        self.terrain_map = load_map(terrain_file)
+
 
 class Background(pygame.sprite.Sprite):
     """A tile-based background."""
@@ -71,36 +112,28 @@ class Background(pygame.sprite.Sprite):
     _doorways_up: list
     _doorways_down: list
 
-    def __init__(self, tile_files: list, terrain_file: str,
+    def __init__(self, files: LevelFiles,
                  bricks: list, gold: list, gold_time: int,
                  doorways_up: list, doorways_down: list) -> None:
-        """Load map and build Surface."""
+        """Build Surface from the level's files."""
         # Annotate and initialize local variables
-        name: str
-        line: str
+        tile: pygame.Surface
+        coin: pygame.Surface
         tile_size: int
         width: int
         height: int
         x: int = 0
         y: int = 0
-        terrain: io.TextIOWrapper
         # Superclass init.
         super().__init__()
-        # Load the images to pygame Surfaces.
-        tiles: list = []
-        for name in tile_files:
-            tiles.append(pygame.image.load(name).convert())
-        # Load the terrain map into a 2D list.
-        terrain_map: list = []
-        with open(terrain_file) as terrain:
-            line = terrain.readline()
-            while line != "":
-                terrain_map.append(line.split())
-                line = terrain.readline()
+        # Convert the images for the screen.
+        tiles: list = [tile.convert() for tile in files.tiles]
+        coins: list = [coin.convert_alpha() for coin in files.coins]
+        terrain_map: TileMap = files.terrain_map
         # Calculate the size of the Surface and create.
         tile_size = tiles[0].get_width()
-        width = len(terrain_map[0]) * tile_size
-        height = len(terrain_map) * tile_size
+        width = terrain_map.cols * tile_size
+        height = terrain_map.rows * tile_size
         self.image = pygame.Surface((width, height)) 
         # Blit the images to the Surface.
         # Create a Brick if necessary.
@@ -108,16 +141,16 @@ class Background(pygame.sprite.Sprite):
         self._gold = []
         self._doorways_up = []
         self._doorways_down = []
-        for row in terrain_map:
+        for row in terrain_map.get_rows():
             for i in row:
-                self.image.blit(tiles[int(i)], (x, y))
-                if int(i) in bricks:
+                self.image.blit(tiles[i], (x, y))
+                if i in bricks:
                     self._bricks.append(Brick(x, y, tile_size, tile_size))
-                elif int(i) in gold:
-                    self._gold.append(Gold(x, y, gold_time))
-                elif int(i) in doorways_up:
+                elif i in gold:
+                    self._gold.append(Gold(x, y, gold_time, coins))
+                elif i in doorways_up:
                     self._doorways_up.append(Brick(x, y, tile_size, tile_size))
-                elif int(i) in doorways_down:
+                elif i in doorways_down:
                     self._doorways_down.append(Brick(x, y, tile_size, tile_size))
                 x += tile_size
             y += tile_size
@@ -162,13 +195,27 @@ class Level():
 
     def __init__(self, level: int, gold_timer: int, tile_files: list,
                  terrain_file: str, bricks: list, gold: list,
-                 doorways_up: list, doorways_down: list) -> None:
+                 doorways_up: list, doorways_down: list,
+                 files: LevelFiles | None = None,
+                 gold_state: dict | None = None) -> None:
+        """Build the level from files, reading them first if they
+           haven't been read.  If gold_state from get_gold_state is
+           given, only the gold left then is put back, as it was."""
         super().__init__()
-        self._background = Background(tile_files, terrain_file, bricks,
+        if files is None:
+            files = LevelFiles(tile_files, terrain_file)
+        self._background = Background(files, bricks,
                                       gold, gold_timer, doorways_up,
                                       doorways_down)
         self._level = level
         self._gold = pygame.sprite.Group(self._background.get_gold())
+        coin: Gold
+        if gold_state is not None:
+            for coin in self._gold.sprites():
+                if coin.rect.topleft in gold_state:
+                    coin.set_state(gold_state[coin.rect.topleft])
+                else:
+                    coin.kill()
         self._bricks = pygame.sprite.Group(self._background.get_bricks())
         self._doorways_up = pygame.sprite.Group(self._background.get_doorways_up())
         self._doorways_down = pygame.sprite.Group(self._background.get_doorways_down())
@@ -181,6 +228,12 @@ class Level():
 
     def get_gold(self) -> pygame.sprite.Group:
         return self._gold
+
+    def get_gold_state(self) -> dict:
+        """Return the state of the gold left in the level, keyed by where
+           each coin is, for building the level again later."""
+        coin: Gold
+        return {coin.rect.topleft: coin.get_state() for coin in self._gold}
                  
     def get_level(self) -> int:
         return self._level
@@ -194,6 +247,125 @@ class Level():
         return self._doorways_down
 
 
+class LevelStreamer():
+    """Reads the files of levels on a worker thread while the player is in
+       a level next to them, so going through a doorway doesn't wait for
+       the map and images to load.  Converting images for the screen isn't
+       thread-safe, so a level is built from its files on the main thread,
+       the first time it is asked for.  Up to max_levels built levels are
+       kept; past that the least recently used one that isn't the current
+       level or next to it is dropped, keeping only the state of its gold,
+       so it is built again from its files with the same gold left in it.
+       Files read ahead for a level that is no longer next to the current
+       one are dropped too."""
+
+    # Annotate object-level fields.
+    _specs: list                            # The arguments to Level for each level
+    _max_levels: int                        # How many built levels to keep
+    _levels: OrderedDict[int, Level]        # Built levels, least recently used first
+    _gold_states: dict[int, dict]           # The gold left in each dropped level
+    _files: dict[int, LevelFiles]           # Files read ahead for levels not built yet
+    _loading: dict[int, Future]             # Levels whose files are being read on the worker
+    _lock: threading.Lock                   # Guards _levels, _files and _loading
+    _executor: ThreadPoolExecutor           # The worker that reads files
+
+    def __init__(self, specs: list, max_levels: int = 3) -> None:
+        """Stream the levels made from the Level arguments in specs,
+           keeping up to max_levels of them built.  The current level and
+           the ones next to it are never dropped, so more than max_levels
+           are kept if it is less than 3.  No levels are loaded until one
+           is asked for."""
+        self._specs = specs
+        self._max_levels = max_levels
+        self._levels = OrderedDict()
+        self._gold_states = {}
+        self._files = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __len__(self) -> int:
+        """Return the number of levels, loaded or not."""
+        return len(self._specs)
+
+    def _read(self, index: int) -> LevelFiles:
+        """Read the files of level index; runs on the worker."""
+        # The tile files and terrain file are the third and fourth
+        # arguments to Level.
+        return LevelFiles(self._specs[index][2], self._specs[index][3])
+
+    def _finish(self, index: int, future: Future) -> None:
+        """Keep the files the worker finished reading, unless the read was
+           cancelled or failed, or the level has been built already."""
+        with self._lock:
+            del self._loading[index]
+            if (not future.cancelled() and future.exception() is None
+                    and index not in self._levels):
+                self._files[index] = future.result()
+
+    def _preload(self, index: int) -> None:
+        """Start reading the files of level index on the worker if the
+           level hasn't been visited or read."""
+        future: Future
+        with self._lock:
+            if (not 0 <= index < len(self._specs) or index in self._levels
+                    or index in self._files or index in self._loading):
+                return
+            future = self._executor.submit(self._read, index)
+            self._loading[index] = future
+        future.add_done_callback(lambda done: self._finish(index, done))
+
+    def _drop_files(self, index: int) -> None:
+        """Drop the files read ahead for levels that have been built or
+           aren't next to level index."""
+        with self._lock:
+            far: list[int] = [loaded for loaded in self._files
+                              if loaded in self._levels or abs(loaded - index) > 1]
+            for loaded in far:
+                del self._files[loaded]
+
+    def _drop_levels(self, index: int) -> None:
+        """Drop the least recently used levels that aren't level index or
+           next to it, keeping their gold, until no more than _max_levels
+           are built.  Call with _lock held."""
+        dropped: int
+        while len(self._levels) > self._max_levels:
+            dropped = next((built for built in self._levels if abs(built - index) > 1), -1)
+            if dropped == -1:
+                return
+            self._gold_states[dropped] = self._levels.pop(dropped).get_gold_state()
+
+    def get(self, index: int) -> Level:
+        """Return level index, building it if it isn't built, and start
+           reading the files of the levels next to it.  If its files are
+           still being read, wait for them."""
+        level: Level | None
+        files: LevelFiles | None
+        future: Future | None
+        with self._lock:
+            level = self._levels.get(index)
+            if level is not None:
+                self._levels.move_to_end(index)
+            files = self._files.pop(index, None)
+            future = self._loading.get(index)
+        if level is None:
+            if files is None:
+                files = self._read(index) if future is None else future.result()
+            level = Level(*self._specs[index], files, self._gold_states.pop(index, None))
+            with self._lock:
+                self._levels[index] = level
+        with self._lock:
+            self._drop_levels(index)
+        self._preload(index + 1)
+        self._preload(index - 1)
+        self._drop_files(index)
+        return level
+
+    def close(self) -> None:
+        """Stop the worker."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
 class Scorekeeper(pygame.sprite.Sprite):
     """Responsible for displaying an updated score."""
 
@@ -249,7 +421,8 @@ def main() -> None:
     group: pygame.sprite.Group = pygame.sprite.Group()
     user_quit: bool = False
     e: pygame.event.Event
-    levels: list
+    levels: LevelStreamer
+    level: Level
     current_level: int
     scorekeeper: Scorekeeper
     score_group: pygame.sprite.Group
@@ -259,22 +432,24 @@ def main() -> None:
     # Set up assets.
     # Note:  changed the times here after the video
     image_files: list = ["barrier.jpg", "floor.jpg", "floor.jpg", "floor.jpg", "floor.jpg"]
-    levels = [Level(1, 240, image_files, "castle_levels.txt", [0], [2], [3], [4])]
-    levels.append(Level(2, 220, ["barrier2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg"],
-                   "castle2_levels.txt", [0], [2], [3], [4]))
+    # The levels are loaded in the background, before their doorways are reached.
+    levels = LevelStreamer([(1, 240, image_files, "castle_levels.txt", [0], [2], [3], [4]),
+                            (2, 220, ["barrier2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg", "floor2.jpg"],
+                             "castle2_levels.txt", [0], [2], [3], [4])])
     current_level = 0
-    background = levels[current_level].get_background()
+    level = levels.get(current_level)
+    background = level.get_background()
     background_size: tuple = background.get_size()
     screen = make_window(background_size[0], background_size[1], "Scoring Demo")
     screen.blit(background, (0, 0))
-    bricks = levels[current_level].get_bricks()
-    gold = levels[current_level].get_gold()
-    doorways_up = levels[current_level].get_doorways_up()
-    doorways_down = levels[current_level].get_doorways_down()
+    bricks = level.get_bricks()
+    gold = level.get_gold()
+    doorways_up = level.get_doorways_up()
+    doorways_down = level.get_doorways_down()
     sam = Student(pygame.image.load("class_dash_sprite.png").convert_alpha(), 50, 50)
     group.add(sam)
     clock: pygame.time.Clock = pygame.time.Clock()
-    scorekeeper = Scorekeeper(sam, levels[current_level])
+    scorekeeper = Scorekeeper(sam, level)
     score_group = pygame.sprite.Group(scorekeeper)
     coins: list
 
@@ -313,27 +488,29 @@ def main() -> None:
             if current_level != len(levels) - 1:
                 current_level += 1
                 sam.through_doorway(screen)
-                background = levels[current_level].get_background()
+                level = levels.get(current_level)
+                background = level.get_background()
                 screen.blit(background, (0, 0))
-                bricks = levels[current_level].get_bricks()
-                gold = levels[current_level].get_gold()
-                doorways_up = levels[current_level].get_doorways_up()
-                doorways_down = levels[current_level].get_doorways_down()
+                bricks = level.get_bricks()
+                gold = level.get_gold()
+                doorways_up = level.get_doorways_up()
+                doorways_down = level.get_doorways_down()
                 # Cool if the scorekeeper knows the level -- added this
                 # after the video.
-                scorekeeper.set_level(levels[current_level])
+                scorekeeper.set_level(level)
         elif pygame.sprite.spritecollide(sam, doorways_down, False):
             if current_level > 0:
                 current_level -= 1
                 sam.through_doorway(screen)
-                background = levels[current_level].get_background()
+                level = levels.get(current_level)
+                background = level.get_background()
                 screen.blit(background, (0, 0))
-                bricks = levels[current_level].get_bricks()
-                gold = levels[current_level].get_gold()
-                doorways_up = levels[current_level].get_doorways_up()
-                doorways_down = levels[current_level].get_doorways_down()
+                bricks = level.get_bricks()
+                gold = level.get_gold()
+                doorways_up = level.get_doorways_up()
+                doorways_down = level.get_doorways_down()
                 # ... and this...
-                scorekeeper.set_level(levels[current_level])
+                scorekeeper.set_level(level)
 
         # Move, redraw, and show.
         group.clear(screen, background)
@@ -347,7 +524,9 @@ def main() -> None:
         score_group.draw(screen)
         pygame.display.flip()
          
+    levels.close()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
 
@@ -2,10 +2,15 @@
 
 # Imports and initialize pygame.
 import pygame
-import io
 import math
 import random
 pygame.init()
+# Import the loader for text and binary tile maps.
+from packages.tile_map import TileMap, load_map
+# Import the flow field enemies use to chase the player.
+from flow_field import FlowField
+# Import the shared animation frames.
+from packages.sprites.animation import AnimationClip
 
 class Brick(pygame.sprite.Sprite):
     """Just another brick..."""
@@ -22,33 +27,25 @@ class Brick(pygame.sprite.Sprite):
 class Gold(pygame.sprite.Sprite):
     """A goal in the game."""
 
+    # Annotate class-level constants
+    FRAME_FILES: list[str] = ["coin" + str(i) + ".png" for i in range(6)]
+    TICKS_PER_FRAME: int = 3
+
     # Annotate object-level fields
-    _images: list
-    _current_image: int
-    _timer: int
+    _clip: AnimationClip
 
     def __init__(self, x: int, y: int) -> None:
-        """Create a spinning coin."""
+        """Create a spinning coin.  Every coin shares the same frames."""
         super().__init__()
-        i: int
-        self._images = []
-        for i in range(6):
-            self._images.append(pygame.image.load("coin" + str(i) + ".png").convert_alpha())
-        self._current_image = 0
-        self.image = self._images[self._current_image]
+        self._clip = AnimationClip.load(Gold.FRAME_FILES, Gold.TICKS_PER_FRAME)
+        self.image = self._clip.get_frame()
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
-        self._timer = 0
 
     def update(self) -> None:
-        """Update the spinning animation."""
-        self._timer += 1
-        if self._timer % 3 == 0:
-            self._current_image += 1
-            self.image = self._images[self._current_image % len(self._images)]
-            loc: tuple = self.rect.topleft
-            self.rect = self.image.get_rect()
-            self.rect.topleft = loc
+        """Update the spinning animation.  The frames are all the same
+           size, so the rect stays the same."""
+        self.image = self._clip.get_frame()
 
 
 class Background(pygame.sprite.Sprite):
@@ -57,47 +54,44 @@ class Background(pygame.sprite.Sprite):
     # Annotate object-level fields
     _bricks: list
     _gold: list
+    _terrain_map: TileMap
+    _tile_size: int
 
     def __init__(self, tile_files: list, terrain_file: str,
                  bricks: list, gold: list) -> None:
         """Load map and build Surface."""
         # Annotate and initialize local variables
         name: str
-        line: str
         tile_size: int
         width: int
         height: int
         x: int = 0
         y: int = 0
-        terrain: io.TextIOWrapper
         # Superclass init.
         super().__init__()
         # Load the images to pygame Surfaces.
         tiles: list = []
         for name in tile_files:
             tiles.append(pygame.image.load(name).convert())
-        # Load the terrain map into a 2D list.
-        terrain_map: list = []
-        with open(terrain_file) as terrain:
-            line = terrain.readline()
-            while line != "":
-                terrain_map.append(line.split())
-                line = terrain.readline()
+        # Load the terrain map, which can be a text or binary map.
+        terrain_map: TileMap = load_map(terrain_file)
         # Calculate the size of the Surface and create.
         tile_size = tiles[0].get_width()
-        width = len(terrain_map[0]) * tile_size
-        height = len(terrain_map) * tile_size
+        self._terrain_map = terrain_map
+        self._tile_size = tile_size
+        width = terrain_map.cols * tile_size
+        height = terrain_map.rows * tile_size
         self.image = pygame.Surface((width, height)) 
         # Blit the images to the Surface.
         # Create a Brick if necessary.
         self._bricks = []
         self._gold = []
-        for row in terrain_map:
+        for row in terrain_map.get_rows():
             for i in row:
-                self.image.blit(tiles[int(i)], (x, y))
-                if int(i) in bricks:
+                self.image.blit(tiles[i], (x, y))
+                if i in bricks:
                     self._bricks.append(Brick(x, y, tile_size, tile_size))
-                elif int(i) in gold:
+                elif i in gold:
                     self._gold.append(Gold(x, y))
                 x += tile_size
             y += tile_size
@@ -119,8 +113,19 @@ class Background(pygame.sprite.Sprite):
         """Return the Surface size."""
         return self.image.get_size()
 
+    def get_tile_map(self) -> TileMap:
+        """Return the terrain map."""
+        return self._terrain_map
+
+    def get_tile_size(self) -> int:
+        """Return the width and height of a tile."""
+        return self._tile_size
+
 class Enemy(pygame.sprite.Sprite):
 
+    # Annotate class-level constants
+    CHASE_SPEED: int = 1
+
     # Annotate object-level fields
     _dx: int
     _dy: int
@@ -144,11 +149,30 @@ class Enemy(pygame.sprite.Sprite):
         self._timer = 0
         self._change_direction()
 
-    def update(self, bricks: pygame.sprite.Group) -> None:
+    def _chase(self, point: tuple[int, int], flow_field: FlowField) -> None:
+        """Move the center toward point, one direction at a time so
+           the enemy slides along walls instead of sticking to them."""
+        dx: int = max(-Enemy.CHASE_SPEED, min(Enemy.CHASE_SPEED, point[0] - self.rect.centerx))
+        dy: int = max(-Enemy.CHASE_SPEED, min(Enemy.CHASE_SPEED, point[1] - self.rect.centery))
+        self.rect.left += dx
+        if not flow_field.is_open(self.rect):
+            self.rect.left -= dx
+        self.rect.top += dy
+        if not flow_field.is_open(self.rect):
+            self.rect.top -= dy
+
+    def update(self, flow_field: FlowField) -> None:
+        """Chase the target of flow_field, or wander if it can't be reached.
+           Walls are the tiles flow_field can't walk on, so checking one is
+           a look at the few tiles under the enemy."""
+        point: tuple[int, int] | None = flow_field.get_next_point(self.rect.center)
+        if point is not None:
+            self._chase(point, flow_field)
+            return
         self.rect.top += self._dy
         self.rect.left += self._dx
         self._timer += 1
-        if pygame.sprite.spritecollide(self, bricks, False):
+        if not flow_field.is_open(self.rect):
             self.rect.top -= self._dy
             self.rect.left -= self._dx
             self._change_direction()
@@ -284,6 +308,7 @@ def main() -> None:
     score_group: pygame.sprite.Group
     enemies: pygame.sprite.Group
     enemy_image: pygame.Surface
+    flow_field: FlowField
     
     # Set up assets.
     image_files: list = ["barrier.jpg", "floor.jpg", "floor.jpg"]
@@ -302,8 +327,21 @@ def main() -> None:
     coins: list
     enemies = pygame.sprite.Group()
     enemy_image = pygame.image.load("enemy.png").convert_alpha()
-    for i in range(10):
-        enemies.add(Enemy(enemy_image, 350, 230))
+    # The enemies all chase sam with one flow field over the castle.
+    flow_field = FlowField(background.get_tile_map(), [0], background.get_tile_size())
+    # Start the enemies on the open tiles nearest their den, one to a tile,
+    # so they don't all follow the same steps as one.
+    tile_size: int = background.get_tile_size()
+    den: tuple[int, int] = (350, 230)
+    spawn_tiles: list = sorted(
+        [(col * tile_size, row * tile_size)
+         for row in range(background.get_tile_map().rows)
+         for col in range(background.get_tile_map().cols)
+         if flow_field.is_open((col * tile_size, row * tile_size, tile_size, tile_size))],
+        key=lambda tile: (tile[0] - den[0]) ** 2 + (tile[1] - den[1]) ** 2)
+    for x, y in spawn_tiles[:10]:
+        enemies.add(Enemy(enemy_image, x + (tile_size - enemy_image.get_width()) // 2,
+                          y + (tile_size - enemy_image.get_height()) // 2))
     
 
     while not user_quit:
@@ -343,9 +381,11 @@ def main() -> None:
 
         # Move, redraw, and show.
         group.update(bricks)
+        AnimationClip.advance()
         gold.update()
         score_group.update(screen)
-        enemies.update(bricks)
+        flow_field.set_target(sam.rect.center)
+        enemies.update(flow_field)
         bkgd_group.draw(screen)
         gold.draw(screen)
         group.draw(screen)
@@ -2,10 +2,14 @@
 
 # Imports and initialize pygame.
 import pygame
-import io
 import math
 import random
 pygame.init()
+# Import the tile map and the distance field used to find a safe spawn.
+from packages.tile_map import TileMap, load_map
+from safety_field import SafetyField
+# Import the shared animation frames.
+from packages.sprites.animation import AnimationClip
 
 class Brick(pygame.sprite.Sprite):
     """Just another brick..."""
@@ -22,33 +26,25 @@ class Brick(pygame.sprite.Sprite):
 class Gold(pygame.sprite.Sprite):
     """A goal in the game."""
 
+    # Annotate class-level constants
+    FRAME_FILES: list[str] = ["coin" + str(i) + ".png" for i in range(6)]
+    TICKS_PER_FRAME: int = 3
+
     # Annotate object-level fields
-    _images: list
-    _current_image: int
-    _timer: int
+    _clip: AnimationClip
 
     def __init__(self, x: int, y: int) -> None:
-        """Create a spinning coin."""
+        """Create a spinning coin.  Every coin shares the same frames."""
         super().__init__()
-        i: int
-        self._images = []
-        for i in range(6):
-            self._images.append(pygame.image.load("coin" + str(i) + ".png").convert_alpha())
-        self._current_image = 0
-        self.image = self._images[self._current_image]
+        self._clip = AnimationClip.load(Gold.FRAME_FILES, Gold.TICKS_PER_FRAME)
+        self.image = self._clip.get_frame()
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
-        self._timer = 0
 
     def update(self) -> None:
-        """Update the spinning animation."""
-        self._timer += 1
-        if self._timer % 3 == 0:
-            self._current_image += 1
-            self.image = self._images[self._current_image % len(self._images)]
-            loc: tuple = self.rect.topleft
-            self.rect = self.image.get_rect()
-            self.rect.topleft = loc
+        """Update the spinning animation.  The frames are all the same
+           size, so the rect stays the same."""
+        self.image = self._clip.get_frame()
 
 
 class Background(pygame.sprite.Sprite):
@@ -57,47 +53,44 @@ class Background(pygame.sprite.Sprite):
     # Annotate object-level fields
     _bricks: list
     _gold: list
+    _terrain_map: TileMap
+    _tile_size: int
 
     def __init__(self, tile_files: list, terrain_file: str,
                  bricks: list, gold: list) -> None:
         """Load map and build Surface."""
         # Annotate and initialize local variables
         name: str
-        line: str
         tile_size: int
         width: int
         height: int
         x: int = 0
         y: int = 0
-        terrain: io.TextIOWrapper
         # Superclass init.
         super().__init__()
         # Load the images to pygame Surfaces.
         tiles: list = []
         for name in tile_files:
             tiles.append(pygame.image.load(name).convert())
-        # Load the terrain map into a 2D list.
-        terrain_map: list = []
-        with open(terrain_file) as terrain:
-            line = terrain.readline()
-            while line != "":
-                terrain_map.append(line.split())
-                line = terrain.readline()
+        # Load the terrain map, which can be a text or binary map.
+        terrain_map: TileMap = load_map(terrain_file)
         # Calculate the size of the Surface and create.
         tile_size = tiles[0].get_width()
-        width = len(terrain_map[0]) * tile_size
-        height = len(terrain_map) * tile_size
+        self._terrain_map = terrain_map
+        self._tile_size = tile_size
+        width = terrain_map.cols * tile_size
+        height = terrain_map.rows * tile_size
         self.image = pygame.Surface((width, height)) 
         # Blit the images to the Surface.
         # Create a Brick if necessary.
         self._bricks = []
         self._gold = []
-        for row in terrain_map:
+        for row in terrain_map.get_rows():
             for i in row:
-                self.image.blit(tiles[int(i)], (x, y))
-                if int(i) in bricks:
+                self.image.blit(tiles[i], (x, y))
+                if i in bricks:
                     self._bricks.append(Brick(x, y, tile_size, tile_size))
-                elif int(i) in gold:
+                elif i in gold:
                     self._gold.append(Gold(x, y))
                 x += tile_size
             y += tile_size
@@ -119,6 +112,14 @@ class Background(pygame.sprite.Sprite):
         """Return the Surface size."""
         return self.image.get_size()
 
+    def get_tile_map(self) -> TileMap:
+        """Return the terrain map."""
+        return self._terrain_map
+
+    def get_tile_size(self) -> int:
+        """Return the width and height of a tile."""
+        return self._tile_size
+
 class Enemy(pygame.sprite.Sprite):
 
     # Annotate object-level fields
@@ -163,6 +164,11 @@ class Student(pygame.sprite.Sprite):
     LEFT: int = 2
     RIGHT: int = 0
     STOP: int = 4
+    # Frames of invincibility after respawning, at least and at most.
+    MIN_INVINCIBLE: int = 60
+    MAX_INVINCIBLE: int = 150
+    # Steps from the nearest enemy that are safe enough to end invincibility.
+    SAFE_STEPS: int = 3
 
     # Annotate object-level fields
     _dx: int
@@ -170,7 +176,7 @@ class Student(pygame.sprite.Sprite):
     _speed: int
     _face_right: pygame.Surface
     _coins: int
-    _spawn_loc: tuple
+    _invincible: int    # Frames since respawning while invincible, -1 if not invincible
 
     def __init__(self, image: pygame.Surface, x: int, y: int) -> None:
         """Initialize the sprite."""
@@ -179,11 +185,11 @@ class Student(pygame.sprite.Sprite):
         self.image = image
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
-        self._spawn_loc = (x, y)
         self._dx = 0
         self._dy = 0
         self._speed = 2
         self._coins = 0
+        self._invincible = -1
 
     def get_coins(self) -> int:
         """Return the number of coins."""
@@ -193,8 +199,27 @@ class Student(pygame.sprite.Sprite):
         """Add num_coins to coins total."""
         self._coins += num_coins
 
-    def respawn(self) -> None:
-        self.rect.topleft = self._spawn_loc
+    def respawn(self, location: tuple[int, int]) -> None:
+        """Move the center to location and become invincible for a while."""
+        self.rect.center = location
+        self._invincible = 0
+
+    def is_invincible(self) -> bool:
+        """Return True if enemies can't hurt the student."""
+        return self._invincible >= 0
+
+    def update_invincible(self, enemy_steps: int) -> None:
+        """Count down the invincibility after a respawn.  It lasts at least
+           MIN_INVINCIBLE frames, and after that until the nearest enemy is
+           more than SAFE_STEPS steps away, as enemy_steps from the safety
+           field says, or MAX_INVINCIBLE frames have gone by."""
+        if self._invincible < 0:
+            return
+        self._invincible += 1
+        if (self._invincible >= Student.MAX_INVINCIBLE
+                or (self._invincible >= Student.MIN_INVINCIBLE
+                    and enemy_steps > Student.SAFE_STEPS)):
+            self._invincible = -1
 
     def move(self, direction: int) -> None:
         self._dx = 0
@@ -290,6 +315,7 @@ def main() -> None:
     enemies: pygame.sprite.Group
     enemy_image: pygame.Surface
     ememy_bricks: pygame.sprite.Group
+    safety_field: SafetyField
     
     # Set up assets.
     image_files: list = ["barrier.jpg", "floor.jpg", "floor.jpg"]
@@ -311,6 +337,8 @@ def main() -> None:
     enemy_image = pygame.image.load("enemy.png").convert_alpha()
     for i in range(10):
         enemies.add(Enemy(enemy_image, 350, 230))
+    # Keep track of how far each tile is from the enemies.
+    safety_field = SafetyField(background.get_tile_map(), [0], background.get_tile_size())
     
 
     while not user_quit:
@@ -343,16 +371,20 @@ def main() -> None:
         coins = pygame.sprite.spritecollide(sam, gold, True)
         sam.add_coins(len(coins))
 
-        # Check for collisions with spiders.
+        # Check for collisions with spiders.  After a respawn the student
+        # can't be bitten until the enemies are far enough away.
         bites = pygame.sprite.groupcollide(group, enemies, False, False)
-        if bites:
-            sam.respawn()
+        if bites and not sam.is_invincible():
+            sam.respawn(safety_field.get_safest_point(sam.rect.center))
 
         # Move, redraw, and show.
         group.update(bricks)
+        AnimationClip.advance()
         gold.update()
         score_group.update(screen)
         enemies.update(enemy_bricks)
+        safety_field.set_enemies([enemy.rect.center for enemy in enemies])
+        sam.update_invincible(safety_field.get_distance(sam.rect.center))
         bkgd_group.draw(screen)
         gold.draw(screen)
         group.draw(screen)
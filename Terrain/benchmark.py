@@ -0,0 +1,237 @@
+"""
+    Time the terrain demos without a window or a person on the arrow keys.
+    The demo's own main() runs with SDL's dummy video driver, a seeded random
+    number generator, a clock that doesn't wait, and a scripted list of arrow
+    key presses.  Each frame is timed in four parts: generation (making
+    terrain or unfogging), surface (building the background image), blit
+    (drawing the sprite groups), and flip.  The results are saved as JSON.
+
+    Example:
+        python benchmark.py random_terrain_forever --width 1920 --height 1080
+               --keys RIGHT:120,DOWN:60 --option scroll_blit=False
+               --output scroll_off.json
+"""
+
+# Import Python libraries.
+import argparse
+import ast
+import importlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from types import ModuleType
+from typing import Callable
+
+# Use the dummy video driver so no window opens.
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+# Import and initialize pygame.
+import pygame
+pygame.init()
+
+# The Background methods timed in each part of a frame, if the demo has them.
+GENERATION_METHODS: list[str] = ["_generate_visible_chunks", "_add_ready_chunks", "unfog"]
+SURFACE_METHODS: list[str] = ["_get_surface", "_scroll_surface"]
+PARTS: list[str] = ["generation", "surface", "blit", "flip"]
+KEYS: dict[str, int] = {"UP": pygame.K_UP, "DOWN": pygame.K_DOWN,
+                        "LEFT": pygame.K_LEFT, "RIGHT": pygame.K_RIGHT}
+
+
+class FastClock:
+    """A stand-in for pygame.time.Clock that never waits."""
+
+    def tick(self, framerate: int = 0) -> int:
+        """Return right away instead of waiting for the next frame."""
+        return 0
+
+
+class FrameTimer:
+    """Collects how long each part of each frame takes."""
+
+    # Annotate object-level fields
+    frames: list[dict[str, float]]  # Milliseconds spent in each part, one dict per frame
+    _current: dict[str, float]      # The frame being timed
+    _depth: int                     # How many timed calls are running, so nested calls count once
+
+    def __init__(self) -> None:
+        """Begin with no frames."""
+        self.frames = []
+        self._current = {part: 0.0 for part in PARTS}
+        self._depth = 0
+
+    def timed(self, part: str, function: Callable) -> Callable:
+        """Return a function that calls function and adds its time to part."""
+        def wrapper(*args, **kwargs):
+            if self._depth:
+                return function(*args, **kwargs)
+            self._depth += 1
+            start: float = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._current[part] += (time.perf_counter() - start) * 1000
+                self._depth -= 1
+        return wrapper
+
+    def end_frame(self) -> None:
+        """Save the frame being timed and start a new one."""
+        self._current["total"] = sum(self._current.values())
+        self.frames.append(self._current)
+        self._current = {part: 0.0 for part in PARTS}
+
+
+def parse_keys(script: str) -> list[int | None]:
+    """Turn a key script like "RIGHT:30,STOP:10,DOWN:20" into a list with the
+       key held down on each frame, None for no key."""
+    held: list[int | None] = []
+    step: str
+    name: str
+    count: str
+    for step in script.split(","):
+        name, count = step.split(":")
+        held += [KEYS.get(name.strip().upper())] * int(count)
+    return held
+
+
+def parse_options(options: list[str]) -> dict[str, object]:
+    """Turn a list of "name=value" strings into keyword arguments."""
+    kwargs: dict[str, object] = {}
+    option: str
+    name: str
+    value: str
+    for option in options:
+        name, value = option.split("=", 1)
+        try:
+            kwargs[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[name] = value
+    return kwargs
+
+
+def instrument(demo: ModuleType, timer: FrameTimer, held: list[int | None],
+               background_options: dict[str, object], backgrounds: list) -> None:
+    """Wrap the parts of the demo and of pygame that are timed, and make each
+       flip post the key events for the next frame."""
+    background_class: type = demo.Background
+    name: str
+    for name in GENERATION_METHODS:
+        if hasattr(background_class, name):
+            setattr(background_class, name, timer.timed("generation", getattr(background_class, name)))
+    for name in SURFACE_METHODS:
+        if hasattr(background_class, name):
+            setattr(background_class, name, timer.timed("surface", getattr(background_class, name)))
+
+    # Remember each Background and pass it the options.
+    original_init: Callable = background_class.__init__
+    def init(self, *args, **kwargs) -> None:
+        kwargs.update(background_options)
+        original_init(self, *args, **kwargs)
+        backgrounds.append(self)
+    background_class.__init__ = init
+
+    pygame.sprite.Group.draw = timer.timed("blit", pygame.sprite.Group.draw)
+    pygame.time.Clock = FastClock
+
+    # Each flip ends a frame; then post the events for the next one.
+    flip: Callable = timer.timed("flip", pygame.display.flip)
+    def flip_and_post() -> None:
+        flip()
+        timer.end_frame()
+        frame: int = len(timer.frames)
+        previous: int | None = held[frame - 1] if frame <= len(held) else None
+        current: int | None = held[frame] if frame < len(held) else None
+        if frame >= len(held):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+        elif current != previous:
+            if previous is not None:
+                pygame.event.post(pygame.event.Event(pygame.KEYUP, key=previous))
+            if current is not None:
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=current))
+    pygame.display.flip = flip_and_post
+
+
+def summarize(frames: list[dict[str, float]]) -> dict[str, dict[str, float]]:
+    """Return the mean, 95th percentile and maximum of each part of the frames."""
+    summary: dict[str, dict[str, float]] = {}
+    part: str
+    times: list[float]
+    for part in PARTS + ["total"]:
+        times = sorted(frame[part] for frame in frames)
+        summary[part] = {"mean": statistics.fmean(times),
+                         "p95": times[int(0.95 * (len(times) - 1))],
+                         "max": times[-1]}
+    return summary
+
+
+def get_commit() -> str | None:
+    """Return the current git commit, or None if there isn't one."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(demo_name: str, width: int, height: int, tile_size: int | None, seed: int,
+        key_script: str, background_options: dict[str, object]) -> dict:
+    """Run one demo and return its results."""
+    random.seed(seed)
+    demo: ModuleType = importlib.import_module(demo_name)
+    if tile_size is not None:
+        demo.Background.TILE_SIZE = tile_size
+    timer: FrameTimer = FrameTimer()
+    held: list[int | None] = parse_keys(key_script)
+    backgrounds: list = []
+    instrument(demo, timer, held, background_options, backgrounds)
+    start: float = time.perf_counter()
+    demo.main(width, height)
+    elapsed: float = time.perf_counter() - start
+    results: dict = {"demo": demo_name,
+                     "commit": get_commit(),
+                     "width": width,
+                     "height": height,
+                     "tile_size": demo.Background.TILE_SIZE,
+                     "seed": seed,
+                     "keys": key_script,
+                     "options": {name: repr(value) for name, value in background_options.items()},
+                     "seconds": elapsed,
+                     "summary": summarize(timer.frames),
+                     "frames": timer.frames}
+    if backgrounds and hasattr(backgrounds[-1], "get_stats"):
+        results["stats"] = backgrounds[-1].get_stats()
+    return results
+
+
+def main() -> None:
+    """Read the command line, run the demo, and save or print the results."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Time a terrain demo headlessly with scripted arrow keys.")
+    parser.add_argument("demo", help="module name, such as random_terrain_forever or fog5")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--tile-size", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keys", default="RIGHT:150,DOWN:120,LEFT:150,UP:120,STOP:10",
+                        help="comma-separated KEY:frames steps; KEY is UP, DOWN, LEFT, RIGHT or STOP")
+    parser.add_argument("--option", action="append", default=[],
+                        help="name=value keyword argument for Background, may be repeated")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    args: argparse.Namespace = parser.parse_args()
+    results: dict = run(args.demo, args.width, args.height, args.tile_size, args.seed,
+                        args.keys, parse_options(args.option))
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    part: str
+    for part, times in results["summary"].items():
+        print(f"{part:>10}: mean {times['mean']:7.3f} ms, p95 {times['p95']:7.3f} ms, "
+              f"max {times['max']:7.3f} ms")
+    if "stats" in results:
+        print(results["stats"])
+
+
+if __name__ == "__main__":
+    main()
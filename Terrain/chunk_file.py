@@ -0,0 +1,109 @@
+"""
+    A memory-mapped file of terrain chunks for random_terrain_forever.py.
+    The file starts with a header, followed by fixed-size slots.  Each slot
+    holds the chunk coordinates and the tile numbers of one chunk, so a chunk
+    can be read or written in place without loading the rest of the file.
+"""
+
+# Import Python libraries.
+import mmap
+import os
+import struct
+from array import array
+from typing import BinaryIO
+
+
+class ChunkFile:
+    """Chunks of terrain saved in one memory-mapped file, keyed by chunk
+       coordinates.  The file also remembers where the window was."""
+
+    # Annotate class-level constants
+    MAGIC: bytes = b"TCHK"
+    # Magic, bytes per chunk, left and top of the window, number of slots used.
+    HEADER: struct.Struct = struct.Struct("<4sIiiI")
+    # The chunk row and col at the start of each slot.
+    SLOT_KEY: struct.Struct = struct.Struct("<ii")
+    # How many slots to make room for when the file is created.
+    INITIAL_SLOTS: int = 64
+
+    # Annotate object-level fields
+    _file: BinaryIO                       # The open file
+    _map: mmap.mmap                       # The memory map of the file
+    _chunk_bytes: int                     # Bytes of tile numbers in a chunk
+    _slots: dict[tuple[int, int], int]    # The slot number of each saved chunk
+
+    def __init__(self, path: str, chunk_bytes: int) -> None:
+        """Open the chunk file at path, creating it if it doesn't exist.
+           Raise ValueError if it isn't a chunk file for chunks of chunk_bytes."""
+        self._chunk_bytes = chunk_bytes
+        self._slots = {}
+        if os.path.exists(path):
+            self._file = open(path, "r+b")
+        else:
+            self._file = open(path, "w+b")
+            self._file.write(ChunkFile.HEADER.pack(ChunkFile.MAGIC, chunk_bytes, 0, 0, 0))
+            self._file.truncate(self._slot_offset(ChunkFile.INITIAL_SLOTS))
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic: bytes
+        saved_bytes: int
+        used: int
+        magic, saved_bytes, _, _, used = ChunkFile.HEADER.unpack_from(self._map)
+        if magic != ChunkFile.MAGIC or saved_bytes != chunk_bytes:
+            self.close()
+            raise ValueError(f"{path} is not a chunk file for {chunk_bytes}-byte chunks")
+        # Read the chunk coordinates from each slot.
+        slot: int
+        for slot in range(used):
+            self._slots[ChunkFile.SLOT_KEY.unpack_from(self._map, self._slot_offset(slot))] = slot
+
+    def __len__(self) -> int:
+        """Return the number of saved chunks."""
+        return len(self._slots)
+
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        """Return True if the chunk at chunk coordinates key is saved."""
+        return key in self._slots
+
+    def keys(self) -> list[tuple[int, int]]:
+        """Return the chunk coordinates of every saved chunk."""
+        return list(self._slots)
+
+    def _slot_offset(self, slot: int) -> int:
+        """Return where in the file a slot begins."""
+        return ChunkFile.HEADER.size + slot * (ChunkFile.SLOT_KEY.size + self._chunk_bytes)
+
+    def get_position(self) -> tuple[int, int]:
+        """Return the saved left, top of the window, in tiles."""
+        return ChunkFile.HEADER.unpack_from(self._map)[2:4]
+
+    def set_position(self, left: int, top: int) -> None:
+        """Save the left, top of the window, in tiles."""
+        self._map[:ChunkFile.HEADER.size] = ChunkFile.HEADER.pack(
+            ChunkFile.MAGIC, self._chunk_bytes, left, top, len(self._slots))
+
+    def read(self, key: tuple[int, int]) -> array:
+        """Return a copy of the saved chunk at chunk coordinates key."""
+        start: int = self._slot_offset(self._slots[key]) + ChunkFile.SLOT_KEY.size
+        return array("B", self._map[start:start + self._chunk_bytes])
+
+    def write(self, key: tuple[int, int], chunk: array) -> None:
+        """Save chunk at chunk coordinates key, in its old slot if it has one."""
+        slot: int | None = self._slots.get(key)
+        if slot is None:
+            slot = len(self._slots)
+            # Double the file if it is full.
+            if self._slot_offset(slot + 1) > len(self._map):
+                self._map.close()
+                self._file.truncate(self._slot_offset(2 * slot))
+                self._map = mmap.mmap(self._file.fileno(), 0)
+            self._slots[key] = slot
+            ChunkFile.SLOT_KEY.pack_into(self._map, self._slot_offset(slot), key[0], key[1])
+            self.set_position(*self.get_position())
+        start: int = self._slot_offset(slot) + ChunkFile.SLOT_KEY.size
+        self._map[start:start + self._chunk_bytes] = chunk.tobytes()
+
+    def close(self) -> None:
+        """Write everything to disk and close the file."""
+        self._map.flush()
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,110 @@
+"""
+    A cache of flashlight cone shapes for fog4.py and fog5.py.
+    The curved edge of a cone is worked out with cos and sin once for
+    each angle and radius, and the cone is drawn once into a mask that
+    is kept for the most recently used angles and radii.  After that,
+    cutting a cone out of the darkness is a lookup and a blit.
+"""
+
+# Import Python libraries.
+from collections import OrderedDict
+from math import atan2, cos, degrees, floor, radians, sin
+
+# Import pygame.
+import pygame
+
+
+class ConeCache:
+    """The points on the curved edge of flashlight cones, relative to
+       the flashlight, keyed by angle and radius."""
+
+    # Annotate object-level fields
+    _spread: int         # Degrees from the middle of the cone to each side
+    _step: int           # Degrees between points on the curved edge
+    _angle_step: int     # Angles are rounded to a multiple of this many degrees
+    _max_masks: int      # How many masks to keep
+    _cones: dict[tuple[int, int], list[tuple[float, float]]]  # The edges, keyed by (angle, radius)
+    _masks: OrderedDict[tuple[int, int], tuple[pygame.Surface, tuple[int, int]]]  # Each mask and its offset from the tip, least recently used first
+    mask_draws: int      # How many masks have been drawn
+
+    def __init__(self, spread: int = 30, step: int = 3, angle_step: int = 1,
+                 max_masks: int = 64) -> None:
+        """Begin with no cones.  Cones are spread degrees to each side of
+           their angle, with a point every step degrees.  Only the
+           max_masks most recently used masks are kept."""
+        self._spread = spread
+        self._step = step
+        self._angle_step = angle_step
+        self._max_masks = max(max_masks, 1)
+        self._cones = {}
+        self._masks = OrderedDict()
+        self.mask_draws = 0
+
+    def __len__(self) -> int:
+        """Return the number of cones in the cache."""
+        return len(self._cones)
+
+    @staticmethod
+    def aim(center: tuple[int, int], target: tuple[int, int]) -> float:
+        """Return the angle in degrees from center to target, for example to
+           point a flashlight at the mouse."""
+        return degrees(atan2(target[1] - center[1], target[0] - center[0]))
+
+    def _get_key(self, angle: float, radius: int) -> tuple[int, int]:
+        """Return the key of a cone, with angle rounded to the angle step."""
+        return (round(angle / self._angle_step) * self._angle_step % 360, radius)
+
+    def _get_edge(self, key: tuple[int, int]) -> list[tuple[float, float]]:
+        """Return the curved edge of the cone with key, relative to its tip."""
+        edge: list[tuple[float, float]] | None = self._cones.get(key)
+        if edge is None:
+            # Rounding keeps points like 89.99999999999999 from landing on
+            # a different pixel depending on where the cone is drawn.
+            edge = [(round(key[1] * cos(radians(key[0] + angle_offset)), 6),
+                     round(key[1] * sin(radians(key[0] + angle_offset)), 6))
+                    for angle_offset in range(-self._spread, self._spread + 1, self._step)]
+            self._cones[key] = edge
+        return edge
+
+    def get_points(self, center: tuple[int, int], angle: float,
+                   radius: int) -> list[tuple[float, float]]:
+        """Return the points on the curved edge of a cone of radius pointing
+           angle degrees from center.  Angles go clockwise from the right,
+           because y increases down, and are rounded to the angle step."""
+        return [(center[0] + dx, center[1] + dy)
+                for dx, dy in self._get_edge(self._get_key(angle, radius))]
+
+    def _get_mask(self, key: tuple[int, int]) -> tuple[pygame.Surface, tuple[int, int]]:
+        """Return the mask of the cone with key and the offset of its top
+           left from the cone's tip, drawing it if it isn't kept.  The mask
+           is see-through black inside the cone and opaque white outside."""
+        mask: tuple[pygame.Surface, tuple[int, int]] | None = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+        points: list[tuple[float, float]] = [(0, 0)] + self._get_edge(key)
+        left: int = floor(min(x for x, y in points))
+        top: int = floor(min(y for x, y in points))
+        surface: pygame.Surface = pygame.Surface((floor(max(x for x, y in points)) - left + 1,
+                                                  floor(max(y for x, y in points)) - top + 1),
+                                                 pygame.SRCALPHA)
+        surface.fill((255, 255, 255, 255))
+        pygame.draw.polygon(surface, (0, 0, 0, 0), [(x - left, y - top) for x, y in points])
+        self.mask_draws += 1
+        self._masks[key] = (surface, (left, top))
+        if len(self._masks) > self._max_masks:
+            self._masks.popitem(last=False)
+        return self._masks[key]
+
+    def draw(self, surface: pygame.Surface, center: tuple[int, int], angle: float,
+             radius: int) -> pygame.Rect:
+        """Cut a cone of radius pointing angle degrees from center out of
+           surface, leaving see-through black, and return the area changed.
+           center must be a whole pixel."""
+        mask: pygame.Surface
+        offset: tuple[int, int]
+        mask, offset = self._get_mask(self._get_key(angle, radius))
+        # Taking the smaller of each channel leaves the surface alone
+        # outside the cone and clears it inside.
+        return surface.blit(mask, (center[0] + offset[0], center[1] + offset[1]),
+                            special_flags = pygame.BLEND_RGBA_MIN)
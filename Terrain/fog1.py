@@ -10,6 +10,8 @@ import random
 # Import and initialize pygame.
 import pygame
 pygame.init()
+# Import the fog map.
+from fog_map import FogMap
 
 
 class Player(pygame.sprite.Sprite):
@@ -91,7 +93,7 @@ class Background(pygame.sprite.Sprite):
     _terrain: list[list[int]]     # The terrain map, a 2d list of integer
     ## NEW CODE
     _fog_tile: pygame.Surface     # The fog tile
-    _fog: list[list[bool]]        # The fog map, a 2d list of bool, True is fog
+    _fog: FogMap                  # The fog map, one bit per tile
     _changed: bool                # The background has changed since last update.
     ## END NEW CODE
 
@@ -103,7 +105,7 @@ class Background(pygame.sprite.Sprite):
         self._terrain = [[2 for col in range(width//Background.TILE_SIZE)] for row in range(height//Background.TILE_SIZE)]
 
         ## NEW CODE 
-        self._fog = [[True for col in range(width//Background.TILE_SIZE)] for row in range(height//Background.TILE_SIZE)]
+        self._fog = FogMap(width//Background.TILE_SIZE, height//Background.TILE_SIZE)
         self._fog_tile = pygame.image.load("fog_tile2.png").convert_alpha()
         self._changed = False
         ## END NEW CODE
@@ -128,9 +130,13 @@ class Background(pygame.sprite.Sprite):
         y: int = 0
         # Iterate through the 2D list of map tile numbers. Blit the grass.
         for row in range(height//Background.TILE_SIZE):
+            # Skip rows that are all fog.
+            if not self._fog.is_revealed_any((0, row, width//Background.TILE_SIZE, 1)):
+                y += Background.TILE_SIZE
+                continue
             for col in range(width//Background.TILE_SIZE):
                 ## NEW CODE
-                if not self._fog[row][col]:
+                if not self._fog.is_fogged(col, row):
                     surf.blit(self._tile, (x, y))
                 ## END NEW CODE (previously it blitted, but didn't check fog)
                 x += Background.TILE_SIZE
@@ -142,8 +148,12 @@ class Background(pygame.sprite.Sprite):
         y = 0
         diff: int = (self._fog_tile.get_width() - self._tile.get_width())//2
         for row in range(height//Background.TILE_SIZE):
+            # Skip rows that have no fog.
+            if not self._fog.is_fogged_any((0, row, width//Background.TILE_SIZE, 1)):
+                y += Background.TILE_SIZE
+                continue
             for col in range(width//Background.TILE_SIZE):
-                if self._fog[row][col]:
+                if self._fog.is_fogged(col, row):
                     surf.blit(self._fog_tile, (x-diff, y-diff))
                 x += Background.TILE_SIZE
             y += Background.TILE_SIZE
@@ -159,11 +169,8 @@ class Background(pygame.sprite.Sprite):
         col: int = player_x // Background.TILE_SIZE
         row: int = player_y // Background.TILE_SIZE
         # Expand that by 2 and unfog.
-        for i in range(max(0, row-2), min(row+3, len(self._fog))):
-            for j in range(max(0, col-2), min(col+3, len(self._fog[i]))):
-                if self._fog[i][j]:
-                    self._fog[i][j] = False
-                    self._changed = True
+        if self._fog.reveal_rect((col-2, row-2, 5, 5)):
+            self._changed = True
 
     def update(self, screen: pygame.Surface) -> None:
         """Get a new surface if the background has changed and unset _changed field."""
@@ -173,11 +180,11 @@ class Background(pygame.sprite.Sprite):
     ## END NEW CODE
         
 
-def main() -> None:
-    """Allow the user to explore an infinite random space."""
+def main(width: int = 800, height: int = 600) -> None:
+    """Allow the user to explore an infinite random space in a width x height window."""
     # Annotate and initialize window and background constants and variables.
-    WIDTH: int = 800
-    HEIGHT: int = 600
+    WIDTH: int = width
+    HEIGHT: int = height
     SPEED: int = 10
     screen: pygame.Surface = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Use the arrow keys to explore")
@@ -241,4 +248,5 @@ def main() -> None:
         pygame.display.flip()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
@@ -145,11 +145,11 @@ class Background(pygame.sprite.Sprite):
     ## END NEW CODE
 
 
-def main() -> None:
-    """Allow the user to explore an infinite random space."""
+def main(width: int = 800, height: int = 600) -> None:
+    """Allow the user to explore an infinite random space in a width x height window."""
     # Annotate and initialize window and background constants and variables.
-    WIDTH: int = 800
-    HEIGHT: int = 600
+    WIDTH: int = width
+    HEIGHT: int = height
     SPEED: int = 10
     ## NEW CODE
     PLAYER_START: tuple[int] = (25, 25)
@@ -214,4 +214,5 @@ def main() -> None:
         pygame.display.flip()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
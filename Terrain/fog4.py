@@ -10,10 +10,11 @@
 
 # Import Python libraries.
 import random
-from math import sin, cos, pi, radians
 # Import and initialize pygame.
 import pygame
 pygame.init()
+# Import the flashlight cone cache.
+from flashlight import ConeCache
 
 class Player(pygame.sprite.Sprite):
     """A player can move around the terrain with the arrow keys."""
@@ -96,11 +97,13 @@ class Background(pygame.sprite.Sprite):
     # Object-level fields
     _tile: pygame.Surface         # The tile for grassy terrain
     _terrain: list[list[int]]     # The terrain map, a 2d list of integer
+    _cones: ConeCache             # The flashlight cone shapes
 
     def __init__(self, width: int, height: int, player: Player) -> None:
         """Create the terrain map and image.  The initial terrain fits in the window.
            Background begins not moving and left, top is 0,0 in the terrain map."""
         super().__init__()
+        self._cones = ConeCache()
         # Create the terrain map (all grass)
         self._terrain = [[2 for col in range(width//Background.TILE_SIZE)] for row in range(height//Background.TILE_SIZE)]
         # Create the starting image from the terrain,
@@ -140,9 +143,6 @@ class Background(pygame.sprite.Sprite):
         cy: int = player_center[1]
         angle_adjustment: float
 
-        # Starting point of the polygon is the player center.
-        points: list[tuple] = [player_center]
-
         # Adjust the angle based on the player's direction and the
         # clockwise unit circle (because y increases down).
         if direction == Player.RIGHT:
@@ -168,21 +168,12 @@ class Background(pygame.sprite.Sprite):
         cy_flicker: int = cy + random.randint(-2, 2)
 
 
-        # Calculate the curvy points for our wedge.
-        # Radians:
-##        for angle in [i * 0.05 for i in range(-11, 12)]:
-##            x = cx + lr * cos(angle_adjustment + angle)
-##            y = cy + lr * sin(angle_adjustment + angle)
-##            points.append((x, y))
-        # Degrees:
-        for angle in range(-30, 31, 3):
-            x = cx_flicker + lr_flicker * cos(radians(angle_adjustment + angle))
-            y = cy_flicker + lr_flicker * sin(radians(angle_adjustment + angle))
-
-            points.append((x, y))
+        # Cut our wedge out of the darkness with a mask; each mask is only
+        # drawn the first time its angle and radius are used.
+        self._cones.draw(darkness, (cx_flicker, cy_flicker),
+                         angle_adjustment, lr_flicker)
         ## END NEW CODE
 
-        pygame.draw.polygon(darkness, (0, 0, 0, 0), points)
         surf.blit(darkness, (0, 0))
         return surf
      
@@ -195,11 +186,11 @@ class Background(pygame.sprite.Sprite):
 
 
 
-def main() -> None:
-    """Allow the user to explore an infinite random space."""
+def main(width: int = 800, height: int = 600) -> None:
+    """Allow the user to explore an infinite random space in a width x height window."""
     # Annotate and initialize window and background constants and variables.
-    WIDTH: int = 800
-    HEIGHT: int = 600
+    WIDTH: int = width
+    HEIGHT: int = height
     SPEED: int = 10
     PLAYER_START: tuple[int] = (25, 25)
     screen: pygame.Surface = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -262,4 +253,5 @@ def main() -> None:
         pygame.display.flip()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
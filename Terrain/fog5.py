@@ -6,10 +6,12 @@
 
 # Import Python libraries.
 import random
-from math import sin, cos, pi, radians
 # Import and initialize pygame.
 import pygame
 pygame.init()
+# Import the flashlight cone cache and the fog map.
+from flashlight import ConeCache
+from fog_map import FogMap
 
 
 class Player(pygame.sprite.Sprite):
@@ -94,7 +96,12 @@ class Background(pygame.sprite.Sprite):
     _tile: pygame.Surface         # The tile for grassy terrain
     _terrain: list[list[int]]     # The terrain map, a 2d list of integer
     _fog_tile: pygame.Surface     # The fog tile
-    _fog: list[list[bool]]        # The fog map, a 2d list of bool, True is fog
+    _fog: FogMap                  # The fog map, one bit per tile
+    _explored: pygame.Surface     # The terrain and fog layer, redrawn only where the fog changes
+    _darkness: pygame.Surface     # The darkness layer, with the flashlight cone cut out of it
+    _cone_rect: pygame.Rect       # The part of the darkness layer the cone was drawn on
+    _frame: pygame.Surface        # The explored layer with the darkness over it, redrawn only where either changed
+    _cones: ConeCache             # The flashlight cone shapes
 
     def __init__(self, width: int, height: int, player: Player) -> None:
         """Create the terrain map and image.  The initial terrain fits in the window.
@@ -102,8 +109,8 @@ class Background(pygame.sprite.Sprite):
         super().__init__()
         # Create the terrain map (all grass) and the fog map (all fog)
         self._terrain = [[2 for col in range(width//Background.TILE_SIZE)] for row in range(height//Background.TILE_SIZE)]
-        self._fog = [[True for col in range(width//Background.TILE_SIZE)] for row in range(height//Background.TILE_SIZE)]
-        self._fog_tile = pygame.image.load("fog_tile3.png").convert_alpha()
+        self._fog = FogMap(width//Background.TILE_SIZE, height//Background.TILE_SIZE)
+        self._fog_tile = pygame.image.load("fog_tile2.png").convert_alpha()
 
         # Create the starting image from the terrain,
         # located at (0,0).
@@ -111,52 +118,94 @@ class Background(pygame.sprite.Sprite):
         self._tile = pygame.Surface((Background.TILE_SIZE, Background.TILE_SIZE), flags = pygame.SRCALPHA)
         self._tile.blit(tiles_surf, (0, 0), pygame.Rect(Background.GRASS_LT,
                                                         (Background.TILE_SIZE, Background.TILE_SIZE)))
+        # Create the layers.  The explored layer is drawn once here and then
+        # only where the fog changes; the darkness layer is filled once here
+        # and then only where the cone is.
+        self._explored = pygame.Surface((width, height), flags = pygame.SRCALPHA)
+        self._draw_explored(pygame.Rect(0, 0, width, height))
+        self._darkness = pygame.Surface((width, height), pygame.SRCALPHA)
+        self._darkness.fill((0, 0, 0, 180))
+        self._cone_rect = pygame.Rect(0, 0, 0, 0)
+        self._frame = self._explored.copy()
+        self._frame.blit(self._darkness, (0, 0))
+        self._cones = ConeCache()
         self.image = self._get_surface(width, height, player.rect.center, player.direction_facing)
         self.rect = self.image.get_rect()
 
-    def _get_surface(self, width: int, height: int, player_center: tuple[int],
-                     direction: int) -> pygame.Surface:
-        """Creates a Surface from the tile and fog maps."""
-        # The Surface to draw the tiles on.
-        surf: pygame.Surface = pygame.Surface((width, height), flags = pygame.SRCALPHA)
+    def _draw_explored(self, area: pygame.Rect) -> None:
+        """Redraw the terrain and fog in area of the explored layer."""
+        surf: pygame.Surface = self._explored
+        rows: int = len(self._terrain)
+        cols: int = len(self._terrain[0])
+        # Fog tiles are bigger than terrain tiles, so fog from tiles up to reach
+        # tiles away can overlap the area.
+        diff: int = (self._fog_tile.get_width() - self._tile.get_width())//2
+        reach: int = -(-(self._fog_tile.get_width() - diff) // Background.TILE_SIZE)
+        first_row: int = area.top // Background.TILE_SIZE
+        last_row: int = (area.bottom - 1) // Background.TILE_SIZE
+        first_col: int = area.left // Background.TILE_SIZE
+        last_col: int = (area.right - 1) // Background.TILE_SIZE
         # row and col index into the two-dimensional list of map tile numbers.
         row: int
         col: int
-        # x and y are the blit coordinates on surf -- they will stay between 0,0 and width, height.
-        x: int = 0
-        y: int = 0
-        # Iterate through the 2D list of map tile numbers. Blit the grass.
-        for row in range(height//Background.TILE_SIZE):
-            for col in range(width//Background.TILE_SIZE):
-                if not self._fog[row][col]:
-                    surf.blit(self._tile, (x, y))
-                x += Background.TILE_SIZE
-            y += Background.TILE_SIZE
-            x = 0
-        # Now blit the fog over it.
-        x = 0
-        y = 0
-        diff: int = (self._fog_tile.get_width() - self._tile.get_width())//2
-        for row in range(height//Background.TILE_SIZE):
-            for col in range(width//Background.TILE_SIZE):
-                if self._fog[row][col]:
-                    surf.blit(self._fog_tile, (x-diff, y-diff))
-                x += Background.TILE_SIZE
-            y += Background.TILE_SIZE
-            x = 0
-        # Add the flashlight effect.
-        darkness: pygame.Surface
-        darkness = pygame.Surface((width, height), pygame.SRCALPHA)
-        darkness.fill((0, 0, 0, 180))
+        surf.set_clip(area)
+        surf.fill((0, 0, 0, 0))
+        # Blit the grass, skipping rows of the area that are all fog.
+        for row in range(max(first_row, 0), min(last_row + 1, rows)):
+            if not self._fog.is_revealed_any((first_col, row, last_col - first_col + 1, 1)):
+                continue
+            for col in range(max(first_col, 0), min(last_col + 1, cols)):
+                if not self._fog.is_fogged(col, row):
+                    surf.blit(self._tile, (col * Background.TILE_SIZE, row * Background.TILE_SIZE))
+        # Now blit the fog over it, skipping rows that have no fog.
+        for row in range(max(first_row - reach, 0), min(last_row + reach + 1, rows)):
+            if not self._fog.is_fogged_any((first_col - reach, row, last_col - first_col + 2*reach + 1, 1)):
+                continue
+            for col in range(max(first_col - reach, 0), min(last_col + reach + 1, cols)):
+                if self._fog.is_fogged(col, row):
+                    surf.blit(self._fog_tile, (col * Background.TILE_SIZE - diff,
+                                               row * Background.TILE_SIZE - diff))
+        surf.set_clip(None)
+
+    def _draw_frame(self, area: pygame.Rect) -> None:
+        """Redraw area of the frame from the explored and darkness layers."""
+        # Adding to a cleared area copies the explored layer exactly, alpha
+        # and all, where an ordinary blit would blend it.
+        self._frame.fill((0, 0, 0, 0), area)
+        self._frame.blit(self._explored, area, area, special_flags = pygame.BLEND_RGBA_ADD)
+        self._frame.blit(self._darkness, area, area)
+
+    def _get_surface(self, width: int, height: int, player_center: tuple[int],
+                     direction: int) -> pygame.Surface:
+        """Update the frame from the explored and darkness layers, only where
+           the fog or the cone has changed, and return it."""
+        # Areas of the frame to redraw.
+        dirty: list[pygame.Rect] = []
+        # Redraw the explored layer where the fog has changed, which is
+        # everywhere the fog tiles of the changed cells used to cover.
+        changed: tuple[int, int, int, int] | None = self._fog.take_changed()
+        if changed is not None:
+            diff: int = (self._fog_tile.get_width() - self._tile.get_width())//2
+            area: pygame.Rect = pygame.Rect(changed[0] * Background.TILE_SIZE - diff,
+                                            changed[1] * Background.TILE_SIZE - diff,
+                                            (changed[2] - 1) * Background.TILE_SIZE
+                                            + self._fog_tile.get_width(),
+                                            (changed[3] - 1) * Background.TILE_SIZE
+                                            + self._fog_tile.get_height())
+            area = area.clip(self._explored.get_rect())
+            self._draw_explored(area)
+            dirty.append(area)
+        # Add the flashlight effect.  Put the darkness back where the last
+        # cone was.
+        darkness: pygame.Surface = self._darkness
+        darkness.fill((0, 0, 0, 180), self._cone_rect)
+        dirty.append(self._cone_rect)
         # Draw a cone.
         lr: int = Background.LIGHT_RADIUS
         cx: int = player_center[0]
         cy: int = player_center[1]
         angle_adjustment: float
 
-        # Starting point of the polygon is the player center.
-        points: list[tuple] = [player_center]
-
         # Adjust the angle based on the player's direction and the
         # clockwise unit circle (because y increases down).
         if direction == Player.RIGHT:
@@ -173,26 +222,24 @@ class Background(pygame.sprite.Sprite):
         cx_flicker: int = cx + random.randint(-1, 1)
         cy_flicker: int = cy + random.randint(-1, 1)
 
-        # Calculate the curvy points for our wedge.
-        for angle in range(-30, 31, 3):
-            x = cx_flicker + lr_flicker * cos(radians(angle_adjustment + angle))
-            y = cy_flicker + lr_flicker * sin(radians(angle_adjustment + angle))
-            points.append((x, y))
-
-        pygame.draw.polygon(darkness, (0, 0, 0, 0), points)
-        surf.blit(darkness, (0, 0))
-        return surf
+        # Cut our wedge out of the darkness with a mask; each mask is only
+        # drawn the first time its angle and radius are used.
+        self._cone_rect = self._cones.draw(darkness, (cx_flicker, cy_flicker),
+                                           angle_adjustment, lr_flicker)
+        dirty.append(self._cone_rect)
+        area: pygame.Rect
+        for area in dirty:
+            self._draw_frame(area)
+        return self._frame
 
     def unfog(self, player_x: int, player_y: int) -> None:
-        """Player is in a location; unfog if fogged and set _changed field."""
+        """Player is in a location; unfog if fogged.  The fog map remembers
+           what changed."""
         # Find the row, col of player location.
         col: int = player_x // Background.TILE_SIZE
         row: int = player_y // Background.TILE_SIZE
         # Expand that by 2 and unfog.
-        for i in range(max(0, row-2), min(row+3, len(self._fog))):
-            for j in range(max(0, col-2), min(col+3, len(self._fog[i]))):
-                if self._fog[i][j]:
-                    self._fog[i][j] = False
+        self._fog.reveal_rect((col-2, row-2, 5, 5))
 
     def update(self, screen: pygame.Surface, player_center: tuple[int],
                direction: int) -> None:
@@ -201,11 +248,11 @@ class Background(pygame.sprite.Sprite):
                                         player_center, direction)
        
 
-def main() -> None:
-    """Allow the user to explore an infinite random space."""
+def main(width: int = 800, height: int = 600) -> None:
+    """Allow the user to explore an infinite random space in a width x height window."""
     # Annotate and initialize window and background constants and variables.
-    WIDTH: int = 800
-    HEIGHT: int = 600
+    WIDTH: int = width
+    HEIGHT: int = height
     SPEED: int = 10
     screen: pygame.Surface = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Use the arrow keys to explore")
@@ -268,4 +315,5 @@ def main() -> None:
         pygame.display.flip()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    main()
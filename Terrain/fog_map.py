@@ -0,0 +1,156 @@
+"""
+    A fog-of-war map for fog1.py and fog5.py that uses one bit per tile.
+    Each row of the map is a Python int used as a row of bits, where a 1 bit
+    means the tile has been revealed.  Revealing or checking a rectangle of
+    tiles is one mask operation per row instead of a loop over every tile.
+"""
+
+# Import Python libraries.
+from math import isqrt
+import struct
+
+
+class FogMap:
+    """A map of which tiles are still in the fog.  Tiles are given as
+       col, row and rectangles as (left, top, width, height) in tiles,
+       so a pygame.Rect can be used too."""
+
+    # Annotate object-level fields
+    _cols: int                  # Width of the map in tiles
+    _rows: list[int]            # One int per row, bit col is 1 if the tile is revealed
+    _changed: list[int] | None  # Bounding left, top, right, bottom of tiles revealed since last asked
+
+    def __init__(self, cols: int, rows: int) -> None:
+        """Create a map of cols x rows tiles, all in the fog."""
+        self._cols = cols
+        self._rows = [0] * rows
+        self._changed = None
+
+    def __len__(self) -> int:
+        """Return the number of tiles in the map."""
+        return self._cols * len(self._rows)
+
+    def _clip(self, rect: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        """Return the left, top, right, bottom of rect (right and bottom not
+           included) cut down to fit in the map."""
+        left: int
+        top: int
+        width: int
+        height: int
+        left, top, width, height = rect
+        return (max(left, 0), max(top, 0),
+                min(left + width, self._cols), min(top + height, len(self._rows)))
+
+    def _reveal_row(self, row: int, left: int, right: int) -> bool:
+        """Reveal tiles left to right (not included) in row.  Return True and
+           remember the change if any of them were in the fog."""
+        if left >= right:
+            return False
+        mask: int = ((1 << (right - left)) - 1) << left
+        if self._rows[row] & mask == mask:
+            return False
+        self._rows[row] |= mask
+        if self._changed is None:
+            self._changed = [left, row, right, row + 1]
+        else:
+            self._changed = [min(self._changed[0], left), min(self._changed[1], row),
+                             max(self._changed[2], right), max(self._changed[3], row + 1)]
+        return True
+
+    def is_fogged(self, col: int, row: int) -> bool:
+        """Return True if the tile at col, row is in the fog."""
+        return not (self._rows[row] >> col) & 1
+
+    def reveal_rect(self, rect: tuple[int, int, int, int]) -> bool:
+        """Reveal the tiles in rect.  Return True if any were in the fog."""
+        left: int
+        top: int
+        right: int
+        bottom: int
+        left, top, right, bottom = self._clip(rect)
+        changed: bool = False
+        row: int
+        for row in range(top, bottom):
+            changed = self._reveal_row(row, left, right) or changed
+        return changed
+
+    def reveal_disc(self, center: tuple[int, int], radius: int) -> bool:
+        """Reveal the tiles within radius tiles of the tile at center.
+           Return True if any were in the fog."""
+        changed: bool = False
+        row: int
+        half_width: int
+        for row in range(max(center[1] - radius, 0), min(center[1] + radius + 1, len(self._rows))):
+            half_width = isqrt(radius * radius - (row - center[1]) ** 2)
+            changed = self._reveal_row(row, max(center[0] - half_width, 0),
+                                       min(center[0] + half_width + 1, self._cols)) or changed
+        return changed
+
+    def is_fogged_any(self, rect: tuple[int, int, int, int]) -> bool:
+        """Return True if any tile in rect is in the fog."""
+        left: int
+        top: int
+        right: int
+        bottom: int
+        left, top, right, bottom = self._clip(rect)
+        if left >= right:
+            return False
+        mask: int = ((1 << (right - left)) - 1) << left
+        row: int
+        for row in range(top, bottom):
+            if self._rows[row] & mask != mask:
+                return True
+        return False
+
+    def is_revealed_any(self, rect: tuple[int, int, int, int]) -> bool:
+        """Return True if any tile in rect has been revealed."""
+        left: int
+        top: int
+        right: int
+        bottom: int
+        left, top, right, bottom = self._clip(rect)
+        if left >= right:
+            return False
+        mask: int = ((1 << (right - left)) - 1) << left
+        row: int
+        for row in range(top, bottom):
+            if self._rows[row] & mask:
+                return True
+        return False
+
+    def count_revealed(self) -> int:
+        """Return the number of tiles that have been revealed."""
+        row: int
+        return sum(row.bit_count() for row in self._rows)
+
+    def take_changed(self) -> tuple[int, int, int, int] | None:
+        """Return the smallest (left, top, width, height) holding every tile
+           revealed since the last call, or None if none were."""
+        changed: list[int] | None = self._changed
+        self._changed = None
+        if changed is None:
+            return None
+        return (changed[0], changed[1], changed[2] - changed[0], changed[3] - changed[1])
+
+    def to_bytes(self) -> bytes:
+        """Return the map as bytes: the width and height, then each row
+           packed eight tiles to a byte."""
+        row_bytes: int = (self._cols + 7) // 8
+        row: int
+        return (struct.pack("<II", self._cols, len(self._rows))
+                + b"".join(row.to_bytes(row_bytes, "little") for row in self._rows))
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "FogMap":
+        """Return the map saved in data by to_bytes."""
+        cols: int
+        rows: int
+        cols, rows = struct.unpack_from("<II", data)
+        fog_map: FogMap = FogMap(cols, rows)
+        row_bytes: int = (cols + 7) // 8
+        start: int = struct.calcsize("<II")
+        row: int
+        for row in range(rows):
+            fog_map._rows[row] = int.from_bytes(data[start + row * row_bytes:
+                                                     start + (row + 1) * row_bytes], "little")
+        return fog_map
@@ -0,0 +1,100 @@
+"""
+    A NumPy version of the random terrain generator in random_terrain_forever.py.
+    Instead of visiting every tile in Python, regions are stamped onto the map
+    with array masks and the edges are messed up with a 3x3 neighbor count
+    (a convolution) over the whole map at once.
+    Running this file compares the two generators.
+"""
+
+# Import NumPy.
+import numpy as np
+
+
+def _add_regions(terrain: np.ndarray, max_regions: int, region_type: int,
+                 rng: np.random.Generator) -> None:
+    """Make pockets of a region type in the terrain by randomly generating
+       a number of regions between 1 and max_regions and randomly generating
+       a size, and then making a rectangle of that size at that location."""
+    rows: int = terrain.shape[0]
+    cols: int = terrain.shape[1]
+    num_regions: int = rng.integers(1, max_regions, endpoint=True)
+    location_rows: np.ndarray = rng.integers(0, rows, num_regions, endpoint=True)
+    location_cols: np.ndarray = rng.integers(0, cols, num_regions, endpoint=True)
+    half_sizes: np.ndarray = rng.integers(1, rows//4, num_regions, endpoint=True) // 2
+    # For each region, which rows and which columns it covers.
+    in_rows: np.ndarray = ((np.arange(rows) >= (location_rows - half_sizes)[:, None])
+                           & (np.arange(rows) < (location_rows + half_sizes)[:, None]))
+    in_cols: np.ndarray = ((np.arange(cols) >= (location_cols - half_sizes)[:, None])
+                           & (np.arange(cols) < (location_cols + half_sizes)[:, None]))
+    # A tile is in a region if its row and its column are both covered.
+    covered: np.ndarray = (in_rows.T.astype(np.int32) @ in_cols.astype(np.int32)) > 0
+    terrain[covered] = region_type
+
+
+def _neighbor_counts(terrain: np.ndarray, num_types: int) -> np.ndarray:
+    """Return an array of shape (num_types, rows, cols) with the number of tiles
+       of each type in the 3x3 window around each tile, including the tile.
+       The window doesn't go past the edges of the terrain."""
+    rows: int = terrain.shape[0]
+    cols: int = terrain.shape[1]
+    one_hot: np.ndarray = terrain[None, :, :] == np.arange(num_types)[:, None, None]
+    padded: np.ndarray = np.pad(one_hot.astype(np.int32), ((0, 0), (1, 1), (1, 1)))
+    counts: np.ndarray = np.zeros((num_types, rows, cols), dtype=np.int32)
+    row_offset: int
+    col_offset: int
+    for row_offset in range(3):
+        for col_offset in range(3):
+            counts += padded[:, row_offset:row_offset + rows, col_offset:col_offset + cols]
+    return counts
+
+
+def generate_terrain(rows: int, cols: int, background_type: int,
+                     regions: list[tuple[int, int]],
+                     seed: int | None = None) -> np.ndarray:
+    """Generate a rows x cols terrain of background_type with pockets of other
+       types.  regions is a list of (max_regions, region_type) pairs, added in
+       order.  Returns a 2d uint8 array of tile numbers; call tolist() on it for
+       a list[list[int]]."""
+    rng: np.random.Generator = np.random.default_rng(seed)
+    terrain: np.ndarray = np.full((rows, cols), background_type, dtype=np.uint8)
+    # Add the regions.
+    max_regions: int
+    region_type: int
+    for max_regions, region_type in regions:
+        _add_regions(terrain, max_regions, region_type, rng)
+    # Now mess up the edges.  Each tile becomes one of its neighbors, chosen
+    # with probability proportional to how many neighbors are of that type,
+    # which is what random.choice does with a list of the neighbors.
+    num_types: int = int(terrain.max()) + 1
+    cumulative: np.ndarray = np.cumsum(_neighbor_counts(terrain, num_types), axis=0)
+    picks: np.ndarray = rng.random((rows, cols)) * cumulative[-1]
+    return (picks[None, :, :] >= cumulative).sum(axis=0).astype(np.uint8)
+
+
+def main() -> None:
+    """Compare the fraction of each terrain type made by the Python and NumPy
+       generators over a number of seeds."""
+    import os
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    import pygame
+    from random_terrain_forever import Background
+    WIDTH: int = 800
+    HEIGHT: int = 600
+    SEEDS: int = 20
+    NAMES: list[str] = ["dirt", "rock", "grass", "water"]
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    generator: str
+    seed: int
+    counts: list[int]
+    for generator in ["python", "numpy"]:
+        totals: list[int] = [0, 0, 0, 0]
+        for seed in range(SEEDS):
+            counts = Background(WIDTH, HEIGHT, generator, seed).terrain_counts()
+            totals = [total + count for total, count in zip(totals, counts)]
+        print(generator + ": " + ", ".join(f"{name} {total / sum(totals):.3f}"
+                                          for name, total in zip(NAMES, totals)))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 """Draw a randomized, tiled endless background."""
 
-# Import the random library.
+# Import Python libraries.
 import random
+import queue
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 # Import and initialize pygame.
 import pygame
 pygame.init()
+# Import the memory-mapped chunk file for saving terrain.
+from chunk_file import ChunkFile
 
 
 class Player(pygame.sprite.Sprite):
@@ -78,6 +87,140 @@ class Player(pygame.sprite.Sprite):
                 or (direction == Player.RIGHT and self.rect.right >= screen.get_width() - threshold))
  
 
+class TerrainChunks:
+    """A sparse store for terrain tile numbers.  The world is cut into square
+       chunks of CHUNK_SIZE x CHUNK_SIZE tiles.  Each chunk is a compact array
+       of bytes in row-major order, and the chunks are kept in a dictionary
+       keyed by (chunk row, chunk col).  Tile coordinates may be negative, so
+       the world can grow in any direction, and only the chunks that have
+       been visited use memory.  With a chunk file, only the max_chunks most
+       recently used chunks stay in memory; the others are saved to the file
+       and read back in when they are needed again."""
+
+    # Width and height of a chunk in tiles.
+    CHUNK_SIZE: int = 16
+    # Tile number for a tile that hasn't been generated yet.
+    UNKNOWN: int = 255
+
+    # Object-level fields
+    _chunks: OrderedDict[tuple[int, int], array]  # The chunks in memory, least recently used first
+    _max_chunks: int | None       # How many chunks to keep in memory, None for no limit
+    _chunk_file: ChunkFile | None # The file chunks are saved to, if any
+    _lock: threading.Lock         # Guards the chunks in memory, which workers can load and evict too
+    _on_evict: Callable[[tuple[int, int]], None] | None  # Called with the key of each evicted chunk
+
+    def __init__(self, max_chunks: int | None = None,
+                 chunk_file: ChunkFile | None = None,
+                 on_evict: Callable[[tuple[int, int]], None] | None = None) -> None:
+        """Begin with no chunks in memory.  Chunks are only evicted from memory
+           if there is a chunk_file to save them to, and then on_evict, if
+           given, is called with the key of each one, on whichever thread
+           evicted it."""
+        self._chunks = OrderedDict()
+        self._max_chunks = max_chunks
+        self._chunk_file = chunk_file
+        self._lock = threading.Lock()
+        self._on_evict = on_evict
+
+    def __len__(self) -> int:
+        """Return the number of chunks in memory."""
+        return len(self._chunks)
+
+    def _load(self, key: tuple[int, int]) -> array | None:
+        """Read the chunk at key from the chunk file into memory, or return
+           None if it isn't saved there."""
+        chunk: array | None
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is None and self._chunk_file is not None and key in self._chunk_file:
+                chunk = self._chunk_file.read(key)
+                self._chunks[key] = chunk
+                self._evict()
+        return chunk
+
+    def _evict(self) -> None:
+        """Save and forget the least recently used chunks until there are no
+           more than _max_chunks in memory.  Call with _lock held."""
+        key: tuple[int, int]
+        chunk: array
+        if self._chunk_file is None or self._max_chunks is None:
+            return
+        while len(self._chunks) > self._max_chunks:
+            key, chunk = self._chunks.popitem(last=False)
+            self._chunk_file.write(key, chunk)
+            if self._on_evict is not None:
+                self._on_evict(key)
+
+    def save(self) -> None:
+        """Save all of the chunks in memory to the chunk file."""
+        key: tuple[int, int]
+        chunk: array
+        if self._chunk_file is not None:
+            with self._lock:
+                for key, chunk in list(self._chunks.items()):
+                    self._chunk_file.write(key, chunk)
+
+    @staticmethod
+    def chunk_of(row: int, col: int) -> tuple[int, int]:
+        """Return the chunk coordinates of the chunk containing tile row, col."""
+        return (row // TerrainChunks.CHUNK_SIZE, col // TerrainChunks.CHUNK_SIZE)
+
+    @staticmethod
+    def new_chunk() -> array:
+        """Return a chunk with all tiles unknown."""
+        return array("B", [TerrainChunks.UNKNOWN]) * TerrainChunks.CHUNK_SIZE ** 2
+
+    def has_chunk(self, key: tuple[int, int]) -> bool:
+        """Return True if the chunk at chunk coordinates key exists, in memory
+           or in the chunk file.  A chunk in memory counts as just used."""
+        with self._lock:
+            if key in self._chunks:
+                self._chunks.move_to_end(key)
+                return True
+        return self._chunk_file is not None and key in self._chunk_file
+
+    def get_chunk(self, key: tuple[int, int]) -> array | None:
+        """Return the chunk at chunk coordinates key, or None if there isn't one."""
+        chunk: array | None
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+                return chunk
+        return self._load(key)
+
+    def put_chunk(self, key: tuple[int, int], tiles: array) -> None:
+        """Store a complete chunk at chunk coordinates key."""
+        with self._lock:
+            self._chunks[key] = tiles
+            self._chunks.move_to_end(key)
+            self._evict()
+
+    def get(self, row: int, col: int) -> int:
+        """Return the tile number at row, col, or UNKNOWN if it doesn't exist."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        key: tuple[int, int] = (row // size, col // size)
+        chunk: array | None = self.get_chunk(key)
+        if chunk is None:
+            return TerrainChunks.UNKNOWN
+        return chunk[(row % size) * size + col % size]
+
+    def set(self, row: int, col: int, tile: int) -> None:
+        """Set the tile number at row, col, creating its chunk if needed."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        key: tuple[int, int] = (row // size, col // size)
+        chunk: array | None = self.get_chunk(key)
+        if chunk is None:
+            chunk = TerrainChunks.new_chunk()
+            self.put_chunk(key, chunk)
+        chunk[(row % size) * size + col % size] = tile
+
+    def count(self, tile: int) -> int:
+        """Return the number of tiles with tile number tile in the chunks in memory."""
+        chunk: array
+        return sum(chunk.count(tile) for chunk in self._chunks.values())
+
+
 class Background(pygame.sprite.Sprite):
     """ A potentially infinite scrolling tile-based background that grows as needed."""
 
@@ -93,33 +236,108 @@ class Background(pygame.sprite.Sprite):
     ROCK: int = 1
     GRASS: int = 2
     WATER: int = 3
+    # Tiles a new chunk starts out with, before it is fitted to its neighbors.
+    START_CHOICES: list[int] = [GRASS]*50 + [WATER, ROCK, DIRT]
+    # Width and height in tiles of the blocks of tiles that are pre-rendered.
+    # It must divide TerrainChunks.CHUNK_SIZE.
+    BLOCK_SIZE: int = 4
 
     # Object-level fields
-    _tiles: list[pygame.Surface]  # The tiles for different kinds of terrain
-    _terrain: list[list[int]]     # The terrain map, a 2d list of integer
-    _left_top: list[int]          # The index in the terrain map of the TL of image
+    _atlas: pygame.Surface        # The tiles for different kinds of terrain, side by side in tile number order
+    _blocks: OrderedDict[bytes, pygame.Surface]  # Pre-rendered blocks keyed by their tile numbers, least recently used first
+    _max_blocks: int              # How many pre-rendered blocks to keep, 0 to draw tile by tile
+    block_hits: int               # Blocks of tiles that were already pre-rendered
+    block_misses: int             # Blocks of tiles that had to be rendered
+    _terrain: TerrainChunks       # The terrain map, stored in chunks
+    _left_top: list[int]          # The tile column, row in the terrain map of the TL of image
     _direction: int               # Direction the player is moving if it's the background that must move.
-
-    def __init__(self, width: int, height: int) -> None:
-        """Create the terrain map and image.  The initial terrain fits in the window.
+    _scroll_blit: bool            # Scroll the image and draw only the new tiles instead of redrawing it all.
+    _look_ahead: int              # How many tiles past the window to generate in the background, 0 for none.
+    _heading: int                 # The last direction the background moved, to guess where it goes next.
+    _executor: ThreadPoolExecutor | None  # The worker threads that generate chunks ahead of time.
+    _ready: queue.SimpleQueue     # (chunk coordinates, chunk) pairs finished by the workers.
+    _pending: set[tuple[int, int]]     # Chunks the workers have been asked to generate.
+    _prefetched: set[tuple[int, int]]  # Chunks from the workers that haven't been shown yet.
+    _seed: int                    # Seeds each chunk's own random numbers, with the chunk's coordinates.
+    _fixed: set[tuple[int, int]]  # Chunks that existed before any were generated: the initial or saved terrain.
+    _chunk_file: ChunkFile | None # The file the terrain is saved in, if any.
+    chunk_hits: int               # Chunks that were ready when they came into view.
+    chunk_misses: int             # Chunks that had to be generated when they came into view.
+    chunk_wasted: int             # Chunks from the workers that were evicted before they came into view.
+
+    def __init__(self, width: int, height: int, generator: str = "python",
+                 seed: int | None = None, scroll_blit: bool = True,
+                 look_ahead: int = 0, save_file: str | None = None,
+                 max_chunks: int = 256, max_blocks: int = 0) -> None:
+        """Create the terrain map and image.  The initial terrain fits in the window
+           and is made by the "python" or "numpy" generator, seeded with seed if given.
+           If scroll_blit is False, the whole image is redrawn each time it moves.
+           If look_ahead is more than 0, chunks up to look_ahead tiles past the window
+           in the direction of movement are generated on a worker thread.
+           If save_file is given, the terrain is saved to that chunk file and
+           only max_chunks chunks are kept in memory; if the file already has
+           terrain in it, exploring continues where it left off.  max_chunks
+           must hold the chunks the window and look-ahead can cover, or
+           ValueError is raised.
+           Up to max_blocks blocks of BLOCK_SIZE x BLOCK_SIZE tiles are kept
+           pre-rendered, so each block is one blit; 0 draws tile by tile.  With
+           25 pixel tiles drawing tile by tile is usually as fast, so blocks are
+           off unless asked for.
            Background begins not moving and left, top is 0,0 in the terrain map."""
         super().__init__()
         self._direction = Player.STOP
+        self._scroll_blit = scroll_blit
+        # Set up the background chunk generator.
+        self._look_ahead = look_ahead
+        self._heading = Player.STOP
+        self._executor = None
+        if look_ahead > 0:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._ready = queue.SimpleQueue()
+        self._pending = set()
+        self._prefetched = set()
+        self.chunk_hits = 0
+        self.chunk_misses = 0
+        self.chunk_wasted = 0
+        if save_file is not None and max_chunks < Background.min_chunks(width, height, look_ahead):
+            raise ValueError(f"max_chunks is {max_chunks}, but a {width} x {height} window "
+                             f"with look_ahead {look_ahead} needs at least "
+                             f"{Background.min_chunks(width, height, look_ahead)}")
         # Create the terrain map
-        self._terrain = []
+        if seed is not None:
+            random.seed(seed)
+        self._seed = random.getrandbits(32)
+        self._chunk_file = None
+        if save_file is not None:
+            self._chunk_file = ChunkFile(save_file, TerrainChunks.CHUNK_SIZE ** 2)
+        self._terrain = TerrainChunks(max_chunks, self._chunk_file, self._evicted)
         self._left_top = [0, 0]
-        self._generate_initial_terrain(width, height)
+        if self._chunk_file is not None and len(self._chunk_file) > 0:
+            self._fixed = set(self._chunk_file.keys())
+            self._left_top = list(self._chunk_file.get_position())
+            self._generate_visible_chunks(width, height)
+        else:
+            rows: int
+            cols: int
+            rows, cols = self._initial_size(width, height)
+            self._fixed = set(self._chunks_in(0, 0, rows - 1, cols - 1))
+            if generator == "numpy":
+                self._generate_initial_terrain_numpy(width, height, seed)
+            else:
+                self._generate_initial_terrain(width, height)
+        # Create the tile atlas and the empty block cache.
+        tiles_surf: pygame.Surface = pygame.image.load("terrain.jpg").convert()
+        self._atlas = pygame.Surface((4 * Background.TILE_SIZE, Background.TILE_SIZE)).convert()
+        self._atlas.blit(tiles_surf, (Background.DIRT * Background.TILE_SIZE, 0), pygame.Rect(Background.DIRT_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
+        self._atlas.blit(tiles_surf, (Background.ROCK * Background.TILE_SIZE, 0), pygame.Rect(Background.ROCK_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
+        self._atlas.blit(tiles_surf, (Background.GRASS * Background.TILE_SIZE, 0), pygame.Rect(Background.GRASS_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
+        self._atlas.blit(tiles_surf, (Background.WATER * Background.TILE_SIZE, 0), pygame.Rect(Background.WATER_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
+        self._blocks = OrderedDict()
+        self._max_blocks = max_blocks
+        self.block_hits = 0
+        self.block_misses = 0
         # Create the starting image from the terrain,
         # located at (0,0).
-        tiles_surf: pygame.Surface = pygame.image.load("terrain.jpg").convert()
-        self._tiles = [pygame.Surface((Background.TILE_SIZE, Background.TILE_SIZE)),
-                       pygame.Surface((Background.TILE_SIZE, Background.TILE_SIZE)),
-                       pygame.Surface((Background.TILE_SIZE, Background.TILE_SIZE)),
-                       pygame.Surface((Background.TILE_SIZE, Background.TILE_SIZE))]
-        self._tiles[0].blit(tiles_surf, (0, 0), pygame.Rect(Background.DIRT_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
-        self._tiles[1].blit(tiles_surf, (0, 0), pygame.Rect(Background.ROCK_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
-        self._tiles[2].blit(tiles_surf, (0, 0), pygame.Rect(Background.GRASS_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))
-        self._tiles[3].blit(tiles_surf, (0, 0), pygame.Rect(Background.WATER_LT, (Background.TILE_SIZE, Background.TILE_SIZE)))                                            
         self.image = self._get_surface(width, height)
         self.rect = self.image.get_rect()
 
@@ -127,10 +345,10 @@ class Background(pygame.sprite.Sprite):
     ########################################################################
     # Helper methods for creating a "random" terrain.                      #
     ########################################################################
-    def _add_regions(self, max_regions: int, region_type: int) -> None:
-        """Make pockets of a region type in the terrain by randomly generating
-           a number of regions between 1 and max_regions and randomly generating
-           a size, and then making a rectangle of that size at that location."""
+    def _add_regions(self, rows: int, cols: int, max_regions: int, region_type: int) -> None:
+        """Make pockets of a region type in the rows x cols terrain at 0,0 by randomly
+           generating a number of regions between 1 and max_regions and randomly
+           generating a size, and then making a rectangle of that size at that location."""
         num_regions: int = random.randint(1, max_regions)
         region: int
         location: tuple[int]
@@ -138,58 +356,110 @@ class Background(pygame.sprite.Sprite):
         row: int
         col: int
         for region in range(num_regions):
-            location = (random.randint(0, len(self._terrain)),
-                        random.randint(0, len(self._terrain[0])))
-            size = random.randint(1, len(self._terrain)//4)
-            for row in range(max(location[0]-size//2, 0), min(location[0]+size//2, len(self._terrain))):
-                for col in range(max(location[1]-size//2, 0), min(location[1]+size//2, len(self._terrain[0]))):
-                    self._terrain[row][col] = region_type
-
-    def _get_neighbors(self, row: int, col: int) -> list[int]:
+            location = (random.randint(0, rows),
+                        random.randint(0, cols))
+            size = random.randint(1, rows//4)
+            for row in range(max(location[0]-size//2, 0), min(location[0]+size//2, rows)):
+                for col in range(max(location[1]-size//2, 0), min(location[1]+size//2, cols)):
+                    self._terrain.set(row, col, region_type)
+
+    def _get_neighbors(self, row: int, col: int, key: tuple[int, int] | None = None,
+                       chunk: array | None = None,
+                       starts: dict[tuple[int, int], array] | None = None) -> list[int]:
         """Make a list of terrain types neighboring a terrain, including the
-           terrain at row, col.  Be sure not to index past edges of the terrain."""
+           terrain at row, col.  If key is given, tiles in that chunk come from
+           chunk, a chunk that is still being generated and isn't in the terrain
+           map yet, and tiles in other chunks that aren't fixed come from their
+           starting tiles, which are kept in starts.  Be sure not to include
+           tiles that haven't been generated yet."""
         neighbors: list[int] = []
-        rows: int = len(self._terrain)
-        cols: int = len(self._terrain[0])
+        size: int = TerrainChunks.CHUNK_SIZE
         row_offset: int
         col_offset: int
         new_row: int
         new_col: int
+        tile: int
+        new_key: tuple[int, int]
         for row_offset in [-1, 0, 1]:
             for col_offset in [-1, 0, 1]:
                 new_row = row + row_offset
                 new_col = col + col_offset
-                if 0 <= new_row and new_row < rows and 0 <= new_col and new_col < cols:
-                    neighbors.append(self._terrain[new_row][new_col])
+                new_key = TerrainChunks.chunk_of(new_row, new_col)
+                if key is not None and new_key == key:
+                    tile = chunk[(new_row % size) * size + new_col % size]
+                elif key is not None and new_key not in self._fixed:
+                    if new_key not in starts:
+                        starts[new_key] = self._start_chunk(new_key)[0]
+                    tile = starts[new_key][(new_row % size) * size + new_col % size]
+                else:
+                    tile = self._terrain.get(new_row, new_col)
+                if tile != TerrainChunks.UNKNOWN:
+                    neighbors.append(tile)
         return neighbors
 
+    def _initial_size(self, width: int, height: int) -> tuple[int, int]:
+        """Return the rows, cols of whole chunks needed to fill the window."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        return (-(-(height // Background.TILE_SIZE) // size) * size,
+                -(-(width // Background.TILE_SIZE) // size) * size)
+
     def _generate_initial_terrain(self, width: int, height: int) -> None:
         """Generate an initial terrain that is grass with pockets of dirt,
-           stone, and water."""
+           stone, and water.  The terrain covers whole chunks, enough of them
+           to fill the window."""
         # Create an initial grassy area
+        rows: int
+        cols: int
+        rows, cols = self._initial_size(width, height)
         row: int
         col: int
         surrounding: list[int]
-        for row in range(height // Background.TILE_SIZE):
-            self._terrain.append([])
-            for col in range(width // Background.TILE_SIZE):
-                self._terrain[row].append(Background.GRASS)
+        for row in range(rows):
+            for col in range(cols):
+                self._terrain.set(row, col, Background.GRASS)
         # Add water, rock, and dirt.
-        self._add_regions(5, Background.WATER)
-        self._add_regions(7, Background.ROCK)
-        self._add_regions(6, Background.DIRT)
+        self._add_regions(rows, cols, 5, Background.WATER)
+        self._add_regions(rows, cols, 7, Background.ROCK)
+        self._add_regions(rows, cols, 6, Background.DIRT)
         # Now mess up the edges.
-        for row in range(len(self._terrain)):
-            for col in range(len(self._terrain[row])):
+        for row in range(rows):
+            for col in range(cols):
                 surrounding = self._get_neighbors(row, col)
-                self._terrain[row][col] = random.choice(surrounding)
-
-    def _generate_new_tile(self, row: int, col: int) -> int:
-        """Generate a new tile that will extend the current terrain."""
+                self._terrain.set(row, col, random.choice(surrounding))
+
+    def _generate_initial_terrain_numpy(self, width: int, height: int,
+                                        seed: int | None) -> None:
+        """Generate the same kind of initial terrain as _generate_initial_terrain
+           with NumPy, and copy it into the terrain chunks."""
+        # Only import NumPy if we are using it.
+        import numpy_terrain
+        rows: int
+        cols: int
+        rows, cols = self._initial_size(width, height)
+        terrain = numpy_terrain.generate_terrain(rows, cols, Background.GRASS,
+                                                 [(5, Background.WATER),
+                                                  (7, Background.ROCK),
+                                                  (6, Background.DIRT)], seed)
+        size: int = TerrainChunks.CHUNK_SIZE
+        row: int
+        col: int
+        for row in range(0, rows, size):
+            for col in range(0, cols, size):
+                self._terrain.put_chunk(TerrainChunks.chunk_of(row, col),
+                                        array("B", terrain[row:row + size, col:col + size].tobytes()))
+
+    def _generate_new_tile(self, row: int, col: int, key: tuple[int, int] | None = None,
+                           chunk: array | None = None,
+                           starts: dict[tuple[int, int], array] | None = None,
+                           rng: random.Random | None = None) -> int:
+        """Generate a new tile that will extend the current terrain, and the
+           chunk at key if it is given, with rng or the random module."""
+        if rng is None:
+            rng = random
         # Get the surrounding tile types.
-        choices = self._get_neighbors(row, col)
+        choices = self._get_neighbors(row, col, key, chunk, starts)
         # Weight non-grass tiles higher 50% of the time.
-        heads: int = random.randint(0, 1)
+        heads: int = rng.randint(0, 1)
         if heads:
             weighted_choices: list[int] = []
             choice: int
@@ -199,135 +469,305 @@ class Background(pygame.sprite.Sprite):
                     weighted_choices.append(choice)
         else:
             weighted_choices = choices
-        return random.choice(weighted_choices)
-
-    def _insert_row_above(self) -> None:
-        """Insert a row above the existing terrain. This becomes the new row at index zero."""
-        # Create a row of random values that favor grass.
-        row: list = []
-        for col in range(len(self._terrain[0])):
-            row.append(random.choice([Background.GRASS]*50 + [Background.WATER, Background.ROCK, Background.DIRT]))
-        # Add it to the start of the list.
-        self._terrain.insert(0, row)
-        # Now coordinate that more with existing terrain.
-        col_index: int
-        for col_index in range(len(row)):
-            self._terrain[0][col_index] = self._generate_new_tile(0, col_index)
-        
-    def _insert_row_below(self) -> None:
-        """Insert a row at the bottom of the existing terrain."""
-        # Create a row of random values that favor grass.
-        row: list = []
-        for col in range(len(self._terrain[0])):
-            row.append(random.choice([Background.GRASS]*50 + [Background.WATER, Background.ROCK, Background.DIRT]))
-        # Add it to the end of the list.
-        self._terrain.append(row)
-        # Now coordinate that more with existing terrain.
-        col_index: int
-        row_index: int = len(self._terrain)-1
-        for col_index in range(len(row)):
-            self._terrain[row_index][col_index] = self._generate_new_tile(row_index, col_index)
-
-    def _insert_col_left(self) -> None:
-        """Insert a column to the left of the existing terrain."""
-        # For each row, insert a value to the left.
-        # Start with random values that favor grass.
-        for row in self._terrain:
-            row.insert(0, random.choice([Background.GRASS]*50 + [Background.WATER, Background.ROCK, Background.DIRT]))
-        # Now coordinate that more with existing terrain.
-        row_index: int
-        for row_index in range(len(self._terrain)):
-            self._terrain[row_index][0] = self._generate_new_tile(row_index, 0)
-        
-    def _insert_col_right(self) -> None:
-        """Insert a column to the right of the existing terrain."""
-        # For each row, insert a value to the right.
+        return rng.choice(weighted_choices)
+
+    def _start_chunk(self, key: tuple[int, int]) -> tuple[array, random.Random]:
+        """Return the starting tiles of the chunk at chunk coordinates key,
+           random values that favor grass, and the random numbers that made
+           them.  They only depend on the terrain's seed and key."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        rng: random.Random = random.Random(f"{self._seed}:{key[0]}:{key[1]}")
+        return array("B", rng.choices(Background.START_CHOICES, k=size * size)), rng
+
+    def _make_chunk(self, key: tuple[int, int]) -> array:
+        """Make the chunk at chunk coordinates key so that it extends the
+           terrain around it.  The terrain map isn't changed, so this can run
+           on a worker thread.  The chunk is fitted to the fixed terrain and
+           to the starting tiles of the other chunks around it, with its own
+           random numbers, so it comes out the same whichever thread makes
+           it and whenever it is made."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        top: int = key[0] * size
+        left: int = key[1] * size
+        chunk: array
+        rng: random.Random
         # Start with random values that favor grass.
-        for row in self._terrain:
-            row.append(random.choice([Background.GRASS]*50 + [Background.WATER, Background.ROCK, Background.DIRT]))
-        # Now coordinate that more with existing terrain.
-        last_index: int = len(self._terrain[0]) - 1
-        row_index: int
-        for row_index in range(len(self._terrain)):
-            self._terrain[row_index][last_index] = self._generate_new_tile(row_index, last_index)
+        chunk, rng = self._start_chunk(key)
+        starts: dict[tuple[int, int], array] = {}
+        row: int
+        col: int
+        # Now coordinate that more with the terrain around it.
+        for row in range(top, top + size):
+            for col in range(left, left + size):
+                chunk[(row - top) * size + col - left] = self._generate_new_tile(row, col, key, chunk,
+                                                                                 starts, rng)
+        return chunk
+
+    def _chunks_in(self, top: int, left: int, bottom: int, right: int) -> list[tuple[int, int]]:
+        """Return the chunk coordinates of the chunks covering tile rows top to
+           bottom and tile columns left to right."""
+        top_left: tuple[int, int] = TerrainChunks.chunk_of(top, left)
+        bottom_right: tuple[int, int] = TerrainChunks.chunk_of(bottom, right)
+        return [(chunk_row, chunk_col)
+                for chunk_row in range(top_left[0], bottom_right[0] + 1)
+                for chunk_col in range(top_left[1], bottom_right[1] + 1)]
+
+    def _generate_visible_chunks(self, width: int, height: int) -> None:
+        """Generate any chunks that the window is showing but don't exist yet,
+           counting the ones the workers had ready as hits and the others as misses."""
+        key: tuple[int, int]
+        for key in self._chunks_in(self._left_top[1], self._left_top[0],
+                                   self._left_top[1] + height//Background.TILE_SIZE - 1,
+                                   self._left_top[0] + width//Background.TILE_SIZE - 1):
+            if key in self._prefetched:
+                self._prefetched.discard(key)
+                self.chunk_hits += 1
+            elif not self._terrain.has_chunk(key):
+                self._terrain.put_chunk(key, self._make_chunk(key))
+                self.chunk_misses += 1
+
+    def _evicted(self, key: tuple[int, int]) -> None:
+        """Forget that the chunk at key was prefetched, now that it has been
+           evicted, and count it as wasted if it was never shown."""
+        if key in self._prefetched:
+            self._prefetched.discard(key)
+            self.chunk_wasted += 1
+
+    def _prefetch_chunk(self, key: tuple[int, int]) -> None:
+        """Make the chunk at key and hand it to the game loop.  Runs on a worker thread."""
+        self._ready.put((key, self._make_chunk(key)))
+
+    def _add_ready_chunks(self) -> None:
+        """Add the chunks the workers have finished to the terrain map."""
+        key: tuple[int, int]
+        chunk: array
+        while not self._ready.empty():
+            key, chunk = self._ready.get_nowait()
+            self._pending.discard(key)
+            # The game loop may have needed it before it was ready.
+            if not self._terrain.has_chunk(key):
+                self._prefetched.add(key)
+                self._terrain.put_chunk(key, chunk)
+
+    def _prefetch_chunks(self, width: int, height: int) -> None:
+        """Ask the workers for the chunks up to _look_ahead tiles past the window
+           in the direction the background is heading."""
+        top: int = self._left_top[1]
+        left: int = self._left_top[0]
+        bottom: int = top + height//Background.TILE_SIZE - 1
+        right: int = left + width//Background.TILE_SIZE - 1
+        if self._heading == Player.UP:
+            top -= self._look_ahead
+        elif self._heading == Player.DOWN:
+            bottom += self._look_ahead
+        elif self._heading == Player.LEFT:
+            left -= self._look_ahead
+        elif self._heading == Player.RIGHT:
+            right += self._look_ahead
+        key: tuple[int, int]
+        for key in self._chunks_in(top, left, bottom, right):
+            if not self._terrain.has_chunk(key) and key not in self._pending:
+                self._pending.add(key)
+                self._executor.submit(self._prefetch_chunk, key)
+
+    def _draw_single_tiles(self, surf: pygame.Surface, x: int, y: int, first_row: int,
+                           first_col: int, num_rows: int, num_cols: int) -> None:
+        """Draw the num_rows x num_cols tiles of the terrain map starting at
+           first_row, first_col on surf one at a time, with the first at x, y."""
+        # row and col are tile coordinates in the terrain map.
+        row: int
+        col: int
+        # The tile in the atlas to blit.
+        area: pygame.Rect = pygame.Rect(0, 0, Background.TILE_SIZE, Background.TILE_SIZE)
+        # Iterate through the terrain map for the part that's being drawn.
+        # Blit the correct tile for the map from the atlas.
+        for row in range(num_rows):
+            for col in range(num_cols):
+                area.left = self._terrain.get(first_row + row, first_col + col) * Background.TILE_SIZE
+                surf.blit(self._atlas, (x + col * Background.TILE_SIZE, y + row * Background.TILE_SIZE), area)
+
+    def _get_block(self, block_row: int, block_col: int) -> pygame.Surface:
+        """Return a Surface with the BLOCK_SIZE x BLOCK_SIZE tiles of the terrain
+           map starting at block_row, block_col, which are multiples of BLOCK_SIZE.
+           The block comes from the block cache if the same tiles have been
+           rendered before, and the least recently used blocks are dropped."""
+        # CHUNK_SIZE is a multiple of BLOCK_SIZE, so the block is inside one
+        # chunk and its tile numbers are slices of the chunk's rows.
+        size: int = TerrainChunks.CHUNK_SIZE
+        chunk: array = self._terrain.get_chunk(TerrainChunks.chunk_of(block_row, block_col))
+        start: int = (block_row % size) * size + block_col % size
+        row: int
+        key: bytes = b"".join(chunk[start + row * size:start + row * size + Background.BLOCK_SIZE].tobytes()
+                              for row in range(Background.BLOCK_SIZE))
+        block: pygame.Surface | None = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            self.block_hits += 1
+            return block
+        self.block_misses += 1
+        block = pygame.Surface((Background.BLOCK_SIZE * Background.TILE_SIZE,
+                                Background.BLOCK_SIZE * Background.TILE_SIZE)).convert()
+        self._draw_single_tiles(block, 0, 0, block_row, block_col,
+                                Background.BLOCK_SIZE, Background.BLOCK_SIZE)
+        self._blocks[key] = block
+        if len(self._blocks) > self._max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _draw_tiles(self, surf: pygame.Surface, first_row: int, first_col: int,
+                    num_rows: int, num_cols: int) -> None:
+        """Draw num_rows x num_cols tiles on surf, starting at first_row, first_col
+           counted in tiles from the top left of the image.  Unless there is no
+           block cache, the tiles are drawn with one blit for each pre-rendered
+           block they are part of."""
+        # The tiles to draw, in terrain map coordinates (bottom, right not included).
+        top: int = self._left_top[1] + first_row
+        left: int = self._left_top[0] + first_col
+        bottom: int = top + num_rows
+        right: int = left + num_cols
+        if self._max_blocks <= 0:
+            self._draw_single_tiles(surf, first_col * Background.TILE_SIZE,
+                                    first_row * Background.TILE_SIZE,
+                                    top, left, num_rows, num_cols)
+            return
+        block_row: int
+        block_col: int
+        area: pygame.Rect
+        for block_row in range(top - top % Background.BLOCK_SIZE, bottom, Background.BLOCK_SIZE):
+            for block_col in range(left - left % Background.BLOCK_SIZE, right, Background.BLOCK_SIZE):
+                # Only blit the part of the block that is being drawn.
+                area = pygame.Rect(max(left - block_col, 0) * Background.TILE_SIZE,
+                                   max(top - block_row, 0) * Background.TILE_SIZE,
+                                   (min(block_col + Background.BLOCK_SIZE, right) - max(block_col, left))
+                                   * Background.TILE_SIZE,
+                                   (min(block_row + Background.BLOCK_SIZE, bottom) - max(block_row, top))
+                                   * Background.TILE_SIZE)
+                surf.blit(self._get_block(block_row, block_col),
+                          ((max(block_col, left) - self._left_top[0]) * Background.TILE_SIZE,
+                           (max(block_row, top) - self._left_top[1]) * Background.TILE_SIZE),
+                          area)
 
     def _get_surface(self, width: int, height: int) -> pygame.Surface:
+        """Create a Surface with all of the tiles showing in the window."""
         # The Surface to draw the tiles on.
         surf: pygame.Surface = pygame.Surface((width, height))
-        # row and col index into the two-dimensional list of map tile numbers.
-        row: int
-        col: int
-        # x and y are the blit coordinates on surf -- they will stay between 0,0 and width, height.
-        x: int = 0
-        y: int = 0
-        # Iterate through the 2D list of map tile numbers for the part that's showing,
-        # which begins at self._left_top.  Blit the correct tile for the map from the _tiles.
-        for row in range(self._left_top[1], self._left_top[1] + height//Background.TILE_SIZE):
-            for col in range(self._left_top[0], self._left_top[0] + width//Background.TILE_SIZE):
-                surf.blit(self._tiles[self._terrain[row][col]], (x, y))
-                x += Background.TILE_SIZE
-            y += Background.TILE_SIZE
-            x = 0
-        return surf   
+        self._draw_tiles(surf, 0, 0, height//Background.TILE_SIZE, width//Background.TILE_SIZE)
+        return surf
+
+    def _scroll_surface(self, width: int, height: int) -> None:
+        """Scroll the image one tile opposite to self._direction and draw only the
+           row or column of tiles that scrolled into view."""
+        rows: int = height//Background.TILE_SIZE
+        cols: int = width//Background.TILE_SIZE
+        if self._direction == Player.UP:
+            self.image.scroll(0, Background.TILE_SIZE)
+            self._draw_tiles(self.image, 0, 0, 1, cols)
+        elif self._direction == Player.DOWN:
+            self.image.scroll(0, -Background.TILE_SIZE)
+            self._draw_tiles(self.image, rows - 1, 0, 1, cols)
+        elif self._direction == Player.LEFT:
+            self.image.scroll(Background.TILE_SIZE, 0)
+            self._draw_tiles(self.image, 0, 0, rows, 1)
+        elif self._direction == Player.RIGHT:
+            self.image.scroll(-Background.TILE_SIZE, 0)
+            self._draw_tiles(self.image, 0, cols - 1, rows, 1)
 
     ########################################################################
     # Public methods.                                                      #
     ########################################################################
 
+    @staticmethod
+    def min_chunks(width: int, height: int, look_ahead: int = 0) -> int:
+        """Return the most chunks a width x height window can cover, with
+           look_ahead more tiles in whichever direction it is heading."""
+        size: int = TerrainChunks.CHUNK_SIZE
+        cols: int = width // Background.TILE_SIZE
+        rows: int = height // Background.TILE_SIZE
+        # n tiles starting anywhere in a chunk can reach into (n - 1)//size + 2 chunks.
+        return max(((cols + look_ahead - 1)//size + 2) * ((rows - 1)//size + 2),
+                   ((cols - 1)//size + 2) * ((rows + look_ahead - 1)//size + 2))
+
+    def get_stats(self) -> dict[str, int]:
+        """Return counters for measuring the background, such as with benchmark.py."""
+        return {"chunks": len(self._terrain),
+                "saved_chunks": 0 if self._chunk_file is None else len(self._chunk_file),
+                "chunk_hits": self.chunk_hits,
+                "chunk_misses": self.chunk_misses,
+                "chunk_wasted": self.chunk_wasted,
+                "blocks": len(self._blocks),
+                "block_hits": self.block_hits,
+                "block_misses": self.block_misses}
+
+    def terrain_counts(self) -> list[int]:
+        """Return the number of generated tiles of each terrain type."""
+        return [self._terrain.count(tile) for tile in
+                [Background.DIRT, Background.ROCK, Background.GRASS, Background.WATER]]
+
+    def redraw(self, screen: pygame.Surface) -> None:
+        """Redraw the whole image from the terrain map.  The image should be the
+           same as the one made by scrolling, so this can be used to check it."""
+        self.image = self._get_surface(screen.get_width(), screen.get_height())
+        self.rect = self.image.get_rect()
+
     def move(self, direction: int) -> None:
         """Set the direction of movement for the background (in terms of player motion)."""
         self._direction = direction
+        if direction != Player.STOP:
+            self._heading = direction
+
+    def close(self) -> None:
+        """Stop the background chunk generator, if there is one, and save the
+           terrain and window position to the chunk file, if there is one."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._chunk_file is not None:
+            self._terrain.save()
+            self._chunk_file.set_position(self._left_top[0], self._left_top[1])
+            self._chunk_file.close()
+            self._chunk_file = None
 
     def update(self, screen: pygame.Surface) -> None:
-        """Move the background one unit in self._direction, possibly adding terrain and redrawing."""
-        # If player is moving up and we need to add terrain, add terrain.
-        # Otherwise, subtract one from top.
+        """Move the background one unit in self._direction, adding terrain chunks
+           as needed and redrawing."""
+        if self._executor is not None:
+            self._add_ready_chunks()
         if self._direction == Player.UP:
-            if self._left_top[1] == 0:
-                self._insert_row_above()
-            else:
-                self._left_top[1] -= 1
-            
-        # If player is moving down past the border and we need to add terrain, add terrain.
-        # Add one to top.
+            self._left_top[1] -= 1
         elif self._direction == Player.DOWN:
-            if (self._left_top[1] + screen.get_height() // Background.TILE_SIZE) == len(self._terrain):
-                self._insert_row_below()
             self._left_top[1] += 1
-            
-        # If player is moving left past the border and we need to add terrain, add terrain.
-        # Otherwise, subtract one from left.
         elif self._direction == Player.LEFT:
-            if self._left_top[0] == 0:
-                self._insert_col_left()
-            else:
-                self._left_top[0] -= 1
-            
-        # If player is moving right and we need to add terrain, add terrain.
-        # Add one to left.
+            self._left_top[0] -= 1
         elif self._direction == Player.RIGHT:
-            if (self._left_top[0] + screen.get_width() // Background.TILE_SIZE) == len(self._terrain[0]):
-                self._insert_col_right()
             self._left_top[0] += 1
 
-        # If we had to move the background, redraw the image.
+        # If we had to move the background, add any terrain we now need
+        # and scroll or redraw the image.
         if self._direction != Player.STOP:
-            self.image = self._get_surface(screen.get_width(), screen.get_height())
-            self.rect = self.image.get_rect()
+            self._generate_visible_chunks(screen.get_width(), screen.get_height())
+            if self._executor is not None:
+                self._prefetch_chunks(screen.get_width(), screen.get_height())
+            if self._scroll_blit:
+                self._scroll_surface(screen.get_width(), screen.get_height())
+            else:
+                self.redraw(screen)
 
 
 
                    
 
-def main() -> None:
-    """Allow the user to explore an infinite random space."""
+def main(width: int = 800, height: int = 600, save_file: str | None = None) -> None:
+    """Allow the user to explore an infinite random space in a width x height window.
+       If save_file is given, the terrain is saved there and reloaded next time."""
     # Annotate and initialize window and background constants and variables.
-    WIDTH: int = 800
-    HEIGHT: int = 600
+    WIDTH: int = width
+    HEIGHT: int = height
     SPEED: int = 10
+    LOOK_AHEAD: int = 16 # how many tiles past the window to generate in the background
     screen: pygame.Surface = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Use the arrow keys to explore")
-    background: Background = Background(WIDTH, HEIGHT)
+    background: Background = Background(WIDTH, HEIGHT, look_ahead=LOOK_AHEAD,
+                                        save_file=save_file)
     background_group: pygame.sprite.Group = pygame.sprite.Group(background)
 
     # Annotate and initialize constants and variables for the sprite.
@@ -393,6 +833,9 @@ def main() -> None:
                 
         # Show the display.
         pygame.display.flip()
+    background.close()
     pygame.quit()
 
-main()
+if __name__ == "__main__":
+    # Run with a file name to save and reload the terrain.
+    main(save_file=sys.argv[1] if len(sys.argv) > 1 else None)
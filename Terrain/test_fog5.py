@@ -0,0 +1,69 @@
+"""
+    Check that fog5's Background, which only redraws the parts of its
+    layers that changed, draws exactly what redrawing everything would.
+    A player wanders over the window for many frames, and after every
+    frame the explored layer is compared with one drawn from scratch, and
+    the frame with the explored layer and darkness put together again.
+"""
+
+# Import libraries
+import random
+
+# Import and initialize pygame.
+import pygame
+pygame.init()
+
+# Import the fog demo
+from fog5 import Background, Player
+
+# Define constants
+WIDTH: int = 400
+HEIGHT: int = 300
+NUM_FRAMES: int = 300
+DIRECTIONS: list[int] = [Player.UP, Player.DOWN, Player.LEFT, Player.RIGHT, Player.STOP]
+
+
+def draw_everything(background: Background) -> tuple[bytes, bytes]:
+    """Return the explored layer drawn from scratch from the fog map, and
+       the frame put together from it and the darkness layer."""
+    explored: pygame.Surface = background._explored
+    background._explored = pygame.Surface(explored.get_size(), flags = pygame.SRCALPHA)
+    background._draw_explored(background._explored.get_rect())
+    full: pygame.Surface = background._explored
+    background._explored = explored
+    frame: pygame.Surface = full.copy()
+    frame.blit(background._darkness, (0, 0))
+    return pygame.image.tobytes(full, "RGBA"), pygame.image.tobytes(frame, "RGBA")
+
+
+# Annotate variables
+frame_num: int
+failures: int = 0
+direction: int = Player.STOP
+explored: bytes
+frame: bytes
+
+# Walk the player around at random and compare every frame.
+random.seed(5)
+screen: pygame.Surface = pygame.display.set_mode((WIDTH, HEIGHT))
+player: Player = Player(pygame.image.load("class_dash_sprite.png").convert_alpha(),
+                        25, 25, 10)
+background: Background = Background(WIDTH, HEIGHT, player)
+for frame_num in range(NUM_FRAMES):
+    if frame_num % 10 == 0:
+        direction = random.choice(DIRECTIONS)
+    player.move(direction)
+    player.update(screen, background)
+    background.unfog(player.rect.centerx, player.rect.centery)
+    background.update(screen, player.rect.center, player.direction_facing)
+    explored, frame = draw_everything(background)
+    if pygame.image.tobytes(background._explored, "RGBA") != explored:
+        failures += 1
+        print(f"Frame {frame_num}: the explored layer differs from a full redraw")
+    elif pygame.image.tobytes(background.image, "RGBA") != frame:
+        failures += 1
+        print(f"Frame {frame_num}: the frame differs from a full recomposite")
+
+print(f"{NUM_FRAMES - failures} of {NUM_FRAMES} frames matched a full redraw")
+
+pygame.quit()
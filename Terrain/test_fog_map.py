@@ -0,0 +1,115 @@
+"""
+    Check FogMap against a simple set of revealed (col, row) tiles, for
+    many random maps.  Rectangles and discs are revealed partly or wholly
+    off the map, with negative and empty sizes, and after each one every
+    query is compared with the set, and the map is saved and loaded again.
+"""
+
+# Import libraries
+import random
+
+# Import the fog map
+from fog_map import FogMap
+
+# Define constants
+NUM_TESTS: int = 300
+NUM_STEPS: int = 40
+
+
+def random_rect(rng: random.Random, cols: int, rows: int) -> tuple[int, int, int, int]:
+    """Return a rectangle that can be off the map, empty or negative."""
+    return (rng.randint(-5, cols + 2), rng.randint(-5, rows + 2),
+            rng.randint(-2, cols // 2 + 3), rng.randint(-2, rows // 2 + 3))
+
+
+def rect_tiles(rect: tuple[int, int, int, int], cols: int, rows: int) -> set[tuple[int, int]]:
+    """Return the tiles of the map in rect."""
+    left, top, width, height = rect
+    return {(col, row) for col in range(max(left, 0), min(left + width, cols))
+            for row in range(max(top, 0), min(top + height, rows))}
+
+
+def disc_tiles(center: tuple[int, int], radius: int, cols: int,
+               rows: int) -> set[tuple[int, int]]:
+    """Return the tiles of the map within radius of center; none if radius
+       is negative."""
+    return {(col, row) for col in range(cols) for row in range(rows)
+            if radius >= 0
+            and (col - center[0]) ** 2 + (row - center[1]) ** 2 <= radius * radius}
+
+
+def check(fog_map: FogMap, revealed: set[tuple[int, int]], cols: int, rows: int,
+          rng: random.Random) -> list[str]:
+    """Return what fog_map gets wrong compared with revealed."""
+    errors: list[str] = []
+    col: int
+    row: int
+    wrong: list[tuple[int, int]] = [(col, row) for col in range(cols) for row in range(rows)
+                                    if fog_map.is_fogged(col, row) == ((col, row) in revealed)]
+    if wrong:
+        errors.append(f"is_fogged wrong at {wrong[:5]}")
+    if fog_map.count_revealed() != len(revealed):
+        errors.append(f"count_revealed {fog_map.count_revealed()}, expected {len(revealed)}")
+    rect: tuple[int, int, int, int] = random_rect(rng, cols, rows)
+    tiles: set[tuple[int, int]] = rect_tiles(rect, cols, rows)
+    if fog_map.is_fogged_any(rect) != bool(tiles - revealed):
+        errors.append(f"is_fogged_any{rect} is {fog_map.is_fogged_any(rect)}")
+    if fog_map.is_revealed_any(rect) != bool(tiles & revealed):
+        errors.append(f"is_revealed_any{rect} is {fog_map.is_revealed_any(rect)}")
+    loaded: FogMap = FogMap.from_bytes(fog_map.to_bytes())
+    if len(loaded) != cols * rows or any(loaded.is_fogged(col, row) != fog_map.is_fogged(col, row)
+                                         for col in range(cols) for row in range(rows)):
+        errors.append("the map changed when saved and loaded")
+    return errors
+
+
+# Annotate variables
+test_num: int
+failures: int = 0
+rng: random.Random
+fog_map: FogMap
+revealed: set[tuple[int, int]]
+new: set[tuple[int, int]]
+changed: bool
+errors: list[str]
+
+# Reveal random rectangles and discs and compare after each one.
+for test_num in range(NUM_TESTS):
+    rng = random.Random(test_num)
+    cols: int = rng.randint(1, 70)
+    rows: int = rng.randint(1, 30)
+    fog_map = FogMap(cols, rows)
+    revealed = set()
+    errors = []
+    for step in range(NUM_STEPS):
+        if rng.random() < 0.5:
+            rect: tuple[int, int, int, int] = random_rect(rng, cols, rows)
+            new = rect_tiles(rect, cols, rows) - revealed
+            changed = fog_map.reveal_rect(rect)
+            action: str = f"reveal_rect{rect}"
+        else:
+            center: tuple[int, int] = (rng.randint(-6, cols + 5), rng.randint(-6, rows + 5))
+            radius: int = rng.randint(-1, 8)
+            new = disc_tiles(center, radius, cols, rows) - revealed
+            changed = fog_map.reveal_disc(center, radius)
+            action = f"reveal_disc({center}, {radius})"
+        if changed != bool(new):
+            errors.append(f"{action} returned {changed}")
+        # Every newly revealed tile must be inside the changed area.
+        area: tuple[int, int, int, int] | None = fog_map.take_changed()
+        if new and (area is None or not new <= rect_tiles(area, cols, rows)):
+            errors.append(f"{action} changed area {area} misses new tiles")
+        elif not new and area is not None:
+            errors.append(f"{action} changed area {area} when nothing changed")
+        revealed |= new
+        errors += [f"after {action}: {error}" for error in check(fog_map, revealed, cols, rows, rng)]
+        if errors:
+            break
+
+    if errors:
+        failures += 1
+        print(f"Test {test_num} ({cols} x {rows}) failed")
+        print("\n".join(errors))
+        print("\n" + "*"*50)
+
+print(f"{NUM_TESTS - failures} of {NUM_TESTS} maps matched the set of revealed tiles")